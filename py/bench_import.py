@@ -0,0 +1,53 @@
+# import pyR2D2 と pyR2D2.Data() の起動時間を計測するベンチマーク
+# Usage: python bench_import.py [datadir]
+import os
+import subprocess
+import sys
+import tempfile
+
+repeat = 10
+if len(sys.argv) > 1:
+    datadir = sys.argv[1]
+else:
+    datadir = os.path.dirname(os.path.abspath(__file__)) + '/../test/data/'
+
+def run(code, env=None):
+    '''
+    Runs code in a new interpreter and returns the printed output
+    '''
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, env=env, check=True)
+    return result.stdout
+
+def median_time(code, env=None):
+    times = sorted(float(run(code, env)) for _ in range(repeat))
+    return times[len(times)//2]
+
+env = dict(os.environ)
+if 'PYR2D2_CACHE_DIR' not in env:
+    env['PYR2D2_CACHE_DIR'] = tempfile.mkdtemp()
+
+bench = {
+    'import numpy': "import time; t = time.perf_counter(); import numpy; print(time.perf_counter() - t)",
+    'import pyR2D2': "import time; t = time.perf_counter(); import pyR2D2; print(time.perf_counter() - t)",
+    'pyR2D2.Data() (no manifest)':
+        "import time; t = time.perf_counter(); import pyR2D2; pyR2D2.Data('"+datadir+"'); print(time.perf_counter() - t)",
+    'pyR2D2.Data() (manifest)':
+        "import time; t = time.perf_counter(); import pyR2D2; pyR2D2.Data('"+datadir+"'); print(time.perf_counter() - t)",
+}
+envs = {'pyR2D2.Data() (no manifest)': dict(env, PYR2D2_CACHE_DIR='')}
+
+# the manifest is created by the first run
+run("import pyR2D2; pyR2D2.Data('"+datadir+"')", env)
+
+for name, code in bench.items():
+    elapsed = median_time(code, envs.get(name, env))
+    print(f'{name:<30}{elapsed*1.e3:10.2f} ms')
+
+# modules that should not be imported by `import pyR2D2` and pyR2D2.Data()
+heavy = ['scipy', 'matplotlib', 'pyR2D2.write', 'pyR2D2.write.google', 'pyR2D2.fortran_util', 'gspread']
+code = "import sys, pyR2D2; pyR2D2.Data('"+datadir+"'); print(' '.join(m for m in "+repr(heavy)+" if m in sys.modules))"
+imported = run(code, env).split()
+if imported:
+    print('heavy modules imported at startup:', ', '.join(imported))
+else:
+    print('no heavy modules imported at startup')
@@ -0,0 +1,60 @@
+# fortran_util のカーネルについて、バックエンド毎の数値の一致と処理速度を確認するベンチマーク
+# Usage: python bench_kernels.py [n]
+import sys
+import time
+
+import numpy as np
+import pyR2D2
+
+repeat = 3
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 128
+
+rng = np.random.default_rng(0)
+x = np.cumsum(rng.uniform(0.5, 1.5, n))
+y = np.linspace(0.1, 3.0, n)
+z = np.linspace(-3.0, 3.0, n)
+qq32 = np.asfortranarray(rng.standard_normal((n, n, n)), dtype=np.float32)
+qq64 = np.asfortranarray(qq32, dtype=np.float64)
+qq32t = np.asfortranarray(qq32.T)
+
+xu = np.linspace(x[0], x[-1], n + n//2)
+yu = np.linspace(y[0], y[-1], n + n//2)
+zu = np.linspace(z[0], z[-1], n + n//2)
+rr = np.linspace(0.5, 1.0, n)
+ph = np.linspace(-np.pi, np.pi, n, endpoint=False)
+
+fu = pyR2D2.fortran_util
+plan = fu.InterpPlan(x, y, z, xu, yu, zu)
+splan = fu.Spherical2CartesianPlan(rr, y, ph, n, n, n)
+kernels = {
+    'd_x': (lambda backend: fu.d_x(x, qq32, backend=backend), n**3),
+    'd_y': (lambda backend: fu.d_y(y, qq32, backend=backend), n**3),
+    'd_z': (lambda backend: fu.d_z(z, qq32, backend=backend), n**3),
+    'interp': (lambda backend: fu.interp(x, y, z, xu, yu, zu, qq64, backend=backend), len(xu)*len(yu)*len(zu)),
+    'interp_apply': (lambda backend: plan.apply(qq64, backend=backend), len(xu)*len(yu)*len(zu)),
+    'spherical2cartesian': (lambda backend: fu.spherical2cartesian(rr, y, ph, qq64, n, n, n, backend=backend)[0], n**3),
+    'spherical2cartesian_apply_f8_w8': (lambda backend: splan.apply(qq64, backend=backend), n**3),
+    'curl': (lambda backend: np.array(fu.curl(rr, y, z, qq32, qq32t, qq32, geometry='Spherical', backend=backend)), n**3),
+    'div': (lambda backend: fu.div(rr, y, z, qq32, qq32t, qq32, geometry='Spherical', backend=backend), n**3),
+    'grad': (lambda backend: np.array(fu.grad(rr, y, z, qq32, geometry='Spherical', backend=backend)), n**3),
+    'grad_magnitude': (lambda backend: fu.grad_magnitude(rr, y, z, qq32, geometry='Spherical', backend=backend), n**3),
+}
+
+print(f'grid: {n}^3')
+print(f"{'kernel':<32}{'backend':<10}{'time [ms]':>12}{'Mpoint/s':>12}{'max error':>14}")
+for name, (func, npoints) in kernels.items():
+    reference = None
+    for backend in fu.available_backends(name):
+        result = func(backend) # first call includes compilation for numba
+        if reference is None:
+            reference = result
+        scale = max(np.abs(reference).max(), 1.e-30)
+        error = np.abs(result.astype(np.float64) - reference).max()/scale
+
+        elapsed = []
+        for _ in range(repeat):
+            t = time.perf_counter()
+            func(backend)
+            elapsed.append(time.perf_counter() - t)
+        elapsed = min(elapsed)
+        print(f'{name:<32}{backend:<10}{elapsed*1.e3:12.2f}{npoints/elapsed*1.e-6:12.1f}{error:14.2e}')
@@ -0,0 +1,58 @@
+# remap/qq の読み込みをスレッド数を変えて比較するベンチマーク
+# Usage: python bench_read.py [casedir]
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pyR2D2
+import bench_util
+
+if len(sys.argv) > 1:
+    casedir = sys.argv[1]
+else:
+    casedir = tempfile.mkdtemp() + '/bench/'
+
+steps = range(4)
+datadir = bench_util.make_synthetic_case(casedir, steps=steps)
+d = pyR2D2.Data(datadir)
+
+# The same step is read repeatedly, so this mainly measures the page cache and decoding.
+# Pass a directory on the target file system and drop caches to measure cold reads.
+cases = {
+    'FullData.read(all)': lambda n, w: d.qf.read(n, 'all', workers=w),
+    'FullData.read(ro)' : lambda n, w: d.qf.read(n, 'ro', workers=w),
+    'ZSelect.read'      : lambda n, w: d.qz.read(d.z[d.kx//2], n, workers=w),
+    'MPIRegion.read'    : lambda n, w: d.qm.read(0, n, workers=w),
+    'RestrictedData.read': lambda n, w: d.qr.read(n, 'all', d.x[0], d.x[-1], d.y[0], d.y[d.jx//2], d.z[0], d.z[d.kx//2], workers=w),
+}
+# reader and values read by each case, which are compared between the numbers of threads
+readers = {
+    'FullData.read(all)': (d.qf, d.remap_kind + d.remap_kind_add),
+    'FullData.read(ro)' : (d.qf, ['ro']),
+    'ZSelect.read'      : (d.qz, d.remap_kind + d.remap_kind_add),
+    'MPIRegion.read'    : (d.qm, d.remap_kind + d.remap_kind_add),
+    'RestrictedData.read': (d.qr, d.remap_kind + d.remap_kind_add),
+}
+
+print('ix, jx, kx =', d.ix, d.jx, d.kx, ', npe =', d.npe)
+print(f"{'reader':<22}" + ''.join(f'{"workers="+str(w):>14}' for w in [1, 4, 16]))
+for name, func in cases.items():
+    line = f'{name:<22}'
+    reference = None
+    for workers in [1, 4, 16]:
+        start = time.perf_counter()
+        for n in steps:
+            func(n, workers)
+        elapsed = (time.perf_counter() - start)/len(steps)
+
+        # results should not depend on the number of threads
+        reader, keys = readers[name]
+        result = {key: np.copy(reader.__dict__[key]) for key in keys}
+        if reference is None:
+            reference = result
+        for key in reference:
+            if not np.array_equal(reference[key], result[key]):
+                raise RuntimeError(name + ': result depends on the number of workers')
+        line += f'{elapsed*1.e3:11.2f} ms'
+    print(line)
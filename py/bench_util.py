@@ -0,0 +1,54 @@
+# ベンチマーク用の小さな合成データを作るためのユーティリティ
+import os
+import shutil
+
+import numpy as np
+import pyR2D2
+
+testdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../test/')
+
+def make_synthetic_case(casedir, steps=(0,), seed=0):
+    '''
+    Makes a synthetic case from the parameter files in test/data
+    remap/qq and time/mhd are filled with random numbers
+
+    Parameters
+    ----------
+    casedir : str
+        destination directory. data/ and input_data/ are generated in it
+    steps : list
+        time steps to be generated
+    seed : int
+        seed of random numbers
+
+    Returns
+    -------
+    datadir : str
+        data directory of the synthetic case
+    '''
+    datadir = os.path.join(casedir, 'data/')
+    if os.path.exists(casedir):
+        shutil.rmtree(casedir)
+    shutil.copytree(testdir + 'data', datadir)
+    shutil.copytree(testdir + 'input_data', os.path.join(casedir, 'input_data/'))
+
+    d = pyR2D2.Data(datadir)
+    rng = np.random.default_rng(seed)
+    m_total = d.mtype + len(d.remap_kind_add)
+
+    os.makedirs(datadir + 'time/mhd/', exist_ok=True)
+    for n in steps:
+        for np0 in range(d.npe):
+            qqdir = datadir + 'remap/qq/' + '{0:05d}'.format(np0//1000) + '/' + '{0:08d}'.format(np0) + '/'
+            os.makedirs(qqdir, exist_ok=True)
+            size = int(d.iixl[np0])*int(d.jjxl[np0])*d.kx*m_total
+            rng.standard_normal(size, dtype=np.float32).astype(d.endian + 'f') \
+                .tofile(qqdir + 'qq.dac.' + '{0:08d}'.format(n) + '.' + '{0:08d}'.format(np0))
+
+        np.array([n*d.dtout], dtype=d.endian + 'd') \
+            .tofile(datadir + 'time/mhd/t.dac.' + '{0:08d}'.format(n))
+
+    with open(datadir + 'param/nd.dac', 'w') as f:
+        f.write(str(max(steps)).rjust(8) + str(0).rjust(8))
+
+    return datadir
@@ -24,40 +24,24 @@ print("Maximum time step= ",d.nd," time ="\
 
 plt.close('all')
 
-# 座標のファクターの設定
+# 各時間ステップの統計量はキャッシュ(datadir/est/、書き込めない場合は~/.cache/pyR2D2/est/)に追記され、新しいステップのみ計算する
+est = pyR2D2.util.EstCache(d)
+est.update(n0=n0)
+mdt = est.load(n0,nd)
+
 if d.geometry == 'Cartesian':
-    sinyy = 1
-    sinyym = 1.
+    fstar = d.lstar/4/np.pi/d.rstar**2
 else: # spherical geometry
-    xx,yy = np.meshgrid(d.x, d.y,indexing='ij')
-    sinyy = np.sin(yy)
-    sinyym = np.average(sinyy,axis=1)
-
-    xx,yy_flux = np.meshgrid(d.x_flux, d.y, indexing='ij')
-    sinyy_flux = np.sin(yy_flux)
-    sinyym_flux = np.average(sinyy_flux,axis=1)
+    fstar = d.lstar/4/np.pi
 
 # ここで計算した物理量は辞書型mdに入れていく
 md = {}
-# zerosの設定
-## RMS and mean values
-vls = ['vxrmst', 'vyrmst', 'vzrmst', 
-        'bxrmst', 'byrmst', 'bzrmst',
-        'rormst', 'sermst', 'prrmst', 'termst',
-        'romt', 'semt', 'prmt', 'temt'
-        ]
+vls = ['vxrms','vyrms','vzrms','bxrms','byrms','bzrms','rorms','serms','prrms','terms',
+       'rom','sem','prm','tem',
+       'vxm','vym','vzm','bxm','bym','bzm',
+       'fe','fm','fd','fk','fr','ft','ff']
 for vl in vls:
-    md[vl] = np.zeros((d.ix, d.nd-n0+1))
-
-## mean magnetic field (2D)
-vls = ['vxmt', 'vymt', 'vzmt', 'bxmt', 'bymt', 'bzmt']
-for vl in vls:
-    md[vl] =  np.zeros((d.ix, d.jx, d.nd-n0+1))
-
-## energy fluxes (1D but ix + 1)
-vls = ['fet','fmt','fdt','fkt','frt','ftt','fft']
-for vl in vls:
-    md[vl] = np.zeros((d.ix+1, d.nd-n0+1))
+    md[vl+'t'] = mdt[vl]
 
 ###############################################################################
 ###############################################################################
@@ -127,64 +111,25 @@ def est_plot(d, md, fig, ax1, ax2, ax3, ax4):
 ###############################################################################
 ###############################################################################
 
-for n in tqdm(range(n0,nd+1)):
+# キャッシュされたステップのみ描画する。mは配列mdtの中のindex
+for m, n in enumerate(tqdm(mdt['step'])):
     print(f"\r n = {n} ", end='', flush=True)
     ##############################
-    t = d.time_read(n, verbose=False)
-    d.vc.read(n)
-
-    ##############################    
-    if d.geometry == 'Cartesian':
-        fstar = d.lstar/4/np.pi/d.rstar**2
-        vls = ['fe','fd','fk','fr','fm']
-        for vl in vls:
-            md[vl] = np.average(d.vc.__dict__[vl],axis=1)
-    else:
-        fstar = d.lstar/4/np.pi
-        vls = ['fe','fd','fk','fm']
-        for vl in vls:
-            md[vl] = np.average(d.vc.__dict__[vl]*sinyy_flux,axis=1)/sinyym_flux*d.x_flux**2
-        md['fr'] = np.average(d.vc.fr*sinyy_flux,axis=1)/sinyym_flux#*x_flux**2
-    
-    # linear と full　の判別のためのRMSエントロピーの計算
-    serms = np.sqrt(np.average(d.vc.serms**2*sinyy,axis=1)/sinyym)/d.se0
-    sermsm = 0.5*(np.append(serms,serms[-1]) + np.insert(serms,0,serms[0]))
-    sr = 0.5*(1 + np.sign(sermsm - 1.e-4))
-    
-    # fe: linear expression
-    # fd: full expression
-    md['ff'] = md['fd']*sr + md['fe']*(1.e0-sr)
-    md['ft'] = md['ff'] + md['fk'] + md['fr'] + md['fm']
-
-    # RMS values
-    vls = ['vxrms','vyrms','vzrms','bxrms','byrms','bzrms','rorms','serms','prrms','terms']
-    for vl in vls:
-        md[vl+'t'][:,n-n0] = np.sqrt(np.average(d.vc.__dict__[vl]**2*sinyy,axis=1)/sinyym)
-
-    # energy flux
-    vls = ['fe','fm','fd','fk','fr','ft','ff']
-    for vl in vls:
-        md[vl+'t'][:,n-n0] = md[vl]
-        
-    # mean magnetic field
-    vls = ['vxm','vym','vzm','bxm','bym','bzm']
-    for vl in vls:
-        md[vl+'t'][:,:,n-n0] = d.vc.__dict__[vl]
+    t = mdt['t'][m]
 
-    # 平均量の取得
-    vls = ['rom','sem','prm','tem']
+    vls = ['fe','fd','fk','fr','fm','ff','ft']
     for vl in vls:
-        md[vl+'t'][:,n-n0] = np.average(d.vc.__dict__[vl]*sinyy,axis=1)/sinyym
+        md[vl] = md[vl+'t'][:,m]
 
     vls = ['vxrms','vyrms','vzrms','bxrms','byrms','bzrms','sem']
     for vl in vls:
-        md[vl] = md[vl+'t'][:,n-n0]
+        md[vl] = md[vl+'t'][:,m]
         
     fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, num='est', figsize=(12, 8))
 
     est_plot(d,md,fig,ax1,ax2,ax3,ax4)
 
-    if n == n0:
+    if m == 0:
         fig.tight_layout()
     
     plt.pause(0.1)
@@ -62,7 +62,7 @@ for n in tqdm(range(n0,d.nd + 1)):
         tight_layout_flag = False
     
     if d.geometry == 'Cartesian':
-        d.qt.read(n*int(d.ifac))
+        d.qt.read(n*int(d.ifac), ['rt','bx','he'], tau=1)
         tu_height = d.qt.he[d.jc, :]
         
         rtm = d.qt.rt.mean() # mean intensity
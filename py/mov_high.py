@@ -60,8 +60,8 @@ for n in tqdm(range(n0,d.nd_tau + 1)):
         tight_layout_flag = False
     
     if d.geometry == 'Cartesian':
-        d.qt.read(n)
-        d.qs.read(np.argmin(abs(d.y_slice - 0.5*d.ymax)),'y',n)
+        d.qt.read(n, ['rt','bx','he'], tau=1)
+        d.qs.read(np.argmin(abs(d.y_slice - 0.5*d.ymax)),'y',n,value=['bx','by','bz','te'])
         tu_height = d.qt.he[np.argmax(d.y > d.y_slice[np.argmin(abs(d.y_slice - 0.5*d.ymax))]),:]
                 
         rtm = d.qt.rt.mean() # mean intensity
@@ -93,7 +93,7 @@ for n in tqdm(range(n0,d.nd_tau + 1)):
 
         mov_util.mov_cartesian_photo_2x2(d,t-t0,vls,tu_height,vmaxs,vmins,titles,tight_layout_flag=tight_layout_flag)
     else: # Spherical geometry including Yin-Yang
-        d.qs.read(np.argmin(abs(d.x_slice - d.xmax)), 'x', n) # xmaxに一番近いところ
+        d.qs.read(np.argmin(abs(d.x_slice - d.xmax)), 'x', n, value=['vx','bx'], workers=2) # xmaxに一番近いところ
         vxrms = np.sqrt((d.qs.vx_yin**2).mean())
         bxrms = max(np.sqrt((d.qs.bx_yin**2).mean()),1e-2)
     
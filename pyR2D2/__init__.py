@@ -12,15 +12,28 @@ A :class:`pyR2D2.Data` instance can be created as follows:
     d = pyR2D2.Data(datadir)
         
 """
-from .data import Data
-from .data_io.parameters import Parameters
-from .data_io.read import XSelect, ZSelect, MPIRegion, FullData, RestrictedData, OpticalDepth, OnTheFly, Slice, ModelS
-from .sync.sync import Sync
-from .color import color
-from .constant import constant
-from . import write
-from . import util
-from . import fortran_util
+# submodules and classes are imported on first access (PEP 562) to keep `import pyR2D2` light
+_lazy_attributes = {'Data': ('.data', 'Data'),
+                    'Parameters': ('.data_io.parameters', 'Parameters'),
+                    'XSelect': ('.data_io.read', 'XSelect'),
+                    'ZSelect': ('.data_io.read', 'ZSelect'),
+                    'MPIRegion': ('.data_io.read', 'MPIRegion'),
+                    'FullData': ('.data_io.read', 'FullData'),
+                    'RestrictedData': ('.data_io.read', 'RestrictedData'),
+                    'OpticalDepth': ('.data_io.read', 'OpticalDepth'),
+                    'OnTheFly': ('.data_io.read', 'OnTheFly'),
+                    'Slice': ('.data_io.read', 'Slice'),
+                    'ModelS': ('.data_io.read', 'ModelS'),
+                    'Sync': ('.sync.sync', 'Sync'),
+                    'Catalog': ('.catalog.catalog', 'Catalog'),
+                    'color': ('.color.color', None),
+                    'constant': ('.constant.constant', None),
+                    'write': ('.write', None),
+                    'util': ('.util', None),
+                    'fortran_util': ('.fortran_util', None),
+                    'store': ('.store', None),
+                    'data_io': ('.data_io', None),
+                    }
 
 __all__ = ['Data',
            'Parameters',
@@ -34,13 +47,29 @@ __all__ = ['Data',
            'Slice',
            'ModelS',
            'Sync',
+           'Catalog',
            'color',
            'constant',
            'write',
            'util',
            'fortran_util',
+           'store',
            ]
 
+def __getattr__(name):
+    if name in _lazy_attributes:
+        import importlib
+        module_name, attr = _lazy_attributes[name]
+        module = importlib.import_module(module_name, __name__)
+        value = module if attr is None else getattr(module, attr)
+        globals()[name] = value
+        return value
+
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
 try:
     from ._version import version as __version__
 except ImportError:
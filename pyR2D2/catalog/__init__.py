@@ -0,0 +1 @@
+from .catalog import *
\ No newline at end of file
@@ -0,0 +1,280 @@
+'''
+Catalog of R2D2 cases in a run directory
+
+Key parameters of all the cases under rundir (e.g. ../run/d001/data/)
+are stored in a SQLite file, which is updated incrementally.
+'''
+import os
+import sqlite3
+import time
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor
+
+# columns of the table and the corresponding SQL types
+_COLUMNS = {'caseid': 'TEXT PRIMARY KEY',
+            'datadir': 'TEXT',
+            'real_path': 'TEXT',
+            'geometry': 'TEXT',
+            'ix': 'INTEGER',
+            'jx': 'INTEGER',
+            'kx': 'INTEGER',
+            'npe': 'INTEGER',
+            'xmin': 'REAL',
+            'xmax': 'REAL',
+            'ymin': 'REAL',
+            'ymax': 'REAL',
+            'zmin': 'REAL',
+            'zmax': 'REAL',
+            'rstar': 'REAL',
+            'dtout': 'REAL',
+            'dtout_tau': 'REAL',
+            'nd': 'INTEGER',
+            'nd_tau': 'INTEGER',
+            'size': 'INTEGER',
+            'signature': 'TEXT',
+            'scanned_at': 'TEXT',
+            }
+
+def _signature(datadir):
+    '''
+    Returns a string that changes when the case is updated
+
+    nd_tau is found from the files in time/tau/, so the directories
+    are also stamped. Their mtime changes when a file is added or removed
+    '''
+    stamps = []
+    for file in ['param/nd.dac', 'param/params.dac', 'time/tau/', 'tau/', 'remap/qq/']:
+        try:
+            st = os.stat(datadir + file)
+            stamps.append(str(st.st_mtime_ns) + ':' + str(st.st_size))
+        except OSError:
+            stamps.append('-')
+    return ' '.join(stamps)
+
+def _disk_usage(directory):
+    '''
+    Returns total size of files in directory in bytes
+    '''
+    total_size = 0
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in filenames:
+            try:
+                total_size += os.lstat(os.path.join(dirpath, filename)).st_size
+            except FileNotFoundError:
+                continue
+    return total_size
+
+def _scan(caseid, datadir, size=True):
+    '''
+    Extracts key parameters of a case
+
+    Returns
+    -------
+    row : dict
+        row of the table
+    '''
+    import pyR2D2
+
+    d = pyR2D2.Data(datadir)
+    row = {'caseid': caseid,
+           'datadir': datadir,
+           'real_path': os.path.realpath(datadir),
+           'signature': _signature(datadir),
+           'scanned_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+           'size': _disk_usage(datadir) if size else None}
+    for key in ['geometry', 'ix', 'jx', 'kx', 'npe', 'xmin', 'xmax', 'ymin', 'ymax', 'zmin', 'zmax',
+                'rstar', 'dtout', 'dtout_tau', 'nd', 'nd_tau']:
+        row[key] = d.p.__dict__.get(key)
+    return row
+
+class Catalog:
+    '''
+    Catalog of R2D2 cases backed by a SQLite file
+
+    Attributes
+    ----------
+    rundir : str
+        directory that includes cases, e.g., ../run/
+    dbfile : str
+        path of the SQLite file
+
+    Examples
+    --------
+    .. code-block:: python
+
+        import pyR2D2
+        cat = pyR2D2.Catalog('../run/')
+        cat.refresh() # only updated cases are scanned
+        for row in cat.query('geometry = ? AND nd > ?', ('YinYang', 100)):
+            print(row['caseid'], row['ix'], row['size'])
+        d = cat.data('d001')
+    '''
+    def __init__(self, rundir, dbfile=None, refresh=True, size=True, workers=None):
+        '''
+        Parameters
+        ----------
+        rundir : str
+            directory that includes cases, e.g., ../run/
+        dbfile : str
+            path of the SQLite file. Default is rundir + 'catalog.sqlite'
+        refresh : bool
+            If True, the catalog is refreshed. See :meth:`refresh`
+        size : bool
+            If True, disk usage of each case is evaluated
+        workers : int
+            Number of threads for scanning cases.
+            If None, environment variable PYR2D2_WORKERS is used (default 1)
+        '''
+        self.rundir = os.path.join(rundir, '')
+        if dbfile is None:
+            dbfile = self.rundir + 'catalog.sqlite'
+        self.dbfile = dbfile
+
+        with closing(self._connect()) as con, con:
+            columns = ', '.join(key + ' ' + sql_type for key, sql_type in _COLUMNS.items())
+            con.execute('CREATE TABLE IF NOT EXISTS cases (' + columns + ')')
+
+        if refresh:
+            self.refresh(size=size, workers=workers)
+
+    def _connect(self):
+        '''
+        Opens the database. Use as ``with closing(self._connect()) as con, con:``
+        so that the transaction is committed and the connection is closed
+        '''
+        con = sqlite3.connect(self.dbfile)
+        con.row_factory = sqlite3.Row
+        return con
+
+    def _cases(self):
+        '''
+        Returns caseid -> datadir of the cases in rundir
+        '''
+        cases = {}
+        for caseid in sorted(os.listdir(self.rundir)):
+            datadir = self.rundir + caseid + '/data/'
+            if os.path.isfile(datadir + 'param/nd.dac'):
+                cases[caseid] = datadir
+        return cases
+
+    def refresh(self, force=False, size=True, workers=None):
+        '''
+        Scans new and updated cases in parallel and removes deleted cases
+
+        Parameters
+        ----------
+        force : bool
+            If True, all the cases are scanned.
+            Needed to update size after files are rewritten in place
+            or added only to subdirectories, e.g., remap/qq/00000/
+        size : bool
+            If True, disk usage of each case is evaluated
+        workers : int
+            Number of threads for scanning cases.
+            If None, environment variable PYR2D2_WORKERS is used (default 1)
+
+        Returns
+        -------
+        updated : list
+            caseids that are scanned
+        '''
+        from ..data_io.read import _get_workers
+
+        cases = self._cases()
+        with closing(self._connect()) as con, con:
+            signatures = {row['caseid']: row['signature'] for row in con.execute('SELECT caseid, signature FROM cases')}
+
+        updated = [caseid for caseid, datadir in cases.items() \
+                   if force or signatures.get(caseid) != _signature(datadir)]
+
+        def _scan_case(caseid):
+            try:
+                return _scan(caseid, cases[caseid], size=size)
+            except Exception as e:
+                print('######')
+                print(caseid + ' is skipped:', e)
+                print('######')
+                return None
+
+        workers = _get_workers(workers)
+        if workers == 1:
+            rows = [_scan_case(caseid) for caseid in updated]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                rows = list(executor.map(_scan_case, updated))
+        rows = [row for row in rows if row is not None]
+
+        keys = list(_COLUMNS.keys())
+        with closing(self._connect()) as con, con:
+            con.executemany('INSERT OR REPLACE INTO cases (' + ', '.join(keys) + ') VALUES (' + ', '.join(['?']*len(keys)) + ')',
+                            [tuple(row[key] for key in keys) for row in rows])
+            removed = [caseid for caseid in signatures if caseid not in cases]
+            con.executemany('DELETE FROM cases WHERE caseid = ?', [(caseid,) for caseid in removed])
+
+        return [row['caseid'] for row in rows]
+
+    def query(self, where=None, params=(), order_by='caseid'):
+        '''
+        Returns rows of the catalog
+
+        Parameters
+        ----------
+        where : str
+            SQL condition, e.g., "geometry = ? AND nd > ?"
+        params : tuple
+            parameters for placeholders in where
+        order_by : str
+            column for sorting
+
+        Returns
+        -------
+        rows : list
+            list of dict of the columns
+        '''
+        sql = 'SELECT * FROM cases'
+        if where is not None:
+            sql += ' WHERE ' + where
+        sql += ' ORDER BY ' + order_by
+        with closing(self._connect()) as con, con:
+            return [dict(row) for row in con.execute(sql, params)]
+
+    @property
+    def caseids(self):
+        return [row['caseid'] for row in self.query()]
+
+    def __getitem__(self, caseid):
+        rows = self.query('caseid = ?', (caseid,))
+        if len(rows) == 0:
+            raise KeyError(caseid)
+        return rows[0]
+
+    def __len__(self):
+        return len(self.caseids)
+
+    def data(self, caseid):
+        '''
+        Returns pyR2D2.Data of a case
+
+        Parameters
+        ----------
+        caseid : str
+            caseid, e.g., d001
+
+        Returns
+        -------
+        d : pyR2D2.Data
+            Instance of pyR2D2.Data
+        '''
+        import pyR2D2
+
+        return pyR2D2.Data(self[caseid]['datadir'])
+
+    def summary(self):
+        '''
+        Prints the catalog
+        '''
+        print(f"{'caseid':<10}{'geometry':>10}{'ix':>6}{'jx':>6}{'kx':>6}{'nd':>8}{'nd_tau':>8}{'size [GB]':>12}")
+        for row in self.query():
+            size = '' if row['size'] is None else f"{row['size']/1024**3:.2f}"
+            print(f"{row['caseid']:<10}{row['geometry']:>10}{row['ix']:>6}{row['jx']:>6}{row['kx']:>6}"
+                  f"{row['nd']:>8}{row['nd_tau']:>8}{size:>12}")
\ No newline at end of file
@@ -1,3 +1,4 @@
+import os
 import pyR2D2
 import numpy as np
 
@@ -34,32 +35,56 @@ class Data:
         
     sync : pyR2D2.Sync
         Instance of pyR2D2.Sync
+    cache : pyR2D2.data_io.cache.LRUCache
+        Cache of recently read remap data shared by qx, qz, qm, qf, and qr
             
     '''
     
-    def __init__(self,datadir,verbose=False,self_old=None):
+    def __init__(self,datadir,verbose=False,self_old=None,cache_bytes=None):
         '''
         Initialize pyR2D2.Data
+
+        Parameters
+        ----------
+        datadir : str
+            directory path to R2D2 data
+        cache_bytes : int
+            byte budget of pyR2D2.Data.cache.
+            If None, environment variable PYR2D2_CACHE_BYTES is used (default 0, disabled)
         '''
         self.datadir = datadir
+        self.cache = pyR2D2.data_io.cache.LRUCache(cache_bytes)
         self.p  = pyR2D2.Parameters(self)
-        self.qx = pyR2D2.XSelect(self)
-        self.qz = pyR2D2.ZSelect(self)
-        self.qm = pyR2D2.MPIRegion(self)
-        self.qf = pyR2D2.FullData(self)
-        self.qr = pyR2D2.RestrictedData(self)
-        self.qt = pyR2D2.OpticalDepth(self)
-        self.vc = pyR2D2.OnTheFly(self)
-        self.qs = pyR2D2.Slice(self)
-        self.ms = pyR2D2.ModelS(self)
         self.time = None
         self.qc   = None        
-        self.sync = pyR2D2.Sync(self)
+        self._times = {}
+
+    # readers are constructed on first access
+    _readers = {'qx': 'XSelect',
+                'qz': 'ZSelect',
+                'qm': 'MPIRegion',
+                'qf': 'FullData',
+                'qr': 'RestrictedData',
+                'qt': 'OpticalDepth',
+                'vc': 'OnTheFly',
+                'qs': 'Slice',
+                'ms': 'ModelS',
+                'sync': 'Sync'}
         
     def __getattr__(self, name):
         '''
+        Readers are constructed on first access.
         When an attribute is not found in pyR2D2.Data, it is searched in pyR2D2.Data.p
         '''
+        # p is not yet defined during initialization or unpickling
+        if name == 'p' or name.startswith('__'):
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        if name in self._readers:
+            reader = getattr(pyR2D2, self._readers[name])(self)
+            self.__dict__[name] = reader
+            return reader
+
         if hasattr(self.p, name):
             attr = getattr(self.p, name)
             return attr
@@ -82,13 +107,17 @@ class Data:
         -------
         time : float
             time at a selected time step
+
+        Notes
+        -----
+        If :meth:`pyR2D2.Data.times` has been called, the time is taken from memory.
         '''
 
-        if tau:
-            with open(self.datadir+"time/tau/t.dac."+'{0:08d}'.format(n),"rb") as f:
-                self.time = np.fromfile(f,self.endian+'d',1).reshape((1),order='F')[0]
+        kind = 'tau' if tau else 'mhd'
+        if kind in self._times and 0 <= n < len(self._times[kind]) and np.isfinite(self._times[kind][n]):
+            self.time = self._times[kind][n]
         else:
-            with open(self.datadir+"time/mhd/t.dac."+'{0:08d}'.format(n),"rb") as f:
+            with open(self.datadir+"time/"+kind+"/t.dac."+'{0:08d}'.format(n),"rb") as f:
                 self.time = np.fromfile(f,self.endian+'d',1).reshape((1),order='F')[0]
         
         if verbose:
@@ -96,6 +125,109 @@ class Data:
 
         return self.time
 
+    def times(self, kind='mhd'):
+        '''
+        Returns time of all the time steps
+
+        Parameters
+        ----------
+        kind : str
+            "mhd" for time/mhd/ (0 to nd) or "tau" for time/tau/ (0 to nd_tau)
+
+        Returns
+        -------
+        times : numpy.ndarray, float
+            time of each time step. nan if the file does not exist
+
+        Notes
+        -----
+        The times are cached in time/<sha1 of datadir>/{kind}.index under
+        environment variable PYR2D2_CACHE_DIR (default ~/.cache/pyR2D2),
+        so that datadir is not modified. Empty PYR2D2_CACHE_DIR disables the cache.
+        Only time steps newer than the cache are read from time/{kind}/.
+        The cache is rebuilt when the file of its newest time step has been
+        rewritten after the cache, e.g., by a restarted run.
+        '''
+        nd = {'mhd': self.nd, 'tau': self.nd_tau}[kind]
+        if kind in self._times and len(self._times[kind]) >= nd + 1:
+            return self._times[kind]
+
+        index = self._times_index_path(kind)
+        times = np.zeros(0)
+        if index is not None and os.path.isfile(index):
+            times = np.fromfile(index,'<d')[:nd+1]
+            if len(times) > 0:
+                filename = self.datadir+"time/"+kind+"/t.dac."+'{0:08d}'.format(len(times) - 1)
+                try:
+                    if os.stat(filename).st_mtime_ns > os.stat(index).st_mtime_ns:
+                        times = np.zeros(0)
+                except FileNotFoundError:
+                    times = np.zeros(0)
+
+        n0 = len(times)
+        if n0 < nd + 1:
+            new = np.full(nd + 1 - n0, np.nan)
+            for n in range(n0, nd + 1):
+                filename = self.datadir+"time/"+kind+"/t.dac."+'{0:08d}'.format(n)
+                if os.path.isfile(filename):
+                    new[n - n0] = np.fromfile(filename,self.endian+'d',1)[0]
+            # steps that are not yet written are not cached
+            m = len(new) if np.all(np.isfinite(new)) else int(np.argmax(~np.isfinite(new)))
+            if index is not None:
+                try:
+                    os.makedirs(os.path.dirname(index), exist_ok=True)
+                    with open(index,'ab') as f:
+                        f.truncate(8*n0)
+                        new[:m].astype('<d').tofile(f)
+                except OSError:
+                    pass
+            times = np.concatenate([times, new])
+
+        self._times[kind] = times
+        return times
+
+    def _times_index_path(self, kind):
+        '''
+        Returns path of the cache of :meth:`pyR2D2.Data.times`.
+        None if environment variable PYR2D2_CACHE_DIR is empty
+        '''
+        import hashlib
+
+        cachedir = os.environ.get('PYR2D2_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'pyR2D2'))
+        if cachedir == '':
+            return None
+        key = hashlib.sha1(os.path.abspath(self.datadir).encode()).hexdigest()
+        return os.path.join(cachedir, 'time', key, kind + '.index')
+
+    def time_to_step(self, t, kind='mhd'):
+        '''
+        Returns the time step nearest to given time
+
+        Parameters
+        ----------
+        t : float or numpy.ndarray
+            time
+        kind : str
+            "mhd" or "tau". See :meth:`pyR2D2.Data.times`
+
+        Returns
+        -------
+        n : int or numpy.ndarray, int
+            time step nearest to t. Time steps without time/{kind}/ file are skipped
+        '''
+        times = self.times(kind)
+        steps = np.flatnonzero(np.isfinite(times))
+        if len(steps) == 0:
+            raise ValueError('no time is found in '+self.datadir+'time/'+kind+'/')
+        times = times[steps]
+        if len(times) == 1:
+            return int(steps[0]) if np.ndim(t) == 0 else np.full(np.shape(t), steps[0])
+        n = np.clip(np.searchsorted(times, t), 1, len(times) - 1)
+        n = steps[np.where(np.abs(times[n - 1] - t) <= np.abs(times[n] - t), n - 1, n)]
+        if np.ndim(n) == 0:
+            return int(n)
+        return n
+
     def qc_read(self, n, end_step=False):
         '''
         Reads 3D full data for checkpoint
@@ -1,2 +1,3 @@
 from .parameters import *
-from .read import *
\ No newline at end of file
+from .read import *
+from .cache import *
\ No newline at end of file
@@ -0,0 +1,101 @@
+import os
+import threading
+from collections import OrderedDict
+
+class LRUCache:
+    '''
+    Least-recently-used cache of numpy arrays with a byte budget
+
+    Important
+    ---------
+    pyR2D2.Data class has an instance of this class as :code:`pyR2D2.Data.cache`,
+    which is shared by the remap readers.
+
+    Attributes
+    ----------
+    max_bytes : int
+        byte budget of the cache. 0 disables the cache
+    nbytes : int
+        total bytes of the cached arrays
+    '''
+    def __init__(self, max_bytes=None):
+        '''
+        Initialize pyR2D2.data_io.cache.LRUCache
+
+        Parameters
+        ----------
+        max_bytes : int
+            byte budget of the cache.
+            If None, environment variable PYR2D2_CACHE_BYTES is used (default 0, disabled)
+        '''
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get('PYR2D2_CACHE_BYTES', 0)))
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        '''
+        Returns a cached array and marks it as recently used
+
+        Parameters
+        ----------
+        key : tuple
+            key of the array
+
+        Returns
+        -------
+        qq : numpy.ndarray
+            cached array. None if the key is not cached
+        '''
+        with self._lock:
+            qq = self._entries.get(key)
+            if qq is not None:
+                self._entries.move_to_end(key)
+        return qq
+
+    def put(self, key, qq):
+        '''
+        Stores a read-only copy of an array. Least recently used arrays are evicted to keep max_bytes.
+        The caller keeps qq writable, and later changes of qq do not affect the cache.
+
+        Parameters
+        ----------
+        key : tuple
+            key of the array
+        qq : numpy.ndarray
+            array to be cached
+
+        Returns
+        -------
+        stored : bool
+            True if the array is stored
+        '''
+        if qq.nbytes > self.max_bytes:
+            return False
+
+        with self._lock:
+            if key in self._entries:
+                self.nbytes -= self._entries.pop(key).nbytes
+            while self._entries and self.nbytes + qq.nbytes > self.max_bytes:
+                self.nbytes -= self._entries.popitem(last=False)[1].nbytes
+            qq = qq.copy()
+            qq.flags.writeable = False
+            self._entries[key] = qq
+            self.nbytes += qq.nbytes
+        return True
+
+    def clear(self):
+        '''
+        Removes all cached arrays
+        '''
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
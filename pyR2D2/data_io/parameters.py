@@ -1,8 +1,10 @@
 import os
 import numpy as np
-import pydoc
 import pyR2D2
 
+# version of the manifest cache. Increment when pyR2D2.Parameters._read_parameters changes
+_MANIFEST_VERSION = 1
+
 class Parameters:
     '''
     Class for managing R2D2 basic parameters
@@ -15,8 +17,12 @@ class Parameters:
         ----------
         data : pyR2D2.Data
             Instance of pyR2D2.Data
+
+        Notes
+        -----
+        Parsed parameters are cached in a manifest keyed by mtimes and sizes of
+        the source files. See :meth:`pyR2D2.Parameters._manifest_path`
         """
-        from scipy.io import FortranFile
         self.data = data
         self.datadir = data.datadir
         
@@ -26,10 +32,20 @@ class Parameters:
             self.nd = int(nn[0]) # current maximum time step
             self.nd_tau = int(nn[1]) # current maximum time step for tau
                     
-        # data/time/tau のファイルの数を数え、nd_tauと比較して大きい方をnd_tauとする
+        # data/time/tau のファイルを探索し、nd_tauと比較して大きい方をnd_tauとする
         if os.path.isdir(self.datadir+'time/tau'):
-            self.nd_tau = max(len(os.listdir(self.datadir+'time/tau')) - 1,self.nd_tau)
+            self.nd_tau = self._newest_tau_step(self.nd_tau)
+
+        if not self._load_manifest():
+            self._read_parameters()
+            self._save_manifest()
             
+        self._generate_docstring()
+
+    def _read_parameters(self):
+        '''
+        Reads parameters of the case except time steps
+        '''
         # Read basic parameters
         with open(self.datadir+"param/params.dac","r") as f:
             for line in f:
@@ -67,9 +83,11 @@ class Parameters:
             self.endian = ">"
             
         # MPI information
-        f = FortranFile(self.datadir+'param/xyz.dac','r')
-        shape = (self.ix0*self.jx0*self.kx0,3)
-        self.xyz = f.read_reals(dtype=np.int32).reshape(shape,order='F')
+        # xyz.dac is a Fortran unformatted record: 4-byte length, data, and 4-byte length
+        with open(self.datadir+'param/xyz.dac','rb') as f:
+            nbytes = int(np.fromfile(f,self.endian+'i4',1)[0])
+            shape = (self.ix0*self.jx0*self.kx0,3)
+            self.xyz = np.fromfile(f,self.endian+'i4',nbytes//4).reshape(shape,order='F')
         
         ## number of grid in each direction
         self.ix = self.ix0*self.nx
@@ -266,9 +284,128 @@ class Parameters:
         else:
             self.origin = 'N/A'
 
-        self._generate_docstring()
 
 
+    def _newest_tau_step(self, nd_tau):
+        '''
+        Returns the newest time step in time/tau/ without listing the directory.
+        Files t.dac.* are probed from nd_tau by doubling the stride and then by bisection,
+        assuming that the files exist contiguously from step 0
+
+        Parameters
+        ----------
+        nd_tau : int
+            time step for tau in param/nd.dac
+
+        Returns
+        -------
+        nd_tau : int
+            max of the argument and the newest time step in time/tau/
+        '''
+        def exists(n):
+            return os.path.exists(self.datadir+'time/tau/t.dac.'+'{0:08d}'.format(n))
+
+        lo = max(nd_tau, 0)
+        if not exists(lo):
+            return nd_tau
+
+        # exists(lo) and not exists(hi)
+        stride = 1
+        hi = lo + stride
+        while exists(hi):
+            lo = hi
+            stride *= 2
+            hi = lo + stride
+        while hi - lo > 1:
+            mid = (lo + hi)//2
+            if exists(mid):
+                lo = mid
+            else:
+                hi = mid
+
+        return lo
+
+    def _manifest_sources(self):
+        '''
+        Returns (path, mtime, size) of files read by pyR2D2.Parameters._read_parameters
+        '''
+        files = ['param/params.dac', 'param/xyz.dac', 'param/back.dac', 'remap/vl/c.dac',
+                 'remap/remap_info.dac', 'slice/params.dac', 'slice/slice.dac', 'cont_log.txt']
+        paths = [self.datadir + file for file in files] + [self.datadir[:-5]+'input_data/eos_table_sero.npz']
+
+        sources = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+                sources.append((path, st.st_mtime_ns, st.st_size))
+            except OSError:
+                sources.append((path, None, None))
+        return sources
+
+    def _manifest_path(self):
+        '''
+        Returns path of the manifest cache of the case.
+        The directory is given by environment variable PYR2D2_CACHE_DIR (default ~/.cache/pyR2D2).
+        Empty PYR2D2_CACHE_DIR disables the manifest cache
+        '''
+        import hashlib
+
+        cachedir = os.environ.get('PYR2D2_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'pyR2D2'))
+        if cachedir == '':
+            return None
+        key = hashlib.sha1(os.path.abspath(self.datadir).encode()).hexdigest()
+        return os.path.join(cachedir, 'manifest', key + '.pkl')
+
+    def _load_manifest(self):
+        '''
+        Loads parameters from the manifest cache if the source files are not modified
+
+        Returns
+        -------
+        loaded : bool
+            True if the parameters are loaded
+        '''
+        import pickle
+
+        path = self._manifest_path()
+        if path is None or not os.path.isfile(path):
+            return False
+        try:
+            with open(path, 'rb') as f:
+                manifest = pickle.load(f)
+        except Exception:
+            return False
+        if manifest.get('version') != _MANIFEST_VERSION or manifest.get('sources') != self._manifest_sources():
+            return False
+
+        self.__dict__.update(manifest['attributes'])
+        return True
+
+    def _save_manifest(self):
+        '''
+        Saves parsed parameters to the manifest cache
+        '''
+        import pickle
+
+        path = self._manifest_path()
+        if path is None:
+            return
+
+        skip = ['data', 'datadir', 'nd', 'nd_tau']
+        manifest = {'version': _MANIFEST_VERSION,
+                    'sources': self._manifest_sources(),
+                    'attributes': {key: value for key, value in self.__dict__.items() \
+                                   if key not in skip and not key.startswith('_')}}
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # write to a temporary file and rename for concurrent batch jobs
+            tmppath = path + '.' + str(os.getpid())
+            with open(tmppath, 'wb') as f:
+                pickle.dump(manifest, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmppath, path)
+        except OSError:
+            pass
+
     def yinyang_setup(self):
         '''
         YinYangSet function sets up the YinYang geometry for
@@ -375,6 +512,10 @@ class Parameters:
         if update_json:
             self._update_json_template(json_file)
 
+        # the docstring is generated once per class
+        if '_docstring_generated' in self.__class__.__dict__:
+            return
+
         gene_space = ''
         desc_space = ' '*4
         
@@ -396,4 +537,5 @@ class Parameters:
                 docstring += gene_space+desc_space + saved_attributes[key]+'\n'
             else:
                 docstring += '\n'
-        self.__class__.__doc__ = self.__class__.__doc__ + docstring
\ No newline at end of file
+        self.__class__.__doc__ = self.__class__.__doc__ + docstring
+        self.__class__._docstring_generated = True
\ No newline at end of file
@@ -1,6 +1,142 @@
 import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 
+from ..store.store import open_store, filepath as _store_filepath
+
+def _get_workers(workers=None):
+    """
+    Returns the number of threads for reading files
+
+    Parameters
+    ----------
+    workers : int
+        number of threads. If None, environment variable PYR2D2_WORKERS is used (default 1)
+
+    Returns
+    -------
+    workers : int
+        number of threads
+    """
+    if workers is None:
+        workers = int(os.environ.get('PYR2D2_WORKERS', 1))
+
+    return max(1, workers)
+
+class _RemapPlan:
+    """
+    Read plan of remap/qq/
+    It is computed once per pyR2D2.Data and shared by all remap readers
+
+    Attributes
+    ----------
+    values : list
+        remap_kind + remap_kind_add, order of variables in a file
+    shape : list
+        (iixl, jjxl, kx) of each MPI process
+    offset : numpy.ndarray, int
+        byte offset of each variable in a file, size of (npe, mtype+3)
+    plane : numpy.ndarray, int
+        byte size of a k-plane of each MPI process
+    islice, jslice : list
+        destination slices in the whole domain for each MPI process
+    nps : list
+        MPI processes that own a remap region
+    nps_ir : list
+        MPI processes that own a remap region for each ir
+    nps_mpi : list
+        MPI processes with data for each ir. See :class:`pyR2D2.MPIRegion`
+    stores : dict
+        consolidated stores opened by the readers. See :func:`pyR2D2.store.open_store`
+    """
+    def __init__(self, p):
+        """
+        Parameters
+        ----------
+        p : pyR2D2.Parameters
+            Instance of pyR2D2.Parameters
+        """
+        self.dtype = np.dtype(p.endian + 'f')
+        self.kx = p.kx
+        self.values = p.remap_kind + p.remap_kind_add
+        self.index = {value: m for m, value in enumerate(self.values)}
+
+        self.shape = [(int(p.iixl[np0]), int(p.jjxl[np0]), p.kx) for np0 in range(p.npe)]
+        self.plane = np.array([iixl*jjxl*self.dtype.itemsize for iixl, jjxl, _ in self.shape], dtype=np.int64)
+        self.offset = self.plane[:,np.newaxis]*p.kx*np.arange(len(self.values), dtype=np.int64)[np.newaxis,:]
+
+        self.islice = [slice(int(p.iss[np0]), int(p.iee[np0])+1) for np0 in range(p.npe)]
+        self.jslice = [slice(int(p.jss[np0]), int(p.jee[np0])+1) for np0 in range(p.npe)]
+
+        self.nps_ir = []
+        for ir0 in range(1,p.ixr + 1):
+            nps = []
+            for jr0 in range(1,p.jxr + 1):
+                np0 = p.np_ijr[ir0-1,jr0-1]
+                if ir0 == p.ir[np0] and jr0 == p.jr[np0]:
+                    nps.append(int(np0))
+            self.nps_ir.append(nps)
+        self.nps = [np0 for nps in self.nps_ir for np0 in nps]
+
+        self.nps_mpi = [[int(np0) for np0 in np.where(p.ir - 1 == ixrt)[0] if p.iixl[np0] != 0] \
+                        for ixrt in range(p.ixr)]
+
+        # directory layout of remap/qq/
+        if os.path.isdir(p.datadir + "remap/qq/00000/"):
+            self.prefix = [p.datadir+"remap/qq/"+'{0:05d}'.format(np0//1000)+"/"+'{0:08d}'.format(np0)+"/qq.dac." \
+                           for np0 in range(p.npe)]
+        else:
+            # directoryを分けない古いバージョン対応
+            self.prefix = [p.datadir+"remap/qq/qq.dac."]*p.npe
+        self.postfix = ["."+'{0:08d}'.format(np0) for np0 in range(p.npe)]
+
+        self.stores = {}
+
+    def filepath(self,n,np0):
+        """
+        Returns file path of remap/qq/
+
+        Parameters
+        ----------
+        n : int
+            time step
+        np0 : int
+            MPI process number
+        """
+        return self.prefix[np0] + '{0:08d}'.format(n) + self.postfix[np0]
+
+class _LazyRemap:
+    """
+    Accessor returned by :meth:`pyR2D2.FullData.at` and the other remap readers.
+    Each variable is read on first attribute access
+    """
+    def __init__(self, reader, args, kwargs):
+        self._reader = reader
+        self._args = args
+        self._kwargs = kwargs
+
+    def __getattr__(self, name):
+        reader = self._reader
+        if name.startswith('_') or name not in reader.remap_kind + reader.remap_kind_add:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+        pos = reader._value_position
+        if len(self._args) >= pos:
+            reader.read(*self._args[:pos], name, *self._args[pos:], **self._kwargs)
+        else:
+            reader.read(*self._args, value=name, **self._kwargs)
+
+        # the array is kept by this accessor and should not be overwritten by later reads
+        qq = reader.__dict__[name]
+        reader._pinned[id(qq)] = qq
+        self.__dict__[name] = qq
+
+        return qq
+
+    def __dir__(self):
+        return self._reader.remap_kind + self._reader.remap_kind_add
+
 class _BaseReader:
     """
     Base class for data readers
@@ -18,55 +154,382 @@ class _BaseRemapReader(_BaseReader):
     """
     Base class for remap data readers
     """
+    # position of value argument in read method
+    _value_position = 1
+
     def __init__(self, data):
         self.data = data
         
         for key in self.data.remap_kind + self.data.remap_kind_add:
             self.__dict__[key] = None
+
+        # arrays that are held by accessors or callers and must not be reused
+        self._pinned = weakref.WeakValueDictionary()
             
         self._add_docstring()
+
+    def at(self, *args, **kwargs):
+        """
+        Returns an accessor whose variables are read on first attribute access
+
+        Parameters
+        ----------
+        args, kwargs
+            Arguments of read method except value
+
+        Examples
+        --------
+        .. code-block:: python
+
+            ro = d.qf.at(n).ro
+            vx = d.qz.at(zs, n).vx
+
+        Notes
+        -----
+        With pyR2D2.Data.cache enabled, a repeated access of the same
+        step, variable, and region is served from memory.
+        """
+        return _LazyRemap(self, args, kwargs)
+
+    @property
+    def _plan(self):
+        """
+        Read plan of remap/qq/ cached on pyR2D2.Parameters
+        """
+        p = self.data.p
+        if '_remap_plan' not in p.__dict__:
+            p._remap_plan = _RemapPlan(p)
+
+        return p._remap_plan
                 
-    def _allocate_remap_qq(self, ijk: tuple):
+    def _get_out(self, ijk: tuple, values: list, out=None):
         """
-        Paramters
-        ---------
-        qq_type : str
-            type of data. 
+        Checks caller-supplied arrays
 
+        Parameters
+        ----------
         ijk : tuple
             size of data
+        values : list
+            kinds of values to be read
+        out : dict or numpy.ndarray
+            caller-supplied arrays for each value. A numpy.ndarray is accepted for a single value
+
+        Returns
+        -------
+        out : dict
+            caller-supplied arrays for each value
         """
-        memflag = True
-        if self.ro is not None:
-            memflag = not self.ro.shape == ijk
-        if self.ro is None or memflag:
-            for key in self.remap_kind + self.remap_kind_add:
-                self.__dict__[key] = np.zeros(ijk)
-                
+        if isinstance(out, np.ndarray):
+            if len(values) != 1:
+                raise ValueError('out should be a dict when several values are read')
+            out = {values[0]: out}
+        if out is None:
+            out = {}
+
+        for key in out:
+            if out[key].shape != tuple(ijk):
+                raise ValueError('out['+key+'] should have shape '+str(tuple(ijk))+', not '+str(out[key].shape))
+
+        return out
+
+    def _allocate_remap_qq(self, ijk: tuple, values: list, dtype=np.float32, out=None, reuse=True):
+        """
+        Allocates memory only for the requested values
+
+        Parameters
+        ----------
+        ijk : tuple
+            size of data
+        values : list
+            kinds of values to be allocated
+        dtype : numpy.dtype
+            data type of the allocated arrays
+        out : dict
+            caller-supplied arrays for each value
+        reuse : bool
+            If True, existing arrays with the same shape and dtype are reused
+        """
+        if out is None:
+            out = {}
+        ijk = tuple(ijk)
+        for key in values:
+            if key in out:
+                # the caller owns the array, which should not be overwritten by later reads
+                self.__dict__[key] = out[key]
+                self._pinned[id(out[key])] = out[key]
+                continue
+
+            qq = self.__dict__[key]
+            if not (reuse and isinstance(qq, np.ndarray) and qq.shape == ijk and qq.dtype == dtype) \
+               or self._pinned.get(id(qq)) is qq:
+                self.__dict__[key] = np.zeros(ijk, dtype=dtype)
+
+    def _read_values(self, n: int, region: tuple, ijk: tuple, values: list, read_ranks, dtype=np.float32, out=None, reuse=True, index=None):
+        """
+        Reads values through the cache of pyR2D2.Data
+
+        Parameters
+        ----------
+        n : int
+            time step
+        region : tuple
+            indices that identify the region read by the reader
+        ijk : tuple
+            size of data
+        values : list
+            kinds of values to be read
+        read_ranks : callable
+            function of a list of values, which reads them from files to the allocated arrays
+        dtype, out, reuse
+            See :meth:`_allocate_remap_qq`
+        index : tuple
+            int or slice in global indices for each direction.
+            If given and the consolidated store of the time step exists,
+            the values are read from the store instead of read_ranks.
+            See :mod:`pyR2D2.store`
+        """
+        out = self._get_out(ijk, values, out)
+        cache = self.data.cache
+
+        hits = {}
+        values_read = []
+        if cache.max_bytes > 0:
+            signature = self._step_signature(n)
+            keys = {value: (type(self).__name__, n, region, value, np.dtype(dtype).str, signature) for value in values}
+            for value in values:
+                qq = cache.get(keys[value])
+                if qq is None:
+                    values_read.append(value)
+                else:
+                    hits[value] = qq
+        else:
+            values_read = list(values)
+
+        # cached arrays are read-only and copied to the arrays of the reader
+        self._allocate_remap_qq(ijk, list(hits) + values_read, dtype=dtype, out=out, reuse=reuse)
+        for value, qq in hits.items():
+            self.__dict__[value][...] = qq
+
+        if len(values_read) == 0:
+            return
+
+        store = None if index is None else open_store(self.datadir, n, cache=self._plan.stores)
+        if store is None:
+            read_ranks(values_read)
+        else:
+            for value in values_read:
+                store.read(value, index, out=self.__dict__[value])
+
+        if cache.max_bytes > 0:
+            for value in values_read:
+                cache.put(keys[value], self.__dict__[value])
+
+    def _step_signature(self, n):
+        """
+        Returns size and mtime of the files of a time step, which are
+        a part of the cache key so that rewritten files are not served from the cache
+
+        Parameters
+        ----------
+        n : int
+            time step
+
+        Returns
+        -------
+        signature : tuple
+            (size, mtime_ns) of the consolidated store and remap/qq/ files.
+            None for a file that does not exist
+        """
+        plan = self._plan
+        signature = []
+        for path in [_store_filepath(self.datadir, n)] + [plan.filepath(n,np0) for np0 in plan.nps]:
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                signature.append(None)
+
+        return tuple(signature)
+
+    def _map_ranks(self, func, nps, workers=None):
+        """
+        Applies func to every MPI process in nps, optionally with a thread pool
+
+        Parameters
+        ----------
+        func : callable
+            function of MPI process number, which reads a file and
+            writes to the preallocated destination
+        nps : list
+            list of MPI process numbers
+        workers : int
+            number of threads. See :func:`pyR2D2.data_io.read._get_workers`
+
+        Notes
+        -----
+        Each MPI process writes to its own part of the destination,
+        so the result does not depend on the number of threads.
+        """
+        workers = _get_workers(workers)
+        if workers == 1 or len(nps) <= 1:
+            for np0 in nps:
+                func(np0)
+        else:
+            with ThreadPoolExecutor(max_workers=min(workers,len(nps))) as executor:
+                # list() is required to propagate exceptions
+                list(executor.map(func, nps))
+
+    def _get_values_input(self, value):
+        """
+        Converts value argument of read methods to a list of variables
+
+        Parameters
+        ----------
+        value : str or list
+            Kind of value, list of kinds, or 'all'
+
+        Returns
+        -------
+        values_input : list
+            list of kinds of values. None if an unknown kind is included
+        """
+        if type(value) == str:
+            if value == 'all':
+                values_input = self.remap_kind + self.remap_kind_add
+            else:
+                values_input = [value]
+        if type(value) == list:
+            values_input = value
+
+        for value in values_input:
+            if value not in self.remap_kind + self.remap_kind_add:
+                print('######')
+                print('value =',value)
+                print('value should be one of ',self.remap_kind+self.remap_kind_add)
+                print('return')
+                return None
             
-    def _dtype_remap_qq(self,np0):
+        return values_input
+
+    def _memmap_remap_qq(self,n,np0):
+        """
+        returns memory-mapped view of remap/qq/
+        Only the bytes accessed through the view are read from disk
+
+        Parameters
+        ----------
+        n : int
+            time step
+        np0 : int
+            MPI process number
+
+        Returns
+        -------
+        qqq : numpy.memmap, float
+            zero-copy view of shape (iixl, jjxl, kx, mtype+3) in Fortran order.
+            The last index follows remap_kind + remap_kind_add
+        """
+        plan = self._plan
+        qqq = np.memmap(plan.filepath(n,np0), dtype=plan.dtype, mode='r', shape=plan.shape[np0] + (len(plan.values),), order='F')
+
+        return qqq
+
+    def _offset_remap_qq(self,np0,value,k0=0):
         """
-        returns dtype of remap/qq/
+        returns byte offset of a variable in remap/qq/
+        Each variable is a contiguous (iixl, jjxl, kx) block in Fortran order
 
         Parameters
         ----------
         np0 : int
             MPI process number
+        value : str
+            Kind of value, one of remap_kind + remap_kind_add
+        k0 : int
+            first k plane of the block
 
         Returns
         -------
-            dtype : np.dtype
-                data type of remap/qq/
-        """
-        dtype=np.dtype([ \
-                ("qq",self.endian + str(self.mtype*self.iixl[np0]*self.jjxl[np0]*self.kx)+"f"),\
-                ("pr",self.endian + str(self.iixl[np0]*self.jjxl[np0]*self.kx)+"f"),\
-                ("te",self.endian + str(self.iixl[np0]*self.jjxl[np0]*self.kx)+"f"),\
-                ("op",self.endian + str(self.iixl[np0]*self.jjxl[np0]*self.kx)+"f"),\
-        ])
+        offset : int
+            byte offset from the head of the file
+        """
+        plan = self._plan
         
-        return dtype
+        return int(plan.offset[np0,plan.index[value]] + k0*plan.plane[np0])
+
+    def _read_remap_qq(self,n,np0,value,k0=0,k1=None):
+        """
+        Reads a single variable from remap/qq/ with one seek and one contiguous read
+
+        Parameters
+        ----------
+        n : int
+            time step
+        np0 : int
+            MPI process number
+        value : str
+            Kind of value, one of remap_kind + remap_kind_add
+        k0, k1 : int
+            first and last k plane to be read. If k1 is None, all planes from k0 are read
+
+        Returns
+        -------
+        qq : numpy.ndarray, float
+            data of shape (iixl, jjxl, k1-k0+1)
+        """
+        plan = self._plan
+        if k1 is None:
+            k1 = plan.kx - 1
+        shape = plan.shape[np0][:2] + (k1 - k0 + 1,)
+        qq = np.fromfile(plan.filepath(n,np0), dtype=plan.dtype, \
+                         count=shape[0]*shape[1]*shape[2], offset=self._offset_remap_qq(np0,value,k0))
         
+        return qq.reshape(shape, order='F')
+
+    def _read_box(self,n,value,index,out):
+        """
+        Reads a box of a variable to out.
+        Attributes of the reader are not modified, so that this method can be
+        called from multiple threads, e.g., by dask through the xarray backend
+
+        Parameters
+        ----------
+        n : int
+            time step
+        value : str
+            Kind of value, one of remap_kind + remap_kind_add
+        index : tuple
+            slices with step 1 in global indices for x, y, and z directions
+        out : numpy.ndarray
+            array of the box size to store the output
+
+        Returns
+        -------
+        out : numpy.ndarray
+            array to which the box is written
+        """
+        if out.size == 0:
+            return out
+
+        store = open_store(self.datadir, n, cache=self._plan.stores)
+        if store is not None:
+            return store.read(value, index, out=out)
+
+        plan = self._plan
+        (i0, i1, _), (j0, j1, _), (k0, k1, _) = [idx.indices(s) for idx, s in zip(index, (self.ix, self.jx, self.kx))]
+        for np0 in plan.nps:
+            iss, iee = plan.islice[np0].start, plan.islice[np0].stop
+            jss, jee = plan.jslice[np0].start, plan.jslice[np0].stop
+            ia, ib = max(i0, iss), min(i1, iee)
+            ja, jb = max(j0, jss), min(j1, jee)
+            if ia >= ib or ja >= jb:
+                continue
+            out[ia-i0:ib-i0, ja-j0:jb-j0, :] = \
+                self._read_remap_qq(n,np0,value,k0,k1-1)[ia-iss:ib-iss, ja-jss:jb-jss, :]
+
+        return out
+
     def _get_filepath_remap_qq(self,n,np0):
         '''
         get file path of remap/qq/
@@ -83,16 +546,13 @@ class _BaseRemapReader(_BaseReader):
         filepath : str
             file path of remap/qq/
         '''            
-        if os.path.isdir(self.datadir + "remap/qq/00000/"):
-            cnou = '{0:05d}'.format(np0//1000)
-            cno  = '{0:08d}'.format(np0)
-            filepath = self.datadir+"remap/qq/"+cnou+"/"+cno+"/qq.dac."+'{0:08d}'.format(n)+"."+'{0:08d}'.format(np0)
-        else:
-            # directoryを分けない古いバージョン対応
-            filepath = self.datadir+"remap/qq/qq.dac."+'{0:08d}'.format(n)+"."+'{0:08d}'.format(np0)
-        return filepath
+        return self._plan.filepath(n,np0)
     
     def _add_docstring(self):
+        # the docstring is generated once per class
+        if '_docstring_generated' in self.__class__.__dict__:
+            return
+
         docstring = "\n"
         docstring += "    Attributes\n"
         docstring += "    ----------\n"
@@ -122,6 +582,7 @@ class _BaseRemapReader(_BaseReader):
         docstring += "        opacity\n"
         
         self.__class__.__doc__ = self.__class__.__doc__ + docstring
+        self.__class__._docstring_generated = True
     
 class XSelect(_BaseRemapReader):
     """
@@ -132,7 +593,9 @@ class XSelect(_BaseRemapReader):
     pyR2D2.Data class can access this class as :code:`pyR2D2.Data.qx`
     
     """
-    def read(self,xs: float,n: int):
+    _value_position = 2
+
+    def read(self,xs: float,n: int, value='all', dtype=np.float32, out=None, workers=None):
         """
         Reads 2D selected data at a certain x
 
@@ -142,34 +605,38 @@ class XSelect(_BaseRemapReader):
             A selected height for data
         n : int 
             A selected time step for data
-        verbose : bool
-            False suppresses a message of store            
+        value : str or list
+            Kind of value. See :meth:`pyR2D2.FullData.read` for options
+        dtype : numpy.dtype
+            Data type of the output. The data on disk is float32
+        out : dict or numpy.ndarray
+            Arrays to store the output, e.g., to reuse memory across time steps
+        workers : int
+            Number of threads for reading files.
+            If None, environment variable PYR2D2_WORKERS is used (default 1)
         """
 
         i0 = np.argmin(np.abs(self.x - xs))
         ir0 = self.i2ir[i0]
             
-        self._allocate_remap_qq(ijk = [self.jx, self.kx])
-                
-        for jr0 in range(1,self.jxr+1):
-            np0 = self.np_ijr[ir0-1,jr0-1]
-    
-            if jr0 == self.jr[np0]:
-                dtype = self._dtype_remap_qq(np0)
-                filepath = self._get_filepath_remap_qq(n,np0)
-                
-                with open(filepath,'rb') as f:
-                    qqq = np.fromfile(f,dtype=dtype,count=1)
-                    for key, m in zip( self.remap_kind, range(self.mtype) ):
-                        self.__dict__[key][self.jss[np0]:self.jee[np0]+1,:] = \
-                                qqq["qq"].reshape((self.iixl[np0], self.jjxl[np0], self.kx, self.mtype), order="F")[i0-self.iss[np0],:,:,m]
-        
-                    for key in self.remap_kind_add:
-                        self.__dict__[key][self.jss[np0]:self.jee[np0]+1,:] = \
-                                qqq[key].reshape((self.iixl[np0], self.jjxl[np0], self.kx),order="F")[i0-self.iss[np0],:,:]
+        values_input = self._get_values_input(value)
+        if values_input is None:
+            return
+
+        plan = self._plan
+        def _read_ranks(values):
+            def _read_rank(np0):
+                qqq = self._memmap_remap_qq(n,np0)
+                for value in values:
+                    self.__dict__[value][plan.jslice[np0],:] = qqq[i0-plan.islice[np0].start,:,:,plan.index[value]]
+
+            self._map_ranks(_read_rank, plan.nps_ir[ir0-1], workers)
 
-                self.info = {}
-                self.info['xs'] = self.x[i0]
+        self._read_values(n, (i0,), [self.jx, self.kx], values_input, _read_ranks, dtype=dtype, out=out, \
+                         index=(i0, slice(None), slice(None)))
+
+        self.info = {}
+        self.info['xs'] = self.x[i0]
 
 class ZSelect(_BaseRemapReader):
     '''
@@ -180,7 +647,9 @@ class ZSelect(_BaseRemapReader):
     pyR2D2.Data class can access this class as :code:`pyR2D2.Data.qz`
     
     '''
-    def read(self, zs: float, n: int):
+    _value_position = 2
+
+    def read(self, zs: float, n: int, value='all', dtype=np.float32, out=None, workers=None):
         '''
         Reads 2D slice data at constant z
         The data is stored in self.qz dictionary
@@ -191,31 +660,39 @@ class ZSelect(_BaseRemapReader):
             A selected z for data
         n : int
             A selected time step for data
+        value : str or list
+            Kind of value. See :meth:`pyR2D2.FullData.read` for options
+        dtype : numpy.dtype
+            Data type of the output. The data on disk is float32
+        out : dict or numpy.ndarray
+            Arrays to store the output, e.g., to reuse memory across time steps
+        workers : int
+            Number of threads for reading files.
+            If None, environment variable PYR2D2_WORKERS is used (default 1)
             
+        Notes
+        -----
+        Only the k-plane at zs of the requested values is read from each file.
         '''
         k0 = np.argmin(np.abs(self.z-zs))
         
-        self._allocate_remap_qq( ijk = [self.ix, self.jx])
+        values_input = self._get_values_input(value)
+        if values_input is None:
+            return
         
-        for ir0 in range(1,self.ixr + 1):
-            for jr0 in range(1,self.jxr + 1):
-                np0 = self.np_ijr[ir0-1,jr0-1]
-
-                dtype = self._dtype_remap_qq(np0)
-                filepath = self._get_filepath_remap_qq(n,np0)
-                
-                with open(filepath,'rb') as f:
-                    qqq = np.fromfile(f,dtype=dtype,count=1)
-                    for key, m in zip( self.remap_kind, range(self.mtype) ):
-                        self.__dict__[key][self.iss[np0]:self.iee[np0]+1,self.jss[np0]:self.jee[np0]+1] \
-                                = qqq["qq"].reshape((self.iixl[np0], self.jjxl[np0], self.kx, self.mtype), order="F")[:,:,k0,m]
-
-                    for key in self.remap_kind_add:
-                        self.__dict__[key][self.iss[np0]:self.iee[np0]+1,self.jss[np0]:self.jee[np0]+1] \
-                                = qqq[key].reshape((self.iixl[np0], self.jjxl[np0], self.kx), order="F")[:,:,k0]            
+        plan = self._plan
+        def _read_ranks(values):
+            def _read_rank(np0):
+                for value in values:
+                    self.__dict__[value][plan.islice[np0],plan.jslice[np0]] = self._read_remap_qq(n,np0,value,k0,k0)[:,:,0]
                     
-            self.info = {}
-            self.info['zs'] = self.z[k0]
+            self._map_ranks(_read_rank, plan.nps, workers)
+
+        self._read_values(n, (k0,), [self.ix, self.jx], values_input, _read_ranks, dtype=dtype, out=out, \
+                         index=(slice(None), slice(None), k0))
+
+        self.info = {}
+        self.info['zs'] = self.z[k0]
             
 class MPIRegion(_BaseRemapReader):
     '''
@@ -226,7 +703,9 @@ class MPIRegion(_BaseRemapReader):
     pyR2D2.Data class can access this class as :code:`pyR2D2.Data.qm`
     
     '''
-    def read(self,ixrt,n):
+    _value_position = 2
+
+    def read(self,ixrt,n,value='all',dtype=np.float32,out=None,workers=None):
         '''
         Reads 3D data at a selected a MPI process in x-direction.
         corrensponding to ixr-th region in remap coordinate
@@ -241,29 +720,34 @@ class MPIRegion(_BaseRemapReader):
             
         n : int
             A selected time step for data
-        verbose : bool
-            False suppresses a message of store
+        value : str or list
+            Kind of value. See :meth:`pyR2D2.FullData.read` for options
+        dtype : numpy.dtype
+            Data type of the output. The data on disk is float32
+        out : dict or numpy.ndarray
+            Arrays to store the output, e.g., to reuse memory across time steps
+        workers : int
+            Number of threads for reading files.
+            If None, environment variable PYR2D2_WORKERS is used (default 1)
         '''
-        # corresponding MPI process
-        nps = np.where(self.ir - 1 == ixrt)[0]
+        values_input = self._get_values_input(value)
+        if values_input is None:
+            return
+
         # correnponding i range
         self.i_ixrt = np.where(self.i2ir - 1 == ixrt)[0]
         
-        self._allocate_remap_qq( ijk = [len(self.i_ixrt),self.jx,self.kx])
+        plan = self._plan
+        def _read_ranks(values):
+            def _read_rank(np0):
+                for value in values:
+                    self.__dict__[value][:,plan.jslice[np0],:] = self._read_remap_qq(n,np0,value)
                 
-        for np0 in nps:
-            if self.iixl[np0] != 0:
-                dtype = self._dtype_remap_qq(np0)
-                filepath = self._get_filepath_remap_qq(n,np0)
-                                
-                with open(filepath,'rb') as f:
-                    qqq = np.fromfile(f,dtype=dtype,count=1)
-                    for key, m in zip( self.remap_kind, range(self.mtype) ):
-                        self.__dict__[key][:,self.jss[np0]:self.jee[np0]+1,:] = qqq["qq"].reshape((self.iixl[np0],self.jjxl[np0],self.kx,self.mtype),order="F")[:,:,:,m]
+            # corresponding MPI process
+            self._map_ranks(_read_rank, plan.nps_mpi[ixrt], workers)
 
-                    
-                    for key in self.remap_kind_add:
-                        self.__dict__[key][:,self.jss[np0]:self.jee[np0]+1,:] = qqq[key].reshape((self.iixl[np0],self.jjxl[np0],self.kx),order="F")[:,:,:]
+        self._read_values(n, (ixrt,), [len(self.i_ixrt),self.jx,self.kx], values_input, _read_ranks, dtype=dtype, out=out, \
+                         index=(slice(self.i_ixrt[0], self.i_ixrt[-1] + 1), slice(None), slice(None)))
             
 class FullData(_BaseRemapReader):
     '''
@@ -274,7 +758,7 @@ class FullData(_BaseRemapReader):
     pyR2D2.Data class can access this class as :code:`pyR2D2.Data.qf`
     
     '''
-    def read(self, n: int, value):
+    def read(self, n: int, value, dtype=np.float32, out=None, workers=None):
         '''
         Reads 3D full data
         The data is stored in self.qq dictionary
@@ -292,49 +776,35 @@ class FullData(_BaseRemapReader):
                 - "ph": div B cleaning
                 - "te": temperature
                 - "op": Opacity
+        dtype : numpy.dtype
+            Data type of the output. The data on disk is float32.
+            Use numpy.float64 to upcast
+        out : dict or numpy.ndarray
+            Arrays to store the output, e.g., to reuse memory across time steps
+        workers : int
+            Number of threads for reading files.
+            If None, environment variable PYR2D2_WORKERS is used (default 1)
+
         Notes
         -----
-        If value is 'all', all values are read            
+        If value is 'all', all values are read.
+        Only the blocks of the requested values are read from each file.
         '''
         
-        if type(value) == str:
-            if value == 'all':
-                values_input = self.remap_kind + self.remap_kind_add
-            else:
-                values_input = [value]
-        if type(value) == list:
-            values_input = value
-
-        for value in values_input:
-            if value not in self.p.remap_kind + self.p.remap_kind_add:
-                print('######')
-                print('value =',value)
-                print('value should be one of ',self.p.remap_kind+self.p.remap_kind_add)
-                print('return')
-                return
-        
+        values_input = self._get_values_input(value)
+        if values_input is None:
+            return
         
-        self._allocate_remap_qq(ijk = [self.ix, self.jx, self.kx])
-
-        for ir0 in range(1,self.ixr + 1):
-            for jr0 in range(1,self.jxr + 1):
-                np0 = self.np_ijr[ir0-1,jr0-1]
-                if ir0 == self.ir[np0] and jr0 == self.jr[np0]:
-
-                    dtype = self._dtype_remap_qq(np0)                    
-                    filepath = self._get_filepath_remap_qq(n,np0)
+        plan = self._plan
+        def _read_ranks(values):
+            def _read_rank(np0):
+                for value in values:
+                    self.__dict__[value][plan.islice[np0],plan.jslice[np0],:] = self._read_remap_qq(n,np0,value)
                     
-                    with open(filepath,'rb') as f:
-                        qqq = np.fromfile(f,dtype=dtype,count=1)
-
-                        for value in values_input:
-                            if value in self.p.remap_kind:
-                                m = self.p.remap_kind.index(value)
-                                self.__dict__[value][self.iss[np0]:self.iee[np0]+1,self.jss[np0]:self.jee[np0]+1,:] \
-                                    = qqq["qq"].reshape((self.iixl[np0],self.jjxl[np0],self.kx,self.mtype),order="F")[:,:,:,m]
-                            else:
-                                self.__dict__[value][self.iss[np0]:self.iee[np0]+1,self.jss[np0]:self.jee[np0]+1,:] \
-                                    = qqq[value].reshape((self.iixl[np0],self.jjxl[np0],self.kx),order="F")[:,:,:]
+            self._map_ranks(_read_rank, plan.nps, workers)
+
+        self._read_values(n, (), [self.ix, self.jx, self.kx], values_input, _read_ranks, dtype=dtype, out=out, \
+                         index=(slice(None), slice(None), slice(None)))
 
 class RestrictedData(_BaseRemapReader):
     '''
@@ -345,7 +815,7 @@ class RestrictedData(_BaseRemapReader):
     pyR2D2.Data class can access this class as :code:`pyR2D2.Data.qr`
     
     '''
-    def read(self,n: int, value, x0: float, x1: float, y0: float, y1: float, z0: float, z1: float):
+    def read(self,n: int, value, x0: float, x1: float, y0: float, y1: float, z0: float, z1: float, dtype=np.float32, out=None, workers=None):
         '''
         Reads 3D restricted-area data
         The data is stored in self.qr dictionary
@@ -361,6 +831,13 @@ class RestrictedData(_BaseRemapReader):
             Minimum x, y, z
         x1, y1, z1 : float
             Maximum x, y, z
+        dtype : numpy.dtype
+            Data type of the output. The data on disk is float32
+        out : dict or numpy.ndarray
+            Arrays to store the output, e.g., to reuse memory across time steps
+        workers : int
+            Number of threads for reading files.
+            If None, environment variable PYR2D2_WORKERS is used (default 1)
         '''
                 
         i0, i1 = np.argmin(abs(self.x-x0)), np.argmin(abs(self.x-x1))
@@ -370,47 +847,37 @@ class RestrictedData(_BaseRemapReader):
         jxr = j1 - j0 + 1
         kxr = k1 - k0 + 1
         
-        if type(value) == str:
-            if value == 'all':
-                values_input = self.remap_kind + self.remap_kind_add
-            else:
-                values_input = [value]
-        if type(value) == list:
-            values_input = value
+        values_input = self._get_values_input(value)
+        if values_input is None:
+            return
         
-        for value in values_input:
-            self.__dict__[value] = np.zeros((ixr,jxr,kxr),dtype=np.float32)
-            
-        for ir0 in range(1,self.ixr+1):
-            for jr0 in range(1,self.jxr+1):
-                np0 = self.np_ijr[ir0-1,jr0-1]
+        plan = self._plan
+        nps = [np0 for np0 in plan.nps \
+               if not (plan.islice[np0].start > i1 or plan.islice[np0].stop <= i0 \
+                       or plan.jslice[np0].start > j1 or plan.jslice[np0].stop <= j0)]
+
+        def _read_ranks(values):
+            def _read_rank(np0):
+                iss, iee = plan.islice[np0].start, plan.islice[np0].stop - 1
+                jss, jee = plan.jslice[np0].start, plan.jslice[np0].stop - 1
+                isrt_rcv = max([0  ,iss-i0  ])
+                iend_rcv = min([ixr,iee-i0+1])
+                jsrt_rcv = max([0  ,jss-j0  ])
+                jend_rcv = min([jxr,jee-j0+1])
                 
-                if(not (self.iss[np0] > i1 or self.iee[np0] < i0 or self.jss[np0] > j1 or self.jee[np0] < j0) ):
+                isrt_snd = isrt_rcv - (iss-i0)
+                iend_snd = isrt_snd + (iend_rcv - isrt_rcv)
+                jsrt_snd = jsrt_rcv - (jss-j0)
+                jend_snd = jsrt_snd + (jend_rcv - jsrt_rcv)
+
+                for value in values:
+                    self.__dict__[value][isrt_rcv:iend_rcv,jsrt_rcv:jend_rcv,:] = \
+                        self._read_remap_qq(n,np0,value,k0,k1)[isrt_snd:iend_snd,jsrt_snd:jend_snd,:]
                     
-                    dtype = self._dtype_remap_qq(np0)
-                    filepath = self._get_filepath_remap_qq(n,np0)
-
-                    with open(filepath,'rb') as f:
-                        qqq = np.fromfile(f,dtype=dtype,count=1)
-
-                        for value in values_input:
-                            if value in self.p.remap_kind:
-                                m = self.p.remap_kind.index(value)
-                                isrt_rcv = max([0  ,self.iss[np0]-i0  ])
-                                iend_rcv = min([ixr,self.iee[np0]-i0+1])
-                                jsrt_rcv = max([0  ,self.jss[np0]-j0  ])
-                                jend_rcv = min([jxr,self.jee[np0]-j0+1])
-                                
-                                isrt_snd = isrt_rcv - (self.iss[np0]-i0)
-                                iend_snd = isrt_snd + (iend_rcv - isrt_rcv)
-                                jsrt_snd = jsrt_rcv - (self.jss[np0]-j0)
-                                jend_snd = jsrt_snd + (jend_rcv - jsrt_rcv)
-
-                                self.__dict__[value][isrt_rcv:iend_rcv,jsrt_rcv:jend_rcv,:] = \
-                                    qqq["qq"].reshape((self.iixl[np0],self.jjxl[np0],self.kx, self.mtype),order="F")[isrt_snd:iend_snd,jsrt_snd:jend_snd,k0:k1+1,m]
-                            else:
-                                self.__dict__[value][isrt_rcv:iend_rcv,jsrt_rcv:jend_rcv,:] = \
-                                    qqq[value].reshape((self.iixl[np0],self.jjxl[np0],self.kx),order="F")[isrt_snd:iend_snd,jsrt_snd:jend_snd,k0:k1+1]                         
+            self._map_ranks(_read_rank, nps, workers)
+
+        self._read_values(n, (i0,i1,j0,j1,k0,k1), [ixr,jxr,kxr], values_input, _read_ranks, dtype=dtype, out=out, reuse=False, \
+                         index=(slice(i0, i1 + 1), slice(j0, j1 + 1), slice(k0, k1 + 1)))
 
 class OpticalDepth(_BaseReader):
     '''
@@ -459,12 +926,14 @@ class OpticalDepth(_BaseReader):
     def __init__(self, data):
         self.data = data
         self.value_keys = ['rt','ro','se','pr','te','vx','vy','vz','bx','by','bz','he','fr']
+        self.taus = [1, 0.1, 0.01]
+        self.tau_suffixes = ['','01','001']
         
         for key in self.value_keys:
-            for tau in ['','01','001']:
+            for tau in self.tau_suffixes:
                 self.__dict__[key+tau] = None
         
-    def read(self,n: int):
+    def read(self,n: int, value=None, tau=None, mmap=False):
         '''
         Reads 2D data at certain optical depths.
         The data is stored in self.qt dictionary.
@@ -474,16 +943,57 @@ class OpticalDepth(_BaseReader):
         ----------
         n : int
             A selected time step for data
+        value : str or list
+            Kind of value in self.value_keys, e.g., ['rt', 'bx'].
+            If None, all values are read
+        tau : float or list
+            Optical depths among 1, 0.1, and 0.01. If None, all optical depths are read
+        mmap : bool
+            If False (default), the values are writable arrays in memory.
+            If True, the values are read-only views of numpy.memmap, and only the
+            pages touched by later operations are read
+
+        Notes
+        -----
+        Values not requested keep the data of the previous read.
         '''
-        with open(self.datadir+"tau/qq.dac."+'{0:08d}'.format(n),"rb") as f:
-                qq = np.fromfile(f,self.endian + 'f',self.m_tu*self.m_in*self.jx*self.kx)
+        if value is None:
+            value = self.value_keys
+        elif isinstance(value, str):
+            value = [value]
+        if tau is None:
+            tau = self.taus
+        elif np.isscalar(tau):
+            tau = [tau]
 
-        for key, mk in zip(self.value_keys, range(len(self.value_keys))):
-            for tau, mt in zip(['','01','001'],range(3)):
-                self.__dict__[key+tau] = \
-                        qq.reshape((self.m_tu,self.m_in,self.jx,self.kx),order="F")[mt,mk,:,:]
+        for key in value:
+            if key not in self.value_keys:
+                print('######')
+                print('value =',key,' is not in optical depth data')
+                print('Options are: ' + ', '.join(self.value_keys))
+                print('######')
+                return
+        mts = []
+        for tu in tau:
+            if not np.any(np.isclose(self.taus, tu)):
+                print('######')
+                print('tau =',tu,' is not in optical depth data')
+                print('Options are:',self.taus)
+                print('######')
+                return
+            mts.append(int(np.argmax(np.isclose(self.taus, tu))))
+
+        qq = np.memmap(self.datadir+"tau/qq.dac."+'{0:08d}'.format(n), dtype=self.endian + 'f', mode='r', \
+                       shape=(self.m_tu,self.m_in,self.jx,self.kx), order="F")
+
+        for key in value:
+            mk = self.value_keys.index(key)
+            for mt in mts:
+                if mmap:
+                    self.__dict__[key+self.tau_suffixes[mt]] = qq[mt,mk,:,:]
+                else:
+                    self.__dict__[key+self.tau_suffixes[mt]] = np.array(qq[mt,mk,:,:])
 
-                
 class OnTheFly(_BaseReader):
     '''
     Class for on-the-fly analysis data
@@ -552,7 +1062,109 @@ class OnTheFly(_BaseReader):
 
             for m in range(self.m2d_spex):
                 self.__dict__[self.cl[m+self.m2d_xy + self.m2d_xz + self.m2d_flux]] = vl[:,:,m]
-    
+
+    def _layout(self):
+        '''
+        Returns file, shape, and index in the file of each variable
+
+        Returns
+        -------
+        layout : dict
+            key -> (file prefix, shape of a variable, index of the variable in the file)
+        '''
+        files = [('vl_xy', (self.ix, self.jx), self.m2d_xy),
+                 ('vl_xz', (self.ix, self.kx), self.m2d_xz),
+                 ('vl_flux', (self.ix+1, self.jx), self.m2d_flux)]
+        if self.geometry == 'YinYang':
+            files.append(('vl_spex', (self.ix, self.kx//4), self.m2d_spex))
+
+        layout = {}
+        m0 = 0
+        for prefix, shape, m2d in files:
+            for m in range(m2d):
+                layout[self.cl[m0 + m]] = (prefix, shape, m)
+            m0 += m2d
+
+        return layout
+
+    def read_series(self, n0, n1, keys=None, dtype=np.float32, mmap_dir=None, workers=None):
+        '''
+        Reads on the fly analysis data from n0 to n1 and stacks them in time
+
+        Parameters
+        ----------
+        n0, n1 : int
+            first and last time steps
+        keys : str or list
+            Kind of values in self.cl. If None, all values are read
+        dtype : numpy.dtype
+            Data type of the output. The data on disk is float32
+        mmap_dir : str
+            If given, the output is numpy.memmap of .npy files in this directory,
+            e.g., on a local scratch for series larger than memory
+        workers : int
+            Number of threads for reading files.
+            If None, environment variable PYR2D2_WORKERS is used (default 1)
+
+        Returns
+        -------
+        vc : dict
+            key -> numpy.ndarray of shape (..., n1-n0+1) in Fortran order
+
+        Notes
+        -----
+        Only the block of each requested variable is read from each file.
+
+        Examples
+        --------
+        .. code-block:: python
+
+            vc = d.vc.read_series(0, d.nd, keys=['vxrms', 'fe'])
+            vxrms_mean = vc['vxrms'].mean(axis=(1,2))
+        '''
+        layout = self._layout()
+        if keys is None:
+            keys = list(layout.keys())
+        elif isinstance(keys, str):
+            keys = [keys]
+
+        for key in keys:
+            if key not in layout:
+                print('######')
+                print(key + ' is not in on the fly analysis data')
+                print('Options are: ' + ', '.join(layout.keys()))
+                print('######')
+                return None
+
+        nt = n1 - n0 + 1
+        vc = {}
+        for key in keys:
+            shape = layout[key][1] + (nt,)
+            if mmap_dir is None:
+                vc[key] = np.empty(shape, dtype=dtype, order='F')
+            else:
+                os.makedirs(mmap_dir, exist_ok=True)
+                filename = os.path.join(mmap_dir, key + '.' + '{0:08d}'.format(n0) + '-' + '{0:08d}'.format(n1) + '.npy')
+                vc[key] = np.lib.format.open_memmap(filename, mode='w+', dtype=dtype, shape=shape, fortran_order=True)
+
+        def _read_step(n):
+            for key in keys:
+                prefix, shape, m = layout[key]
+                size = shape[0]*shape[1]
+                vl = np.fromfile(self.datadir + 'remap/vl/' + prefix + '.dac.' + '{0:08d}'.format(n), \
+                                 dtype=self.endian + 'f', count=size, offset=4*size*m)
+                vc[key][:,:,n - n0] = vl.reshape(shape, order='F')
+
+        workers = _get_workers(workers)
+        if workers == 1:
+            for n in range(n0, n1 + 1):
+                _read_step(n)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(_read_step, range(n0, n1 + 1)))
+
+        return vc
+
     def _update_json_template(self, output_file=os.path.dirname(os.path.abspath(__file__))+'/'+'OnTheFly.json'):
         '''
         Generate JSON template for pyR2D2.Parameters
@@ -584,6 +1196,10 @@ class OnTheFly(_BaseReader):
         if update_json:
             self._update_json_template(json_file)
 
+        # the docstring is generated once per class
+        if '_docstring_generated' in self.__class__.__dict__:
+            return
+
         gene_space = ''
         desc_space = ' '*4
         
@@ -605,6 +1221,7 @@ class OnTheFly(_BaseReader):
                 docstring += '\n'
             
         self.__class__.__doc__ = self.__class__.__doc__ + docstring
+        self.__class__._docstring_generated = True
 
     ##############################
 class Slice(_BaseReader):
@@ -647,7 +1264,51 @@ class Slice(_BaseReader):
         for key in self.data.remap_kind + self.data.remap_kind_add[:-1]:
             self.__dict__[key] = None          
             
-    def read(self, n_slice, direc, n):
+    def _postfixes(self):
+        if self.geometry == 'YinYang':
+            return ['_yin','_yan']
+        return ['']
+
+    def _shape(self, direc):
+        '''
+        Returns shape of a variable in a slice file
+        '''
+        if direc == 'x':
+            if self.geometry == 'YinYang':
+                return self.jx_yy + 2*self.margin, self.kx_yy+2*self.margin
+            return self.jx, self.kx
+        if direc == 'y':
+            return self.ix, self.kx
+        if direc == 'z':
+            return self.ix, self.jx
+
+    def _memmap(self, n_slice, direc, n, postfix=''):
+        '''
+        Returns numpy.memmap of a slice file of shape (n1, n2, mtype+2)
+        Each variable is a contiguous block
+        '''
+        n1, n2 = self._shape(direc)
+        return np.memmap(self.datadir + 'slice/qq'+direc+postfix
+                         +'.dac.'+'{0:08d}'.format(n)+'.'
+                         +'{0:08d}'.format(n_slice+1), dtype=self.endian+'f', mode='r', \
+                         shape=(n1,n2,self.mtype+2), order='F')
+
+    def _get_values_input(self, value):
+        keys = self.remap_kind + self.remap_kind_add[:-1]
+        if value is None:
+            return keys
+        if isinstance(value, str):
+            value = [value]
+        for key in value:
+            if key not in keys:
+                print('######')
+                print('value =',key,' is not in slice data')
+                print('Options are: ' + ', '.join(keys))
+                print('######')
+                return None
+        return value
+
+    def read(self, n_slice, direc, n, value=None, mmap=False, workers=None):
         '''
         Reads 2D data of slice.
         The data is stored in self.ql dictionary
@@ -660,38 +1321,107 @@ class Slice(_BaseReader):
             slice direction. 'x', 'y', or 'z'
         n : int
             a selected time step for data
+        value : str or list
+            Kind of value. If None, all values are read
+        mmap : bool
+            If True, the values are views of numpy.memmap and are read on access
+        workers : int
+            Number of threads for reading yin and yan files.
+            If None, environment variable PYR2D2_WORKERS is used (default 1)
         '''
+        values = self._get_values_input(value)
+        if values is None:
+            return
+        keys = self.remap_kind + self.remap_kind_add[:-1]
 
-        if self.geometry == 'YinYang':
-            postfixes = ['_yin','_yan']
+        def _read_file(postfix):
+            qq = self._memmap(n_slice, direc, n, postfix)
+            for key in values:
+                m = keys.index(key)
+                self.__dict__[key+postfix] = qq[:,:,m] if mmap else np.array(qq[:,:,m])
+
+        postfixes = self._postfixes()
+        workers = _get_workers(workers)
+        if workers == 1 or len(postfixes) == 1:
+            for postfix in postfixes:
+                _read_file(postfix)
         else:
-            postfixes = ['']
-        
+            with ThreadPoolExecutor(max_workers=len(postfixes)) as executor:
+                list(executor.map(_read_file, postfixes))
+
+        self.info = {}
+        self.info['direc'] = direc
+        if direc == 'x': slice = self.x_slice
+        if direc == 'y': slice = self.y_slice
+        if direc == 'z': slice = self.z_slice
+        self.info['slice'] = slice[n_slice]
+        self.info['n_slice'] = n_slice
+
+    def read_batch(self, n_slices, direc, steps, value=None, dtype=np.float32, workers=None):
+        '''
+        Reads slice data of many slices and time steps into stacked arrays
+
+        Parameters
+        ----------
+        n_slices : int or list
+            indices of slice
+        direc : str
+            slice direction. 'x', 'y', or 'z'
+        steps : int or list
+            time steps
+        value : str or list
+            Kind of value. If None, all values are read
+        dtype : numpy.dtype
+            Data type of the output. The data on disk is float32
+        workers : int
+            Number of threads for reading files.
+            If None, environment variable PYR2D2_WORKERS is used (default 1)
+
+        Returns
+        -------
+        qs : dict
+            key (with postfix _yin or _yan for Yin-Yang) -> numpy.ndarray of
+            shape (n1, n2, len(n_slices), len(steps)) in Fortran order
+
+        Examples
+        --------
+        .. code-block:: python
+
+            qs = d.qs.read_batch([0, 1], 'y', range(100, 200), value=['bx', 'te'], workers=8)
+            qs['te'][:,:,0,10] # first slice at time step 110
+        '''
+        values = self._get_values_input(value)
+        if values is None:
+            return
+        keys = self.remap_kind + self.remap_kind_add[:-1]
+        n_slices = np.atleast_1d(n_slices)
+        steps = np.atleast_1d(steps)
+
+        n1, n2 = self._shape(direc)
+        postfixes = self._postfixes()
+        qs = {}
         for postfix in postfixes:
-            with open(self.datadir + 'slice/qq'+direc+postfix
-                    +'.dac.'+'{0:08d}'.format(n)+'.'
-                    +'{0:08d}'.format(n_slice+1),'rb') as f:
-                if direc == 'x':
-                    if self.geometry == 'YinYang':
-                        n1, n2 = self.jx_yy + 2*self.margin, self.kx_yy+2*self.margin
-                    else:
-                        n1, n2 = self.jx, self.kx
-                if direc == 'y':
-                    n1, n2 = self.ix, self.kx
-                if direc == 'z':
-                    n1, n2 = self.ix, self.jx
-                qq = np.fromfile(f,self.endian+'f',(self.mtype+2)*n1*n2)
-        
-            for key, m in zip( self.remap_kind + self.remap_kind_add[:-1] , range(self.mtype + 2) ):
-                self.__dict__[key+postfix] = qq.reshape((n1,n2,self.mtype+2),order='F')[:,:,m]
-            self.info = {}
-            self.info['direc'] = direc
-            if direc == 'x': slice = self.x_slice
-            if direc == 'y': slice = self.y_slice
-            if direc == 'z': slice = self.z_slice
-            self.info['slice'] = slice[n_slice]
-            self.info['n_slice'] = n_slice
-                    
+            for key in values:
+                qs[key+postfix] = np.empty((n1, n2, len(n_slices), len(steps)), dtype=dtype, order='F')
+
+        def _read_file(args):
+            postfix, i_slice, i_step = args
+            qq = self._memmap(int(n_slices[i_slice]), direc, int(steps[i_step]), postfix)
+            for key in values:
+                qs[key+postfix][:,:,i_slice,i_step] = qq[:,:,keys.index(key)]
+
+        files = [(postfix, i_slice, i_step) for i_step in range(len(steps)) \
+                 for i_slice in range(len(n_slices)) for postfix in postfixes]
+        workers = _get_workers(workers)
+        if workers == 1:
+            for args in files:
+                _read_file(args)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(_read_file, files))
+
+        return qs
+
 class TwoDimension(_BaseReader):
     '''
     Class for 2D data
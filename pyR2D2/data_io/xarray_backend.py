@@ -0,0 +1,197 @@
+'''
+xarray backend for remap data of R2D2
+
+Variables in remap/qq/ are opened as lazily indexed arrays of dimensions
+(time, x, y, z). Only the MPI processes that overlap the requested region are read.
+With dask, one chunk corresponds to one region of MPI process at a time step.
+
+Examples
+--------
+.. code-block:: python
+
+    import xarray as xr
+    ds = xr.open_dataset(datadir, engine='r2d2', chunks={})
+    ds.ro.mean(dim=('y', 'time')).compute()
+
+Note
+----
+xarray and dask are optional dependencies of pyR2D2.
+The entry point is registered in setup.py. Without installation of pyR2D2,
+pass :class:`R2D2BackendEntrypoint` as the engine.
+'''
+import os
+
+import numpy as np
+import xarray as xr
+from xarray.backends import BackendArray, BackendEntrypoint
+from xarray.core import indexing
+
+class R2D2BackendArray(BackendArray):
+    '''
+    Lazily indexed array of a variable in remap/qq/
+
+    Attributes
+    ----------
+    shape : tuple
+        (nt, ix, jx, kx)
+    dtype : numpy.dtype
+        data type of the output
+    '''
+    def __init__(self, data, value, steps, dtype):
+        '''
+        Parameters
+        ----------
+        data : pyR2D2.Data
+            Instance of pyR2D2.Data
+        value : str
+            Kind of value, one of remap_kind + remap_kind_add
+        steps : numpy.ndarray
+            time steps
+        dtype : numpy.dtype
+            data type of the output
+        '''
+        self.data = data
+        self.value = value
+        self.steps = steps
+        self.shape = (len(steps), data.ix, data.jx, data.kx)
+        self.dtype = np.dtype(dtype)
+
+    def __getitem__(self, key):
+        return indexing.explicit_indexing_adapter(
+            key, self.shape, indexing.IndexingSupport.BASIC, self._raw_indexing_method)
+
+    def _raw_indexing_method(self, key):
+        steps = np.atleast_1d(self.steps[key[0]])
+
+        # the bounding box with step 1 is read, and then strided
+        box, sub = [], []
+        for idx, s in zip(key[1:], self.shape[1:]):
+            if isinstance(idx, slice):
+                r = range(*idx.indices(s))
+            else:
+                r = range(int(idx), int(idx) + 1)
+            if len(r) == 0:
+                box.append(slice(0, 0))
+                sub.append(slice(None) if isinstance(idx, slice) else 0)
+                continue
+            lo = min(r[0], r[-1])
+            box.append(slice(lo, max(r[0], r[-1]) + 1))
+            if isinstance(idx, slice):
+                stop = r[-1] - lo + np.sign(r.step)
+                sub.append(slice(r[0] - lo, stop if stop >= 0 else None, r.step))
+            else:
+                sub.append(0)
+
+        reader = self.data.qf
+        qq = np.empty((len(steps),) + tuple(b.stop - b.start for b in box), dtype=self.dtype)
+        for t, n in enumerate(steps):
+            reader._read_box(int(n), self.value, tuple(box), qq[t])
+
+        qq = qq[(slice(None),) + tuple(sub)]
+        if not isinstance(key[0], slice):
+            qq = qq[0]
+        return qq
+
+def _rank_chunks(slices, size):
+    '''
+    Returns chunk sizes along a direction from regions of MPI processes
+
+    Parameters
+    ----------
+    slices : list
+        slices in global index of MPI processes
+    size : int
+        size of the direction
+
+    Returns
+    -------
+    chunks : tuple or int
+        chunk sizes. If the regions do not tile the direction, size is returned
+    '''
+    bounds = sorted({(s.start, s.stop) for s in slices if s.stop > s.start})
+    if len(bounds) == 0 or bounds[0][0] != 0 or bounds[-1][1] != size \
+       or any(b0[1] != b1[0] for b0, b1 in zip(bounds[:-1], bounds[1:])):
+        return size
+    return tuple(b[1] - b[0] for b in bounds)
+
+class R2D2BackendEntrypoint(BackendEntrypoint):
+    '''
+    Backend entry point of xarray for R2D2 data
+
+    Examples
+    --------
+    .. code-block:: python
+
+        import xarray as xr
+        ds = xr.open_dataset(datadir, engine='r2d2', steps=range(10), values=['ro', 'vx'])
+    '''
+    description = 'Open remap data of R2D2 in xarray'
+    url = 'https://github.com/hottahd/R2D2_py'
+    open_dataset_parameters = ['filename_or_obj', 'drop_variables', 'steps', 'values', 'dtype']
+
+    def open_dataset(self, filename_or_obj, *, drop_variables=None, steps=None, values=None, dtype=np.float32):
+        '''
+        Opens remap/qq/ as xarray.Dataset
+
+        Parameters
+        ----------
+        filename_or_obj : str or pyR2D2.Data
+            data directory or instance of pyR2D2.Data
+        drop_variables : list
+            variables not to be opened
+        steps : list
+            time steps. If None, 0 to nd
+        values : list
+            Kind of values. If None, all values in remap/qq/
+        dtype : numpy.dtype
+            data type of the output. The data on disk is float32
+
+        Returns
+        -------
+        ds : xarray.Dataset
+            Dataset of dimensions (time, x, y, z)
+        '''
+        import pyR2D2
+
+        if isinstance(filename_or_obj, pyR2D2.Data):
+            data = filename_or_obj
+        else:
+            datadir = os.fspath(filename_or_obj)
+            data = pyR2D2.Data(os.path.join(datadir, ''))
+
+        if steps is None:
+            steps = range(data.nd + 1)
+        steps = np.asarray(steps, dtype=int)
+        if values is None:
+            values = data.remap_kind + data.remap_kind_add
+        if drop_variables is not None:
+            values = [value for value in values if value not in drop_variables]
+
+        plan = data.qf._plan
+        encoding = {'preferred_chunks': {'time': 1,
+                                         'x': _rank_chunks([plan.islice[np0] for np0 in plan.nps], data.ix),
+                                         'y': _rank_chunks([plan.jslice[np0] for np0 in plan.nps], data.jx),
+                                         'z': data.kx}}
+
+        dims = ('time', 'x', 'y', 'z')
+        variables = {}
+        for value in values:
+            array = indexing.LazilyIndexedArray(R2D2BackendArray(data, value, steps, dtype))
+            variables[value] = xr.Variable(dims, array, encoding=encoding)
+
+        # nan for steps without time/mhd/ file, as in pyR2D2.Data.times
+        times = data.times('mhd')
+        coords = {'time': ('time', np.array([times[n] if n < len(times) else np.nan for n in steps])),
+                  'step': ('time', steps),
+                  'x': ('x', data.x),
+                  'y': ('y', data.y),
+                  'z': ('z', data.z)}
+
+        return xr.Dataset(variables, coords=coords, attrs={'datadir': data.datadir})
+
+    def guess_can_open(self, filename_or_obj):
+        try:
+            datadir = os.fspath(filename_or_obj)
+        except TypeError:
+            return False
+        return os.path.isfile(os.path.join(datadir, 'param', 'nd.dac'))
@@ -0,0 +1,442 @@
+'''
+NumPy and Numba implementations of the kernels in fortran_src
+
+They are used when the shared libraries have not been built.
+Each function computes the same quantity with the same dtype as
+the corresponding Fortran kernel, and writes it into out, which is
+a Fortran-contiguous array prepared by the caller.
+'''
+import importlib.util
+
+import numpy as np
+
+MARGIN = 2
+
+def derv_coefficients(coord):
+    '''
+    Coefficients of fourth order derivative on inhomogeneous grid
+
+    Parameters
+    ----------
+    coord : numpy.ndarray, float
+        coordinate (1D)
+
+    Returns
+    -------
+    rk : numpy.ndarray, float32
+        coefficients for coord[i+2], coord[i+1], coord[i-1], coord[i-2] (4, n).
+        Zero at the margins
+    '''
+    x = np.asarray(coord, dtype=np.float32)
+    n = len(x)
+    rk = np.zeros((4, n), dtype=np.float32)
+    # differences are taken in single precision as in derv.f90
+    a = (x[4:] - x[2:-2]).astype(np.float64)
+    b = (x[3:-1] - x[2:-2]).astype(np.float64)
+    c = (x[2:-2] - x[1:-3]).astype(np.float64)
+    d = (x[2:-2] - x[:-4]).astype(np.float64)
+    rk[0, MARGIN:n-MARGIN] = (c*d - b*(c + d))/(a - b)/(a + c)/(a + d)
+    rk[1, MARGIN:n-MARGIN] = (a*(c + d) - c*d)/(a - b)/(b + c)/(b + d)
+    rk[2, MARGIN:n-MARGIN] = (b*d + a*(d - b))/(a + c)/(b + c)/(c - d)
+    rk[3, MARGIN:n-MARGIN] = (a*(b - c) - b*c)/(c - d)/(a + d)/(b + d)
+    return rk
+
+def interp_weights(x, xu):
+    '''
+    Location and distances of target coordinate xu in original coordinate x
+
+    Returns
+    -------
+    i0, i1 : int
+        range of xu inside x (xu[i0:i1])
+    loc : numpy.ndarray, int
+        index of x just below xu[i0:i1]
+    dx0, dx1 : numpy.ndarray, float
+        distances to x[loc] and x[loc+1]
+    '''
+    x = np.asarray(x, dtype=np.float64)
+    xu = np.asarray(xu, dtype=np.float64)
+    inside = np.nonzero((xu > x[0]) & (xu < x[-1]))[0]
+    if len(inside) == 0:
+        return 0, 0, np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+    i0, i1 = inside[0], inside[-1] + 1
+    loc = np.searchsorted(x, xu[i0:i1], side='right') - 1
+    dx0 = xu[i0:i1] - x[loc]
+    dx1 = x[loc + 1] - xu[i0:i1]
+    return i0, i1, loc, dx0, dx1
+
+def cartesian_coordinate(rr, n):
+    '''
+    Uniform cartesian coordinate covering -max(rr) to max(rr), as in geometry_convert.f90
+    '''
+    xmax = np.max(rr)
+    dxc = (xmax - (-xmax))/float(n - 1)
+    return np.cumsum(np.concatenate([[-xmax], np.full(n - 1, dxc)]))
+
+#######################################################
+# NumPy
+#######################################################
+
+def numpy_derivative(axis, coord, qq, out):
+    rk = derv_coefficients(coord)
+    n = qq.shape[axis]
+    shape = [1, 1, 1]
+    shape[axis] = n - 2*MARGIN
+    rk = rk[:, MARGIN:n-MARGIN].reshape((4,) + tuple(shape))
+
+    def sl(shift):
+        index = [slice(None)]*3
+        index[axis] = slice(MARGIN + shift, n - MARGIN + shift)
+        return tuple(index)
+
+    index = [slice(None)]*3
+    for edge in [slice(None, MARGIN), slice(n - MARGIN, None)]:
+        index[axis] = edge
+        out[tuple(index)] = 0.
+
+    inner = out[sl(0)]
+    np.multiply(rk[0], qq[sl(2)], out=inner)
+    inner += rk[1]*qq[sl(1)]
+    inner += rk[2]*qq[sl(-1)]
+    inner += rk[3]*qq[sl(-2)]
+    return out
+
+def numpy_interp(x, y, z, xu, yu, zu, qq, out):
+    out[...] = 0.
+    weights = [interp_weights(c, cu) for c, cu in ((x, xu), (y, yu), (z, zu))]
+    return numpy_interp_apply(weights, qq, out)
+
+def numpy_interp_apply(weights, qq, out):
+    '''
+    Interpolation with weights from interp_weights. Only the points inside the original domain are written
+    '''
+    (i0, i1, iloc, dx0, dx1), (j0, j1, jloc, dy0, dy1), (k0, k1, kloc, dz0, dz1) = weights
+    if i1 == i0 or j1 == j0 or k1 == k0:
+        return out
+
+    # separable linear interpolation in each direction
+    wx0, wx1 = dx1/(dx0 + dx1), dx0/(dx0 + dx1)
+    wy0, wy1 = dy1/(dy0 + dy1), dy0/(dy0 + dy1)
+    wz0, wz1 = dz1/(dz0 + dz1), dz0/(dz0 + dz1)
+    qz = qq[:, :, kloc]*wz0 + qq[:, :, kloc + 1]*wz1
+    qy = qz[:, jloc, :]*wy0[:, np.newaxis] + qz[:, jloc + 1, :]*wy1[:, np.newaxis]
+    out[i0:i1, j0:j1, k0:k1] = qy[iloc, :, :]*wx0[:, np.newaxis, np.newaxis] \
+        + qy[iloc + 1, :, :]*wx1[:, np.newaxis, np.newaxis]
+    return out
+
+def numpy_spherical2cartesian(rr, th, ph, qqs, out):
+    ixc, jxc, kxc = out.shape
+    ixs, jxs, kxs = qqs.shape
+    xc = cartesian_coordinate(rr, ixc)
+    yc = cartesian_coordinate(rr, jxc)
+    zc = cartesian_coordinate(rr, kxc)
+    drr, dth, dph = rr[1] - rr[0], th[1] - th[0], ph[1] - ph[0]
+
+    xx, yy = np.meshgrid(xc, yc, indexing='ij')
+    rxy2 = xx**2 + yy**2
+    phc = np.arctan2(yy, xx)
+    kc = np.trunc((phc - ph[0])/dph).astype(np.int64)
+    # longitude is periodic
+    kk0, kk1 = kc % kxs, (kc + 1) % kxs
+    dph0 = phc - (ph[kk0] + (kc - kk0)*dph)
+    dph1 = dph - dph0
+
+    # loop in z direction to limit the memory
+    for k in range(kxc):
+        rrc = np.sqrt(rxy2 + zc[k]**2)
+        thc = np.arctan2(np.sqrt(rxy2), zc[k])
+        inside = (rrc < rr[ixs-2]) & (rrc > rr[0]) & (thc < th[jxs-2]) & (thc > th[0])
+        ic = np.trunc((rrc[inside] - rr[0])/drr).astype(np.int64)
+        jc = np.trunc((thc[inside] - th[0])/dth).astype(np.int64)
+        drr0 = rrc[inside] - rr[ic]
+        dth0 = thc[inside] - th[jc]
+        drr1, dth1 = drr - drr0, dth - dth0
+        ka, kb, dp0, dp1 = kk0[inside], kk1[inside], dph0[inside], dph1[inside]
+
+        qqc = np.zeros((ixc, jxc))
+        qqc[inside] = \
+            ( qqs[ic  ,jc  ,ka]*drr1*dth1*dp1 \
+            + qqs[ic+1,jc  ,ka]*drr0*dth1*dp1 \
+            + qqs[ic  ,jc+1,ka]*drr1*dth0*dp1 \
+            + qqs[ic+1,jc+1,ka]*drr0*dth0*dp1 \
+            + qqs[ic  ,jc  ,kb]*drr1*dth1*dp0 \
+            + qqs[ic+1,jc  ,kb]*drr0*dth1*dp0 \
+            + qqs[ic  ,jc+1,kb]*drr1*dth0*dp0 \
+            + qqs[ic+1,jc+1,kb]*drr0*dth0*dp0 )/(drr*dth*dph)
+        out[:, :, k] = qqc
+    return out, xc, yc, zc
+
+#######################################################
+# Numba
+#######################################################
+
+_numba_kernels = {}
+
+def numba_available():
+    return importlib.util.find_spec('numba') is not None
+
+def _numba_compile():
+    '''
+    Compiles the Numba kernels at the first use
+    '''
+    if _numba_kernels:
+        return _numba_kernels
+    import numba
+
+    @numba.njit(parallel=True)
+    def derivative(axis, rk, qq, out):
+        ix, jx, kx = qq.shape
+        if axis == 0:
+            for k in numba.prange(kx):
+                for j in range(jx):
+                    for i in range(MARGIN, ix - MARGIN):
+                        out[i,j,k] = rk[0,i]*qq[i+2,j,k] + rk[1,i]*qq[i+1,j,k] \
+                                   + rk[2,i]*qq[i-1,j,k] + rk[3,i]*qq[i-2,j,k]
+        elif axis == 1:
+            for k in numba.prange(kx):
+                for j in range(MARGIN, jx - MARGIN):
+                    for i in range(ix):
+                        out[i,j,k] = rk[0,j]*qq[i,j+2,k] + rk[1,j]*qq[i,j+1,k] \
+                                   + rk[2,j]*qq[i,j-1,k] + rk[3,j]*qq[i,j-2,k]
+        else:
+            for j in numba.prange(jx):
+                for k in range(MARGIN, kx - MARGIN):
+                    for i in range(ix):
+                        out[i,j,k] = rk[0,k]*qq[i,j,k+2] + rk[1,k]*qq[i,j,k+1] \
+                                   + rk[2,k]*qq[i,j,k-1] + rk[3,k]*qq[i,j,k-2]
+
+    @numba.njit(parallel=True)
+    def interp(i0, iloc, dx0, dx1, j0, jloc, dy0, dy1, k0, kloc, dz0, dz1, qq, out):
+        for kk in numba.prange(len(kloc)):
+            k, kl = k0 + kk, kloc[kk]
+            for jj in range(len(jloc)):
+                j, jl = j0 + jj, jloc[jj]
+                for ii in range(len(iloc)):
+                    i, il = i0 + ii, iloc[ii]
+                    out[i,j,k] = ( \
+                        + qq[il  ,jl  ,kl  ]*dz1[kk]*dy1[jj]*dx1[ii] \
+                        + qq[il  ,jl  ,kl+1]*dz0[kk]*dy1[jj]*dx1[ii] \
+                        + qq[il  ,jl+1,kl  ]*dz1[kk]*dy0[jj]*dx1[ii] \
+                        + qq[il  ,jl+1,kl+1]*dz0[kk]*dy0[jj]*dx1[ii] \
+                        + qq[il+1,jl  ,kl  ]*dz1[kk]*dy1[jj]*dx0[ii] \
+                        + qq[il+1,jl  ,kl+1]*dz0[kk]*dy1[jj]*dx0[ii] \
+                        + qq[il+1,jl+1,kl  ]*dz1[kk]*dy0[jj]*dx0[ii] \
+                        + qq[il+1,jl+1,kl+1]*dz0[kk]*dy0[jj]*dx0[ii] \
+                        )/(dx0[ii] + dx1[ii])/(dy0[jj] + dy1[jj])/(dz0[kk] + dz1[kk])
+
+    @numba.njit(parallel=True)
+    def spherical2cartesian(rr, th, ph, qqs, xc, yc, zc, out):
+        ixs, jxs, kxs = qqs.shape
+        ixc, jxc, kxc = out.shape
+        drr, dth, dph = rr[1] - rr[0], th[1] - th[0], ph[1] - ph[0]
+        for k in numba.prange(kxc):
+            for j in range(jxc):
+                for i in range(ixc):
+                    rrc = np.sqrt(xc[i]**2 + yc[j]**2 + zc[k]**2)
+                    thc = np.arctan2(np.sqrt(xc[i]**2 + yc[j]**2), zc[k])
+                    phc = np.arctan2(yc[j], xc[i])
+                    if rrc < rr[ixs-2] and rrc > rr[0] and thc < th[jxs-2] and thc > th[0]:
+                        ic = int((rrc - rr[0])/drr)
+                        jc = int((thc - th[0])/dth)
+                        kc = int((phc - ph[0])/dph)
+                        k0, k1 = kc % kxs, (kc + 1) % kxs
+                        drr0 = rrc - rr[ic]
+                        dth0 = thc - th[jc]
+                        dph0 = phc - (ph[k0] + (kc - k0)*dph)
+                        drr1, dth1, dph1 = drr - drr0, dth - dth0, dph - dph0
+                        out[i,j,k] = \
+                            ( qqs[ic  ,jc  ,k0]*drr1*dth1*dph1 \
+                            + qqs[ic+1,jc  ,k0]*drr0*dth1*dph1 \
+                            + qqs[ic  ,jc+1,k0]*drr1*dth0*dph1 \
+                            + qqs[ic+1,jc+1,k0]*drr0*dth0*dph1 \
+                            + qqs[ic  ,jc  ,k1]*drr1*dth1*dph0 \
+                            + qqs[ic+1,jc  ,k1]*drr0*dth1*dph0 \
+                            + qqs[ic  ,jc+1,k1]*drr1*dth0*dph0 \
+                            + qqs[ic+1,jc+1,k1]*drr0*dth0*dph0 )/(drr*dth*dph)
+                    else:
+                        out[i,j,k] = 0.
+
+    _numba_kernels.update(derivative=derivative, interp=interp, spherical2cartesian=spherical2cartesian)
+    return _numba_kernels
+
+def numba_derivative(axis, coord, qq, out):
+    rk = derv_coefficients(coord)
+    index = [slice(None)]*3
+    n = qq.shape[axis]
+    for edge in [slice(None, MARGIN), slice(n - MARGIN, None)]:
+        index[axis] = edge
+        out[tuple(index)] = 0.
+    _numba_compile()['derivative'](axis, rk, qq, out)
+    return out
+
+def numba_interp(x, y, z, xu, yu, zu, qq, out):
+    out[...] = 0.
+    weights = [interp_weights(c, cu) for c, cu in ((x, xu), (y, yu), (z, zu))]
+    return numba_interp_apply(weights, qq, out)
+
+def numba_interp_apply(weights, qq, out):
+    (i0, i1, iloc, dx0, dx1), (j0, j1, jloc, dy0, dy1), (k0, k1, kloc, dz0, dz1) = weights
+    _numba_compile()['interp'](i0, iloc, dx0, dx1, j0, jloc, dy0, dy1, k0, kloc, dz0, dz1, qq, out)
+    return out
+
+def numba_spherical2cartesian(rr, th, ph, qqs, out):
+    ixc, jxc, kxc = out.shape
+    xc = cartesian_coordinate(rr, ixc)
+    yc = cartesian_coordinate(rr, jxc)
+    zc = cartesian_coordinate(rr, kxc)
+    _numba_compile()['spherical2cartesian'](rr, th, ph, qqs, xc, yc, zc, out)
+    return out, xc, yc, zc
+
+#######################################################
+# Vector calculus with NumPy or Numba derivatives
+#######################################################
+
+def _derivative_func(backend):
+    derivative = globals()[backend + '_derivative']
+    def d(axis, coord, q):
+        return derivative(axis, coord, q, np.empty(q.shape, dtype=np.float32, order='F'))
+    return d
+
+def _metric3d(hr, gr, hth, cth):
+    return hr[:,np.newaxis,np.newaxis], gr[:,np.newaxis,np.newaxis], \
+        hth[np.newaxis,:,np.newaxis], cth[np.newaxis,:,np.newaxis]
+
+def curl(backend, x, y, z, metric, qx, qy, qz, cx, cy, cz):
+    d = _derivative_func(backend)
+    hr, gr, hth, cth = _metric3d(*metric)
+    cx[...] = hr*(d(1, y, qz) + cth*qz) - hr*hth*d(2, z, qy)
+    cy[...] = hr*hth*d(2, z, qx) - d(0, x, qz) - gr*qz
+    cz[...] = d(0, x, qy) + gr*qy - hr*d(1, y, qx)
+    return cx, cy, cz
+
+def div(backend, x, y, z, metric, qx, qy, qz, dv):
+    d = _derivative_func(backend)
+    hr, gr, hth, cth = _metric3d(*metric)
+    dv[...] = d(0, x, qx) + np.float32(2.)*gr*qx + hr*(d(1, y, qy) + cth*qy) + hr*hth*d(2, z, qz)
+    return dv
+
+def grad(backend, x, y, z, metric, qq, gx, gy, gz):
+    d = _derivative_func(backend)
+    hr, _, hth, _ = _metric3d(*metric)
+    gx[...] = d(0, x, qq)
+    gy[...] = hr*d(1, y, qq)
+    gz[...] = hr*hth*d(2, z, qq)
+    return gx, gy, gz
+
+def grad_magnitude(backend, x, y, z, metric, qq, gm):
+    d = _derivative_func(backend)
+    hr, _, hth, _ = _metric3d(*metric)
+    gm[...] = d(0, x, qq)**2
+    gm += (hr*d(1, y, qq))**2
+    gm += (hr*hth*d(2, z, qq))**2
+    np.sqrt(gm, out=gm)
+    return gm
+
+#######################################################
+# Spherical to Cartesian conversion with precomputed weights
+#######################################################
+
+def spherical2cartesian_weights(rr, th, ph, xc, yc, zc, dtype=np.float64):
+    '''
+    Location and weights of cartesian points in spherical geometry
+
+    Radius, colatitude, and longitude can be non-uniform. Longitude is
+    treated as periodic if ph covers the whole circle.
+
+    Returns
+    -------
+    ic, jc : numpy.ndarray, int32
+        1-based location in radius and colatitude (ixc, jxc, kxc). ic = 0 outside the domain
+    wr, wth : numpy.ndarray, dtype
+        weights of the upper neighbors in radius and colatitude (ixc, jxc, kxc)
+    kc : numpy.ndarray, int32
+        1-based location in longitude and its upper neighbor (ixc, jxc, 2)
+    wph : numpy.ndarray, dtype
+        weight of the upper neighbor in longitude (ixc, jxc)
+    '''
+    rr, th, ph = [np.asarray(c, dtype=np.float64) for c in (rr, th, ph)]
+    ixs, jxs, kxs = len(rr), len(th), len(ph)
+    ixc, jxc, kxc = len(xc), len(yc), len(zc)
+
+    # longitude depends only on x and y
+    xx, yy = np.meshgrid(xc, yc, indexing='ij')
+    rxy2 = xx**2 + yy**2
+    rxy = np.sqrt(rxy2)
+    phs = ph[0] + np.mod(np.arctan2(yy, xx) - ph[0], 2*np.pi)
+    k0 = np.searchsorted(ph, phs, side='right') - 1
+    periodic = kxs > 1 and np.isclose(ph[-1] - ph[0] + (ph[1] - ph[0]), 2*np.pi)
+    if periodic:
+        k1 = (k0 + 1) % kxs
+        upper = np.where(k0 == kxs - 1, ph[0] + 2*np.pi, ph[np.minimum(k0 + 1, kxs - 1)])
+        inside_ph = np.ones((ixc, jxc), dtype=bool)
+    else:
+        inside_ph = phs <= ph[-1]
+        k0 = np.clip(k0, 0, kxs - 2)
+        k1 = k0 + 1
+        upper = ph[k1]
+    kc = np.asfortranarray(np.stack([k0 + 1, k1 + 1], axis=-1), dtype=np.int32)
+    wph = np.asfortranarray((phs - ph[k0])/(upper - ph[k0]), dtype=dtype)
+
+    ic = np.zeros((ixc, jxc, kxc), dtype=np.int32, order='F')
+    jc = np.zeros((ixc, jxc, kxc), dtype=np.int32, order='F')
+    wr = np.zeros((ixc, jxc, kxc), dtype=dtype, order='F')
+    wth = np.zeros((ixc, jxc, kxc), dtype=dtype, order='F')
+    # loop in z direction to limit the memory
+    for k in range(kxc):
+        rrc = np.sqrt(rxy2 + zc[k]**2)
+        thc = np.arctan2(rxy, zc[k])
+        inside = inside_ph & (rrc > rr[0]) & (rrc < rr[-1]) & (thc > th[0]) & (thc < th[-1])
+        i0 = np.clip(np.searchsorted(rr, rrc, side='right') - 1, 0, ixs - 2)
+        j0 = np.clip(np.searchsorted(th, thc, side='right') - 1, 0, jxs - 2)
+        ic[:, :, k] = np.where(inside, i0 + 1, 0)
+        jc[:, :, k] = j0 + 1
+        wr[:, :, k] = (rrc - rr[i0])/(rr[i0 + 1] - rr[i0])
+        wth[:, :, k] = (thc - th[j0])/(th[j0 + 1] - th[j0])
+    return ic, jc, wr, wth, kc, wph
+
+def numpy_spherical2cartesian_apply(weights, qqs, out):
+    ic, jc, wr, wth, kc, wph = weights
+    k0, k1 = kc[:, :, 0] - 1, kc[:, :, 1] - 1
+    for k in range(out.shape[2]):
+        inside = ic[:, :, k] > 0
+        i0, j0 = ic[:, :, k][inside] - 1, jc[:, :, k][inside] - 1
+        ka, kb = k0[inside], k1[inside]
+        ar = wr[:, :, k][inside].astype(np.float64)
+        at = wth[:, :, k][inside].astype(np.float64)
+        ap = wph[inside].astype(np.float64)
+        qqc = np.zeros(out.shape[:2], dtype=out.dtype)
+        qqc[inside] = \
+            ( (qqs[i0,j0  ,ka]*(1 - ar) + qqs[i0+1,j0  ,ka]*ar)*(1 - at) \
+            + (qqs[i0,j0+1,ka]*(1 - ar) + qqs[i0+1,j0+1,ka]*ar)*at )*(1 - ap) \
+            + ( (qqs[i0,j0  ,kb]*(1 - ar) + qqs[i0+1,j0  ,kb]*ar)*(1 - at) \
+            + (qqs[i0,j0+1,kb]*(1 - ar) + qqs[i0+1,j0+1,kb]*ar)*at )*ap
+        out[:, :, k] = qqc
+    return out
+
+def numba_spherical2cartesian_apply(weights, qqs, out):
+    kernels = _numba_compile()
+    if 'spherical2cartesian_apply' not in kernels:
+        import numba
+
+        @numba.njit(parallel=True)
+        def apply(ic, jc, wr, wth, kc, wph, qqs, out):
+            ixc, jxc, kxc = out.shape
+            for k in numba.prange(kxc):
+                for j in range(jxc):
+                    for i in range(ixc):
+                        i0 = ic[i,j,k] - 1
+                        if i0 < 0:
+                            out[i,j,k] = 0.
+                            continue
+                        j0 = jc[i,j,k] - 1
+                        k0, k1 = kc[i,j,0] - 1, kc[i,j,1] - 1
+                        ar, at, ap = np.float64(wr[i,j,k]), np.float64(wth[i,j,k]), np.float64(wph[i,j])
+                        out[i,j,k] = \
+                            ( (qqs[i0,j0  ,k0]*(1 - ar) + qqs[i0+1,j0  ,k0]*ar)*(1 - at) \
+                            + (qqs[i0,j0+1,k0]*(1 - ar) + qqs[i0+1,j0+1,k0]*ar)*at )*(1 - ap) \
+                            + ( (qqs[i0,j0  ,k1]*(1 - ar) + qqs[i0+1,j0  ,k1]*ar)*(1 - at) \
+                            + (qqs[i0,j0+1,k1]*(1 - ar) + qqs[i0+1,j0+1,k1]*ar)*at )*ap
+
+        kernels['spherical2cartesian_apply'] = apply
+    kernels['spherical2cartesian_apply'](*weights, qqs, out)
+    return out
@@ -91,7 +91,7 @@ subroutine spherical2cartesian(qqs,rr,th,ph,ixs,jxs,kxs,ixc,jxc,kxc,qqc,xc,yc,zc
         kk0 = kc
         kk1 = kc + 1
 
-        if(kc == kxc) then
+        if(kc == kxs) then
             kk1 = 1
         endif
 
@@ -114,3 +114,207 @@ subroutine spherical2cartesian(qqs,rr,th,ph,ixs,jxs,kxs,ixc,jxc,kxc,qqc,xc,yc,zc
     return    
 end subroutine spherical2cartesian
 
+
+!============================================================
+subroutine spherical2cartesian_apply_f4_w4(qqs,ixs,jxs,kxs,nv,ic,jc,wr,wth,kc,wph,ixc,jxc,kxc,qqc) bind(C)
+!============================================================
+    ! Apply conversion with precomputed location and weights (see Spherical2CartesianPlan)
+    ! _f4/_f8: single/double precision variables, _w4/_w8: single/double precision weights
+    ! ic, jc: location in radius and colatitude (1-based). ic = 0 outside the domain
+    ! kc: location in longitude (1-based, 2D). The upper neighbor is kc(i,j,2)
+    ! wr, wth, wph: weights of the upper neighbors
+    use iso_c_binding
+    implicit none
+
+    integer :: i,j,k,m
+    integer :: i0,j0,k0,k1
+    integer(c_int), intent(in) :: ixs,jxs,kxs,nv
+    integer(c_int), intent(in) :: ixc,jxc,kxc
+    real(c_float), dimension(ixs,jxs,kxs,nv), intent(in) :: qqs
+    integer(c_int), dimension(ixc,jxc,kxc), intent(in) :: ic,jc
+    real(c_float), dimension(ixc,jxc,kxc), intent(in) :: wr,wth
+    integer(c_int), dimension(ixc,jxc,2), intent(in) :: kc
+    real(c_float), dimension(ixc,jxc), intent(in) :: wph
+    real(c_float), dimension(ixc,jxc,kxc,nv), intent(out) :: qqc
+
+    real(8) :: ar,at,ap
+
+    !$omp parallel do private(i,j,k,m,i0,j0,k0,k1,ar,at,ap)
+    do k = 1,kxc
+    do m = 1,nv
+    do j = 1,jxc
+    do i = 1,ixc
+        i0 = ic(i,j,k)
+        if(i0 > 0) then
+            j0 = jc(i,j,k)
+            k0 = kc(i,j,1)
+            k1 = kc(i,j,2)
+            ar = wr(i,j,k)
+            at = wth(i,j,k)
+            ap = wph(i,j)
+            qqc(i,j,k,m) = real( &
+                 & ( (qqs(i0,j0  ,k0,m)*(1.d0-ar) + qqs(i0+1,j0  ,k0,m)*ar)*(1.d0-at)   &
+                 &  +(qqs(i0,j0+1,k0,m)*(1.d0-ar) + qqs(i0+1,j0+1,k0,m)*ar)*at )*(1.d0-ap) &
+                 & +( (qqs(i0,j0  ,k1,m)*(1.d0-ar) + qqs(i0+1,j0  ,k1,m)*ar)*(1.d0-at)   &
+                 &  +(qqs(i0,j0+1,k1,m)*(1.d0-ar) + qqs(i0+1,j0+1,k1,m)*ar)*at )*ap, 4)
+        else
+            qqc(i,j,k,m) = 0.0
+        endif
+    enddo
+    enddo
+    enddo
+    enddo
+    !$omp end parallel do
+
+    return
+end subroutine spherical2cartesian_apply_f4_w4
+
+!============================================================
+subroutine spherical2cartesian_apply_f8_w4(qqs,ixs,jxs,kxs,nv,ic,jc,wr,wth,kc,wph,ixc,jxc,kxc,qqc) bind(C)
+!============================================================
+    ! see spherical2cartesian_apply_f4_w4
+    use iso_c_binding
+    implicit none
+
+    integer :: i,j,k,m
+    integer :: i0,j0,k0,k1
+    integer(c_int), intent(in) :: ixs,jxs,kxs,nv
+    integer(c_int), intent(in) :: ixc,jxc,kxc
+    real(c_double), dimension(ixs,jxs,kxs,nv), intent(in) :: qqs
+    integer(c_int), dimension(ixc,jxc,kxc), intent(in) :: ic,jc
+    real(c_float), dimension(ixc,jxc,kxc), intent(in) :: wr,wth
+    integer(c_int), dimension(ixc,jxc,2), intent(in) :: kc
+    real(c_float), dimension(ixc,jxc), intent(in) :: wph
+    real(c_double), dimension(ixc,jxc,kxc,nv), intent(out) :: qqc
+
+    real(8) :: ar,at,ap
+
+    !$omp parallel do private(i,j,k,m,i0,j0,k0,k1,ar,at,ap)
+    do k = 1,kxc
+    do m = 1,nv
+    do j = 1,jxc
+    do i = 1,ixc
+        i0 = ic(i,j,k)
+        if(i0 > 0) then
+            j0 = jc(i,j,k)
+            k0 = kc(i,j,1)
+            k1 = kc(i,j,2)
+            ar = wr(i,j,k)
+            at = wth(i,j,k)
+            ap = wph(i,j)
+            qqc(i,j,k,m) = &
+                 & ( (qqs(i0,j0  ,k0,m)*(1.d0-ar) + qqs(i0+1,j0  ,k0,m)*ar)*(1.d0-at)   &
+                 &  +(qqs(i0,j0+1,k0,m)*(1.d0-ar) + qqs(i0+1,j0+1,k0,m)*ar)*at )*(1.d0-ap) &
+                 & +( (qqs(i0,j0  ,k1,m)*(1.d0-ar) + qqs(i0+1,j0  ,k1,m)*ar)*(1.d0-at)   &
+                 &  +(qqs(i0,j0+1,k1,m)*(1.d0-ar) + qqs(i0+1,j0+1,k1,m)*ar)*at )*ap
+        else
+            qqc(i,j,k,m) = 0.d0
+        endif
+    enddo
+    enddo
+    enddo
+    enddo
+    !$omp end parallel do
+
+    return
+end subroutine spherical2cartesian_apply_f8_w4
+
+!============================================================
+subroutine spherical2cartesian_apply_f4_w8(qqs,ixs,jxs,kxs,nv,ic,jc,wr,wth,kc,wph,ixc,jxc,kxc,qqc) bind(C)
+!============================================================
+    ! see spherical2cartesian_apply_f4_w4
+    use iso_c_binding
+    implicit none
+
+    integer :: i,j,k,m
+    integer :: i0,j0,k0,k1
+    integer(c_int), intent(in) :: ixs,jxs,kxs,nv
+    integer(c_int), intent(in) :: ixc,jxc,kxc
+    real(c_float), dimension(ixs,jxs,kxs,nv), intent(in) :: qqs
+    integer(c_int), dimension(ixc,jxc,kxc), intent(in) :: ic,jc
+    real(c_double), dimension(ixc,jxc,kxc), intent(in) :: wr,wth
+    integer(c_int), dimension(ixc,jxc,2), intent(in) :: kc
+    real(c_double), dimension(ixc,jxc), intent(in) :: wph
+    real(c_float), dimension(ixc,jxc,kxc,nv), intent(out) :: qqc
+
+    real(8) :: ar,at,ap
+
+    !$omp parallel do private(i,j,k,m,i0,j0,k0,k1,ar,at,ap)
+    do k = 1,kxc
+    do m = 1,nv
+    do j = 1,jxc
+    do i = 1,ixc
+        i0 = ic(i,j,k)
+        if(i0 > 0) then
+            j0 = jc(i,j,k)
+            k0 = kc(i,j,1)
+            k1 = kc(i,j,2)
+            ar = wr(i,j,k)
+            at = wth(i,j,k)
+            ap = wph(i,j)
+            qqc(i,j,k,m) = real( &
+                 & ( (qqs(i0,j0  ,k0,m)*(1.d0-ar) + qqs(i0+1,j0  ,k0,m)*ar)*(1.d0-at)   &
+                 &  +(qqs(i0,j0+1,k0,m)*(1.d0-ar) + qqs(i0+1,j0+1,k0,m)*ar)*at )*(1.d0-ap) &
+                 & +( (qqs(i0,j0  ,k1,m)*(1.d0-ar) + qqs(i0+1,j0  ,k1,m)*ar)*(1.d0-at)   &
+                 &  +(qqs(i0,j0+1,k1,m)*(1.d0-ar) + qqs(i0+1,j0+1,k1,m)*ar)*at )*ap, 4)
+        else
+            qqc(i,j,k,m) = 0.0
+        endif
+    enddo
+    enddo
+    enddo
+    enddo
+    !$omp end parallel do
+
+    return
+end subroutine spherical2cartesian_apply_f4_w8
+
+!============================================================
+subroutine spherical2cartesian_apply_f8_w8(qqs,ixs,jxs,kxs,nv,ic,jc,wr,wth,kc,wph,ixc,jxc,kxc,qqc) bind(C)
+!============================================================
+    ! see spherical2cartesian_apply_f4_w4
+    use iso_c_binding
+    implicit none
+
+    integer :: i,j,k,m
+    integer :: i0,j0,k0,k1
+    integer(c_int), intent(in) :: ixs,jxs,kxs,nv
+    integer(c_int), intent(in) :: ixc,jxc,kxc
+    real(c_double), dimension(ixs,jxs,kxs,nv), intent(in) :: qqs
+    integer(c_int), dimension(ixc,jxc,kxc), intent(in) :: ic,jc
+    real(c_double), dimension(ixc,jxc,kxc), intent(in) :: wr,wth
+    integer(c_int), dimension(ixc,jxc,2), intent(in) :: kc
+    real(c_double), dimension(ixc,jxc), intent(in) :: wph
+    real(c_double), dimension(ixc,jxc,kxc,nv), intent(out) :: qqc
+
+    real(8) :: ar,at,ap
+
+    !$omp parallel do private(i,j,k,m,i0,j0,k0,k1,ar,at,ap)
+    do k = 1,kxc
+    do m = 1,nv
+    do j = 1,jxc
+    do i = 1,ixc
+        i0 = ic(i,j,k)
+        if(i0 > 0) then
+            j0 = jc(i,j,k)
+            k0 = kc(i,j,1)
+            k1 = kc(i,j,2)
+            ar = wr(i,j,k)
+            at = wth(i,j,k)
+            ap = wph(i,j)
+            qqc(i,j,k,m) = &
+                 & ( (qqs(i0,j0  ,k0,m)*(1.d0-ar) + qqs(i0+1,j0  ,k0,m)*ar)*(1.d0-at)   &
+                 &  +(qqs(i0,j0+1,k0,m)*(1.d0-ar) + qqs(i0+1,j0+1,k0,m)*ar)*at )*(1.d0-ap) &
+                 & +( (qqs(i0,j0  ,k1,m)*(1.d0-ar) + qqs(i0+1,j0  ,k1,m)*ar)*(1.d0-at)   &
+                 &  +(qqs(i0,j0+1,k1,m)*(1.d0-ar) + qqs(i0+1,j0+1,k1,m)*ar)*at )*ap
+        else
+            qqc(i,j,k,m) = 0.d0
+        endif
+    enddo
+    enddo
+    enddo
+    enddo
+    !$omp end parallel do
+
+    return
+end subroutine spherical2cartesian_apply_f8_w8
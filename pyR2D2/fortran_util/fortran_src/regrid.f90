@@ -112,3 +112,63 @@ subroutine id_loc(x,xu,ix,ixu,imin,imax,iloc,dx0,dx1)
   
   return
 end subroutine id_loc
+
+!============================================================
+subroutine interp_apply(qq,ix,jx,kx,nv &
+     & ,i0,ixi,iloc,dx0,dx1,j0,jxi,jloc,dy0,dy1,k0,kxi,kloc,dz0,dz1 &
+     & ,ixu,jxu,kxu,qu) bind(C)
+!============================================================
+  ! Apply interpolation with precomputed location and distances (see id_loc).
+  ! Target points xu(i0+1:i0+ixi) etc. are inside the original domain.
+  ! The other points of qu are not changed.
+  ! nv variables are interpolated in one pass
+  use iso_c_binding
+  use omp_lib
+  implicit none
+
+  integer :: i,j,k,m,ii,jj,kk
+  integer(c_int), intent(in) :: ix,jx,kx,nv,ixu,jxu,kxu
+  integer(c_int), intent(in) :: i0,ixi,j0,jxi,k0,kxi
+  integer(c_int), dimension(ixi), intent(in) :: iloc
+  integer(c_int), dimension(jxi), intent(in) :: jloc
+  integer(c_int), dimension(kxi), intent(in) :: kloc
+  real(c_double), dimension(ixi), intent(in) :: dx0,dx1
+  real(c_double), dimension(jxi), intent(in) :: dy0,dy1
+  real(c_double), dimension(kxi), intent(in) :: dz0,dz1
+  real(c_double), dimension(ix ,jx ,kx ,nv), intent(in)    :: qq
+  real(c_double), dimension(ixu,jxu,kxu,nv), intent(inout) :: qu
+
+  real(8), dimension(ixi) :: wx
+  real(8) :: w00,w01,w10,w11
+
+  do i = 1,ixi
+     wx(i) = 1.d0/(dx0(i) + dx1(i))
+  enddo
+
+  ! k is the outermost loop and i is the innermost loop for the memory order
+  !$omp parallel do private(i,j,k,m,ii,jj,kk,w00,w01,w10,w11)
+  do k = 1,kxi
+  do j = 1,jxi
+     kk = kloc(k)
+     jj = jloc(j)
+     w00 = dz1(k)*dy1(j)/(dy0(j) + dy1(j))/(dz0(k) + dz1(k))
+     w01 = dz0(k)*dy1(j)/(dy0(j) + dy1(j))/(dz0(k) + dz1(k))
+     w10 = dz1(k)*dy0(j)/(dy0(j) + dy1(j))/(dz0(k) + dz1(k))
+     w11 = dz0(k)*dy0(j)/(dy0(j) + dy1(j))/(dz0(k) + dz1(k))
+  do m = 1,nv
+  do i = 1,ixi
+     ii = iloc(i)
+     qu(i0+i,j0+j,k0+k,m) = ( &
+          & + (qq(ii  ,jj  ,kk  ,m)*w00 + qq(ii  ,jj  ,kk+1,m)*w01 &
+          &  + qq(ii  ,jj+1,kk  ,m)*w10 + qq(ii  ,jj+1,kk+1,m)*w11)*dx1(i) &
+          & + (qq(ii+1,jj  ,kk  ,m)*w00 + qq(ii+1,jj  ,kk+1,m)*w01 &
+          &  + qq(ii+1,jj+1,kk  ,m)*w10 + qq(ii+1,jj+1,kk+1,m)*w11)*dx0(i) &
+          & )*wx(i)
+  enddo
+  enddo
+  enddo
+  enddo
+  !$omp end parallel do
+
+  return
+end subroutine interp_apply
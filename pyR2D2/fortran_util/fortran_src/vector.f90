@@ -0,0 +1,289 @@
+! Fused vector calculus with fourth order derivatives (see derv.f90)
+!
+! rkx, rky, rkz are the stencil coefficients for q(i+2), q(i+1), q(i-1), q(i-2),
+! which are zero at the margins, so that the derivatives there are zero as in derv.f90.
+! Indices in y and z directions are clipped at the boundaries, where the coefficients are zero.
+! The z direction is blocked so that the rows used by the y and z stencils stay in cache.
+! Metric factors of spherical geometry (x, y, z) = (r, theta, phi)
+!   hr  = 1/r,          gr  = 1/r
+!   hth = 1/sin(theta), cth = cot(theta)
+! For Cartesian geometry, hr = hth = 1 and gr = cth = 0.
+!===================================================
+subroutine stencil_index(ix,ip2,ip1,im1,im2)
+!===================================================
+  implicit none
+  integer, intent(in) :: ix
+  integer, dimension(ix), intent(out) :: ip2,ip1,im1,im2
+  integer :: i
+
+  do i = 1,ix
+     ip2(i) = min(i+2,ix)
+     ip1(i) = min(i+1,ix)
+     im1(i) = max(i-1,1)
+     im2(i) = max(i-2,1)
+  enddo
+
+  return
+end subroutine stencil_index
+
+!===================================================
+subroutine curl(qx,qy,qz,rkx,rky,rkz,hr,gr,hth,cth,ix,jx,kx,cx,cy,cz) bind(c)
+!===================================================
+  use iso_c_binding
+  use omp_lib
+  implicit none
+
+  integer :: i,j,k,kb
+  integer :: jpp,jp,jm,jmm,kpp,kp,km,kmm
+  real(4) :: ry1,ry2,ry3,ry4,rz1,rz2,rz3,rz4
+  integer(c_int), intent(in) :: ix,jx,kx
+  real(c_float), dimension(ix,jx,kx), intent(in) :: qx,qy,qz
+  real(c_float), dimension(4,ix), intent(in) :: rkx
+  real(c_float), dimension(4,jx), intent(in) :: rky
+  real(c_float), dimension(4,kx), intent(in) :: rkz
+  real(c_float), dimension(ix), intent(in) :: hr,gr
+  real(c_float), dimension(jx), intent(in) :: hth,cth
+  real(c_float), dimension(ix,jx,kx), intent(out) :: cx,cy,cz
+
+  integer, parameter :: margin = 2
+  integer, parameter :: kblock = 8
+  integer, dimension(jx) :: jp2,jp1,jm1,jm2
+  integer, dimension(kx) :: kp2,kp1,km1,km2
+  real(4) :: dqz_dy,dqy_dz,dqx_dz,dqx_dy
+  real(4), dimension(ix) :: dqy_dx,dqz_dx
+
+!---------------------------------------------------
+
+  call stencil_index(jx,jp2,jp1,jm1,jm2)
+  call stencil_index(kx,kp2,kp1,km1,km2)
+
+  !$omp parallel do private(kb,i,j,k,jpp,jp,jm,jmm,kpp,kp,km,kmm) &
+  !$omp private(ry1,ry2,ry3,ry4,rz1,rz2,rz3,rz4) &
+  !$omp private(dqz_dy,dqy_dz,dqx_dz,dqx_dy,dqy_dx,dqz_dx)
+  do kb = 1,kx,kblock
+  do j = 1,jx
+  do k = kb,min(kb+kblock-1,kx)
+  jpp = jp2(j); jp = jp1(j); jm = jm1(j); jmm = jm2(j)
+  kpp = kp2(k); kp = kp1(k); km = km1(k); kmm = km2(k)
+  ry1 = rky(1,j); ry2 = rky(2,j); ry3 = rky(3,j); ry4 = rky(4,j)
+  rz1 = rkz(1,k); rz2 = rkz(2,k); rz3 = rkz(3,k); rz4 = rkz(4,k)
+  ! x derivatives are computed for a row without indirect index for vectorization
+  dqy_dx(:) = 0.0
+  dqz_dx(:) = 0.0
+  do i = 1+margin,ix-margin
+     dqy_dx(i) = rkx(1,i)*qy(i+2,j,k) + rkx(2,i)*qy(i+1,j,k) &
+          & + rkx(3,i)*qy(i-1,j,k) + rkx(4,i)*qy(i-2,j,k)
+     dqz_dx(i) = rkx(1,i)*qz(i+2,j,k) + rkx(2,i)*qz(i+1,j,k) &
+          & + rkx(3,i)*qz(i-1,j,k) + rkx(4,i)*qz(i-2,j,k)
+  enddo
+  !$omp simd
+  do i = 1,ix
+     dqx_dy = ry1*qx(i,jpp,k) + ry2*qx(i,jp,k) &
+          & + ry3*qx(i,jm,k) + ry4*qx(i,jmm,k)
+     dqx_dz = rz1*qx(i,j,kpp) + rz2*qx(i,j,kp) &
+          & + rz3*qx(i,j,km) + rz4*qx(i,j,kmm)
+     dqy_dz = rz1*qy(i,j,kpp) + rz2*qy(i,j,kp) &
+          & + rz3*qy(i,j,km) + rz4*qy(i,j,kmm)
+     dqz_dy = ry1*qz(i,jpp,k) + ry2*qz(i,jp,k) &
+          & + ry3*qz(i,jm,k) + ry4*qz(i,jmm,k)
+
+     cx(i,j,k) = hr(i)*(dqz_dy + cth(j)*qz(i,j,k)) - hr(i)*hth(j)*dqy_dz
+     cy(i,j,k) = hr(i)*hth(j)*dqx_dz - dqz_dx(i) - gr(i)*qz(i,j,k)
+     cz(i,j,k) = dqy_dx(i) + gr(i)*qy(i,j,k) - hr(i)*dqx_dy
+  enddo
+  enddo
+  enddo
+  enddo
+  !$omp end parallel do
+
+  return
+end subroutine curl
+
+!---------------------------------------------------
+!===================================================
+subroutine div(qx,qy,qz,rkx,rky,rkz,hr,gr,hth,cth,ix,jx,kx,dv) bind(c)
+!===================================================
+  use iso_c_binding
+  use omp_lib
+  implicit none
+
+  integer :: i,j,k,kb
+  integer :: jpp,jp,jm,jmm,kpp,kp,km,kmm
+  real(4) :: ry1,ry2,ry3,ry4,rz1,rz2,rz3,rz4
+  integer(c_int), intent(in) :: ix,jx,kx
+  real(c_float), dimension(ix,jx,kx), intent(in) :: qx,qy,qz
+  real(c_float), dimension(4,ix), intent(in) :: rkx
+  real(c_float), dimension(4,jx), intent(in) :: rky
+  real(c_float), dimension(4,kx), intent(in) :: rkz
+  real(c_float), dimension(ix), intent(in) :: hr,gr
+  real(c_float), dimension(jx), intent(in) :: hth,cth
+  real(c_float), dimension(ix,jx,kx), intent(out) :: dv
+
+  integer, parameter :: margin = 2
+  integer, parameter :: kblock = 8
+  integer, dimension(jx) :: jp2,jp1,jm1,jm2
+  integer, dimension(kx) :: kp2,kp1,km1,km2
+  real(4) :: dqy_dy,dqz_dz
+  real(4), dimension(ix) :: dqx_dx
+
+!---------------------------------------------------
+
+  call stencil_index(jx,jp2,jp1,jm1,jm2)
+  call stencil_index(kx,kp2,kp1,km1,km2)
+
+  !$omp parallel do private(kb,i,j,k,jpp,jp,jm,jmm,kpp,kp,km,kmm) &
+  !$omp private(ry1,ry2,ry3,ry4,rz1,rz2,rz3,rz4) &
+  !$omp private(dqx_dx,dqy_dy,dqz_dz)
+  do kb = 1,kx,kblock
+  do j = 1,jx
+  do k = kb,min(kb+kblock-1,kx)
+  jpp = jp2(j); jp = jp1(j); jm = jm1(j); jmm = jm2(j)
+  kpp = kp2(k); kp = kp1(k); km = km1(k); kmm = km2(k)
+  ry1 = rky(1,j); ry2 = rky(2,j); ry3 = rky(3,j); ry4 = rky(4,j)
+  rz1 = rkz(1,k); rz2 = rkz(2,k); rz3 = rkz(3,k); rz4 = rkz(4,k)
+  dqx_dx(:) = 0.0
+  do i = 1+margin,ix-margin
+     dqx_dx(i) = rkx(1,i)*qx(i+2,j,k) + rkx(2,i)*qx(i+1,j,k) &
+          & + rkx(3,i)*qx(i-1,j,k) + rkx(4,i)*qx(i-2,j,k)
+  enddo
+  !$omp simd
+  do i = 1,ix
+     dqy_dy = ry1*qy(i,jpp,k) + ry2*qy(i,jp,k) &
+          & + ry3*qy(i,jm,k) + ry4*qy(i,jmm,k)
+     dqz_dz = rz1*qz(i,j,kpp) + rz2*qz(i,j,kp) &
+          & + rz3*qz(i,j,km) + rz4*qz(i,j,kmm)
+
+     dv(i,j,k) = dqx_dx(i) + 2.0*gr(i)*qx(i,j,k) &
+          & + hr(i)*(dqy_dy + cth(j)*qy(i,j,k)) + hr(i)*hth(j)*dqz_dz
+  enddo
+  enddo
+  enddo
+  enddo
+  !$omp end parallel do
+
+  return
+end subroutine div
+
+!---------------------------------------------------
+!===================================================
+subroutine grad(qq,rkx,rky,rkz,hr,hth,ix,jx,kx,gx,gy,gz) bind(c)
+!===================================================
+  use iso_c_binding
+  use omp_lib
+  implicit none
+
+  integer :: i,j,k,kb
+  integer :: jpp,jp,jm,jmm,kpp,kp,km,kmm
+  real(4) :: ry1,ry2,ry3,ry4,rz1,rz2,rz3,rz4
+  integer(c_int), intent(in) :: ix,jx,kx
+  real(c_float), dimension(ix,jx,kx), intent(in) :: qq
+  real(c_float), dimension(4,ix), intent(in) :: rkx
+  real(c_float), dimension(4,jx), intent(in) :: rky
+  real(c_float), dimension(4,kx), intent(in) :: rkz
+  real(c_float), dimension(ix), intent(in) :: hr
+  real(c_float), dimension(jx), intent(in) :: hth
+  real(c_float), dimension(ix,jx,kx), intent(out) :: gx,gy,gz
+
+  integer, parameter :: margin = 2
+  integer, parameter :: kblock = 8
+  integer, dimension(jx) :: jp2,jp1,jm1,jm2
+  integer, dimension(kx) :: kp2,kp1,km1,km2
+
+!---------------------------------------------------
+
+  call stencil_index(jx,jp2,jp1,jm1,jm2)
+  call stencil_index(kx,kp2,kp1,km1,km2)
+
+  !$omp parallel do private(kb,i,j,k,jpp,jp,jm,jmm,kpp,kp,km,kmm) &
+  !$omp private(ry1,ry2,ry3,ry4,rz1,rz2,rz3,rz4)
+  do kb = 1,kx,kblock
+  do j = 1,jx
+  do k = kb,min(kb+kblock-1,kx)
+  jpp = jp2(j); jp = jp1(j); jm = jm1(j); jmm = jm2(j)
+  kpp = kp2(k); kp = kp1(k); km = km1(k); kmm = km2(k)
+  ry1 = rky(1,j); ry2 = rky(2,j); ry3 = rky(3,j); ry4 = rky(4,j)
+  rz1 = rkz(1,k); rz2 = rkz(2,k); rz3 = rkz(3,k); rz4 = rkz(4,k)
+  gx(:,j,k) = 0.0
+  do i = 1+margin,ix-margin
+     gx(i,j,k) = rkx(1,i)*qq(i+2,j,k) + rkx(2,i)*qq(i+1,j,k) &
+          & + rkx(3,i)*qq(i-1,j,k) + rkx(4,i)*qq(i-2,j,k)
+  enddo
+  !$omp simd
+  do i = 1,ix
+     gy(i,j,k) = hr(i)*(ry1*qq(i,jpp,k) + ry2*qq(i,jp,k) &
+          & + ry3*qq(i,jm,k) + ry4*qq(i,jmm,k))
+     gz(i,j,k) = hr(i)*hth(j)*(rz1*qq(i,j,kpp) + rz2*qq(i,j,kp) &
+          & + rz3*qq(i,j,km) + rz4*qq(i,j,kmm))
+  enddo
+  enddo
+  enddo
+  enddo
+  !$omp end parallel do
+
+  return
+end subroutine grad
+
+!---------------------------------------------------
+!===================================================
+subroutine grad_magnitude(qq,rkx,rky,rkz,hr,hth,ix,jx,kx,gm) bind(c)
+!===================================================
+  use iso_c_binding
+  use omp_lib
+  implicit none
+
+  integer :: i,j,k,kb
+  integer :: jpp,jp,jm,jmm,kpp,kp,km,kmm
+  real(4) :: ry1,ry2,ry3,ry4,rz1,rz2,rz3,rz4
+  integer(c_int), intent(in) :: ix,jx,kx
+  real(c_float), dimension(ix,jx,kx), intent(in) :: qq
+  real(c_float), dimension(4,ix), intent(in) :: rkx
+  real(c_float), dimension(4,jx), intent(in) :: rky
+  real(c_float), dimension(4,kx), intent(in) :: rkz
+  real(c_float), dimension(ix), intent(in) :: hr
+  real(c_float), dimension(jx), intent(in) :: hth
+  real(c_float), dimension(ix,jx,kx), intent(out) :: gm
+
+  integer, parameter :: margin = 2
+  integer, parameter :: kblock = 8
+  integer, dimension(jx) :: jp2,jp1,jm1,jm2
+  integer, dimension(kx) :: kp2,kp1,km1,km2
+  real(4) :: gy,gz
+  real(4), dimension(ix) :: gx
+
+!---------------------------------------------------
+
+  call stencil_index(jx,jp2,jp1,jm1,jm2)
+  call stencil_index(kx,kp2,kp1,km1,km2)
+
+  !$omp parallel do private(kb,i,j,k,jpp,jp,jm,jmm,kpp,kp,km,kmm) &
+  !$omp private(ry1,ry2,ry3,ry4,rz1,rz2,rz3,rz4) &
+  !$omp private(gx,gy,gz)
+  do kb = 1,kx,kblock
+  do j = 1,jx
+  do k = kb,min(kb+kblock-1,kx)
+  jpp = jp2(j); jp = jp1(j); jm = jm1(j); jmm = jm2(j)
+  kpp = kp2(k); kp = kp1(k); km = km1(k); kmm = km2(k)
+  ry1 = rky(1,j); ry2 = rky(2,j); ry3 = rky(3,j); ry4 = rky(4,j)
+  rz1 = rkz(1,k); rz2 = rkz(2,k); rz3 = rkz(3,k); rz4 = rkz(4,k)
+  gx(:) = 0.0
+  do i = 1+margin,ix-margin
+     gx(i) = rkx(1,i)*qq(i+2,j,k) + rkx(2,i)*qq(i+1,j,k) &
+          & + rkx(3,i)*qq(i-1,j,k) + rkx(4,i)*qq(i-2,j,k)
+  enddo
+  !$omp simd
+  do i = 1,ix
+     gy = hr(i)*(ry1*qq(i,jpp,k) + ry2*qq(i,jp,k) &
+          & + ry3*qq(i,jm,k) + ry4*qq(i,jmm,k))
+     gz = hr(i)*hth(j)*(rz1*qq(i,j,kpp) + rz2*qq(i,j,kp) &
+          & + rz3*qq(i,j,km) + rz4*qq(i,j,kmm))
+     gm(i,j,k) = sqrt(gx(i)**2 + gy**2 + gz**2)
+  enddo
+  enddo
+  enddo
+  enddo
+  !$omp end parallel do
+
+  return
+end subroutine grad_magnitude
+
+!---------------------------------------------------
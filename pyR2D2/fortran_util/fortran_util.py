@@ -1,4 +1,320 @@
-def d_x(x,qq):
+import ctypes
+import functools
+import os
+import threading
+
+import numpy as np
+
+from . import backends as _backends
+
+# directory of the shared libraries
+_srcdir = os.path.join(os.path.dirname(__file__), 'fortran_src')
+
+# backends in order of preference for automatic selection
+_BACKENDS = ['fortran', 'numba', 'numpy']
+_backend = os.environ.get('PYR2D2_BACKEND', 'auto')
+
+def _int():
+    return ctypes.POINTER(ctypes.c_int)
+
+def _array(dtype):
+    return np.ctypeslib.ndpointer(dtype=dtype, flags='F_CONTIGUOUS')
+
+def _derv_array():
+    """
+    Initialize argument types for derv.so
+
+    """
+    argtypes = [
+        _array(np.float32), # qq
+        _array(np.float32), # x
+        _int(), # ix
+        _int(), # jx
+        _int(), # kx
+        _array(np.float32), # qqd
+    ]
+
+    return argtypes
+
+def _interp_array():
+    """
+    Initialize argument types for interp in regrid.so
+
+    """
+    argtypes = [
+        _array(np.float64), # x
+        _array(np.float64), # y
+        _array(np.float64), # z
+        _array(np.float64), # xu
+        _array(np.float64), # yu
+        _array(np.float64), # zu
+        _array(np.float64), # qq
+        _int(), # ix
+        _int(), # jx
+        _int(), # kx
+        _int(), # ixu
+        _int(), # jxu
+        _int(), # kxu
+        _array(np.float64), # qqu
+    ]
+
+    return argtypes
+
+def _interp_apply_array():
+    """
+    Initialize argument types for interp_apply in regrid.so
+
+    """
+    argtypes = [
+        _array(np.float64), # qq
+        _int(), _int(), _int(), _int(), # ix, jx, kx, nv
+    ]
+    for _ in range(3):
+        argtypes += [
+            _int(), _int(), # i0, ixi
+            _array(np.int32), # iloc
+            _array(np.float64), # dx0
+            _array(np.float64), # dx1
+        ]
+    argtypes += [
+        _int(), _int(), _int(), # ixu, jxu, kxu
+        _array(np.float64), # qqu
+    ]
+
+    return argtypes
+
+def _spherical2cartesian_array():
+    """
+    Initialize argument types for spherical2cartesian in geometry_convert.so
+
+    """
+    argtypes = [
+        _array(np.float64), # qqs
+        _array(np.float64), # rr
+        _array(np.float64), # th
+        _array(np.float64), # ph
+        _int(), # ixs
+        _int(), # jxs
+        _int(), # kxs
+        _int(), # ixc
+        _int(), # jxc
+        _int(), # kxc
+        _array(np.float64), # qqc
+        _array(np.float64), # xc
+        _array(np.float64), # yc
+        _array(np.float64), # zc
+    ]
+
+    return argtypes
+
+def _vector_array(nin, nout, metric):
+    """
+    Initialize argument types for vector.so
+
+    """
+    argtypes = [_array(np.float32)]*nin # input variables
+    argtypes += [_array(np.float32)]*3 # rkx, rky, rkz
+    argtypes += [_array(np.float32)]*metric # metric factors
+    argtypes += [_int()]*3 # ix, jx, kx
+    argtypes += [_array(np.float32)]*nout # output variables
+
+    return argtypes
+
+def _spherical2cartesian_apply_array(dtype, wtype):
+    """
+    Initialize argument types for spherical2cartesian_apply_f4_w4, _f8_w4, _f4_w8, and _f8_w8 in geometry_convert.so
+
+    """
+    argtypes = [
+        _array(dtype), # qqs
+        _int(), _int(), _int(), _int(), # ixs, jxs, kxs, nv
+        _array(np.int32), # ic
+        _array(np.int32), # jc
+        _array(wtype), # wr
+        _array(wtype), # wth
+        _array(np.int32), # kc
+        _array(wtype), # wph
+        _int(), _int(), _int(), # ixc, jxc, kxc
+        _array(dtype), # qqc
+    ]
+
+    return argtypes
+
+# kernel name -> (shared library, function for argument types)
+_KERNELS = {
+    'd_x': ('derv.so', _derv_array),
+    'd_y': ('derv.so', _derv_array),
+    'd_z': ('derv.so', _derv_array),
+    'interp': ('regrid.so', _interp_array),
+    'interp_apply': ('regrid.so', _interp_apply_array),
+    'spherical2cartesian': ('geometry_convert.so', _spherical2cartesian_array),
+    'spherical2cartesian_apply_f4_w4': ('geometry_convert.so', lambda: _spherical2cartesian_apply_array(np.float32, np.float32)),
+    'spherical2cartesian_apply_f8_w4': ('geometry_convert.so', lambda: _spherical2cartesian_apply_array(np.float64, np.float32)),
+    'spherical2cartesian_apply_f4_w8': ('geometry_convert.so', lambda: _spherical2cartesian_apply_array(np.float32, np.float64)),
+    'spherical2cartesian_apply_f8_w8': ('geometry_convert.so', lambda: _spherical2cartesian_apply_array(np.float64, np.float64)),
+    'curl': ('vector.so', lambda: _vector_array(3, 3, 4)),
+    'div': ('vector.so', lambda: _vector_array(3, 1, 4)),
+    'grad': ('vector.so', lambda: _vector_array(1, 3, 2)),
+    'grad_magnitude': ('vector.so', lambda: _vector_array(1, 1, 2)),
+}
+
+# loaded libraries and kernels, filled on first use
+_libs = {}
+_kernels = {}
+_lock = threading.Lock()
+
+def _kernel(name):
+    '''
+    Returns a kernel in the shared libraries.
+    Each library is loaded and argument types are set only once
+
+    Parameters
+    ----------
+    name : str
+        kernel name in _KERNELS
+
+    Returns
+    -------
+    kernel : ctypes function
+        None if the shared library has not been built
+    '''
+    if name in _kernels:
+        return _kernels[name]
+
+    with _lock:
+        if name not in _kernels:
+            libname, argtypes = _KERNELS[name]
+            if libname not in _libs:
+                if os.path.isfile(os.path.join(_srcdir, libname)):
+                    _libs[libname] = np.ctypeslib.load_library(libname, _srcdir)
+                else:
+                    _libs[libname] = None
+            lib = _libs[libname]
+            if lib is None:
+                kernel = None
+            else:
+                kernel = getattr(lib, name)
+                kernel.argtypes = argtypes()
+                kernel.restype = ctypes.c_void_p
+            _kernels[name] = kernel
+    return _kernels[name]
+
+def available_backends(name='d_x'):
+    '''
+    Returns backends available on this machine
+
+    Parameters
+    ----------
+    name : str
+        kernel name, e.g., "d_x", "interp", "curl"
+
+    Returns
+    -------
+    names : list
+        available backends among "fortran", "numba", and "numpy" in order of preference
+    '''
+    names = []
+    if _kernel(name) is not None:
+        names.append('fortran')
+    if _backends.numba_available():
+        names.append('numba')
+    names.append('numpy')
+    return names
+
+def set_backend(backend='auto'):
+    '''
+    Sets default backend of the kernels
+
+    Parameters
+    ----------
+    backend : str
+        "fortran", "numba", "numpy", or "auto".
+        With "auto", the first available backend among "fortran", "numba", and "numpy" is used for each kernel.
+        The initial value is environment variable PYR2D2_BACKEND (default "auto")
+    '''
+    global _backend
+    if backend not in _BACKENDS + ['auto']:
+        raise ValueError('backend must be one of ' + str(_BACKENDS + ['auto']))
+    _backend = backend
+
+def get_backend(name='d_x', backend=None):
+    '''
+    Returns backend used for a kernel
+
+    Parameters
+    ----------
+    name : str
+        kernel name, e.g., "d_x", "interp", "curl"
+    backend : str
+        requested backend. If None, default backend set by :func:`set_backend`
+
+    Returns
+    -------
+    backend : str
+        "fortran", "numba", or "numpy"
+    '''
+    if backend is None:
+        backend = _backend
+    if backend == 'auto':
+        return available_backends(name)[0]
+    if backend not in _BACKENDS:
+        raise ValueError('backend must be one of ' + str(_BACKENDS + ['auto']))
+    return backend
+
+def _as_fortran(qq, dtype):
+    '''
+    Returns qq as a Fortran-contiguous array of dtype.
+    qq is not copied if it is already Fortran-contiguous with dtype
+    '''
+    return np.asfortranarray(qq, dtype=dtype)
+
+def _output(out, shape, dtype):
+    '''
+    Returns output array. If out is given, checks its shape, dtype, and memory layout
+    '''
+    if out is None:
+        return np.zeros(shape, dtype=dtype, order='F')
+    if out.shape != tuple(shape) or out.dtype != dtype or not out.flags.f_contiguous:
+        raise ValueError('out must be a Fortran-contiguous ' + np.dtype(dtype).name + ' array of shape ' + str(tuple(shape)))
+    return out
+
+def _derivative(name, axis, coord, qq, out, backend):
+    '''
+    Common part of d_x, d_y, and d_z
+    '''
+    backend = get_backend(name, backend)
+    if backend != 'fortran':
+        qq = _as_fortran(qq, np.float32)
+        qqd = _output(out, qq.shape, np.float32)
+        return getattr(_backends, backend + '_derivative')(axis, coord, qq, qqd)
+
+    kernel = _kernel(name)
+    if kernel is None:
+        _warning(_srcdir, name)
+        return
+
+    qq = _as_fortran(qq, np.float32)
+    ix, jx, kx = qq.shape
+    qqd = _output(out, qq.shape, np.float32)
+    if out is not None:
+        # values at the margins are not computed by the kernel
+        margin = 2
+        index = [slice(None)]*3
+        for edge in [slice(None, margin), slice(-margin, None)]:
+            index[axis] = edge
+            qqd[tuple(index)] = 0.
+
+    kernel(
+        qq,
+        _as_fortran(coord, np.float32),
+        ctypes.byref(ctypes.c_int(ix)),
+        ctypes.byref(ctypes.c_int(jx)),
+        ctypes.byref(ctypes.c_int(kx)),
+        qqd,
+    )
+    return qqd
+
+def d_x(x,qq,out=None,backend=None):
     '''
     Return x derivative with fourth order
     Inhomogeneous grid applicable
@@ -8,39 +324,20 @@ def d_x(x,qq):
     x : numpy.ndarray, float
         x coordinate (1D)
     qq : numpy.ndarray, float
-        variable (3D)
+        variable (3D). Not copied if it is a Fortran-contiguous float32 array
+    out : numpy.ndarray, float
+        Fortran-contiguous float32 array (3D) for the result. If None, a new array is allocated
+    backend : str
+        "fortran", "numba", "numpy", or "auto". If None, default backend. See :func:`set_backend`
     
     Returns
     -------
         qqd : numpy.ndarray, float
             differentiated quantity (3D)
     '''
-    import ctypes
-    import numpy as np
-    import os
-    
-    mddir = os.path.dirname(__file__)
-    libfile = 'fortran_src/derv.so'
-    if os.path.isfile(mddir+'/'+libfile):
-        lib = np.ctypeslib.load_library('derv.so',mddir+'/fortran_src')
-        lib.d_x.argtypes = _derv_array()
-        lib.d_x.restype = ctypes.c_void_p
-        ix, jx, kx = qq.shape
-        
-        qqd = np.zeros((ix,jx,kx),dtype=np.float32,order='F')
-        lib.d_x(
-            np.copy(qq,order='F').astype(np.float32),
-            x.astype(np.float32),
-            ctypes.byref(ctypes.c_int(ix)),
-            ctypes.byref(ctypes.c_int(jx)),
-            ctypes.byref(ctypes.c_int(kx)),
-            qqd,
-        )
-        return qqd
-    else:
-        _warning(mddir,d_x.__name__)
+    return _derivative('d_x', 0, x, qq, out, backend)
 
-def d_y(y,qq):
+def d_y(y,qq,out=None,backend=None):
     '''
     Return y derivative with fourth order
     Inhomogeneous grid applicable
@@ -50,39 +347,20 @@ def d_y(y,qq):
     y : numpy.ndarray, float
         y coordinate (1D)
     qq : numpy.ndarray, float
-        variable (3D)
+        variable (3D). Not copied if it is a Fortran-contiguous float32 array
+    out : numpy.ndarray, float
+        Fortran-contiguous float32 array (3D) for the result. If None, a new array is allocated
+    backend : str
+        "fortran", "numba", "numpy", or "auto". If None, default backend. See :func:`set_backend`
     
     Returns
     -------
         qqd : numpy.ndarray, float
             differentiated quantity (3D)
     '''
-    import ctypes
-    import numpy as np
-    import os
-    
-    mddir = os.path.dirname(__file__)
-    libfile = 'fortran_src/derv.so'
-    if os.path.isfile(mddir+'/'+libfile):
-        lib = np.ctypeslib.load_library('derv.so',mddir+'/fortran_src')
-        lib.d_y.argtypes = _derv_array()
-        lib.d_y.restype = ctypes.c_void_p
-        ix, jx, kx = qq.shape
-        
-        qqd = np.zeros((ix,jx,kx),dtype=np.float32,order='F')
-        lib.d_y(
-            np.copy(qq,order='F').astype(np.float32),
-            y.astype(np.float32),
-            ctypes.byref(ctypes.c_int(ix)),
-            ctypes.byref(ctypes.c_int(jx)),
-            ctypes.byref(ctypes.c_int(kx)),
-            qqd,
-        )
-        return qqd
-    else:
-        _warning(mddir,d_y.__name__)
+    return _derivative('d_y', 1, y, qq, out, backend)
 
-def d_z(z,qq):
+def d_z(z,qq,out=None,backend=None):
     '''
     Return z derivative with fourth order
     Inhomogeneous grid applicable
@@ -92,58 +370,20 @@ def d_z(z,qq):
     z : numpy.ndarray, float
         z coordinate (1D)
     qq : numpy.ndarray, float
-        variable (3D)
+        variable (3D). Not copied if it is a Fortran-contiguous float32 array
+    out : numpy.ndarray, float
+        Fortran-contiguous float32 array (3D) for the result. If None, a new array is allocated
+    backend : str
+        "fortran", "numba", "numpy", or "auto". If None, default backend. See :func:`set_backend`
     
     Returns
     -------
         qqd : numpy.ndarray, float
             differentiated quantity (3D)
     '''
-    import ctypes
-    import numpy as np
-    import os
-    
-    mddir = os.path.dirname(__file__)
-    libfile = 'fortran_src/derv.so'
-    if os.path.isfile(mddir+'/'+libfile):    
-        lib = np.ctypeslib.load_library('derv.so',mddir+'/fortran_src')
-        lib.d_z.argtypes = _derv_array()
-        lib.d_z.restype = ctypes.c_void_p
-        ix, jx, kx = qq.shape
-        
-        qqd = np.zeros((ix,jx,kx),dtype=np.float32,order='F')
-        lib.d_z(
-            np.copy(qq,order='F').astype(np.float32),
-            z.astype(np.float32),
-            ctypes.byref(ctypes.c_int(ix)),
-            ctypes.byref(ctypes.c_int(jx)),
-            ctypes.byref(ctypes.c_int(kx)),
-            qqd,
-        )
-        return qqd
-    else:
-        _warning(mddir,d_z.__name__)
+    return _derivative('d_z', 2, z, qq, out, backend)
 
-def  _derv_array():
-    """
-    Initialize argument types for derv.so
-    
-    """
-    import ctypes
-    import numpy as np
-    
-    argtypes = [
-        np.ctypeslib.ndpointer(dtype=np.float32), # qq
-        np.ctypeslib.ndpointer(dtype=np.float32), # x
-        ctypes.POINTER(ctypes.c_int), # ix
-        ctypes.POINTER(ctypes.c_int), # jx
-        ctypes.POINTER(ctypes.c_int), # kx
-        np.ctypeslib.ndpointer(dtype=np.float32), # qqd
-    ]
-
-    return argtypes
-
-def interp(x,y,z,xu,yu,zu,qq):
+def interp(x,y,z,xu,yu,zu,qq,out=None,backend=None):
     '''
     Interpolation of variable qq to xu,yu,zu from x,y,z
     
@@ -162,57 +402,163 @@ def interp(x,y,z,xu,yu,zu,qq):
     zu : numpy.ndarray, float
         target z coordinate (1D)
     qq : numpy.ndarray, float
-        variable defined on x,y, z(3D)
+        variable defined on x,y, z(3D). Not copied if it is a Fortran-contiguous float64 array
+    out : numpy.ndarray, float
+        Fortran-contiguous float64 array (3D) for the result. If None, a new array is allocated
+    backend : str
+        "fortran", "numba", "numpy", or "auto". If None, default backend. See :func:`set_backend`
     
     Returns
     -------
         qqd : numpy.ndarray
             Interpolated quantity (3D)
     '''
-    import ctypes
-    import numpy as np
-    import os
-    mddir = os.path.dirname(__file__)
-    libfile = 'fortran_src/regrid.so'
-    if os.path.isfile(mddir+'/'+libfile):
-        lib = np.ctypeslib.load_library('regrid.so',mddir+'/fortran_src')
-        lib.interp.argtypes = [
-            np.ctypeslib.ndpointer(dtype=np.float64), # x
-            np.ctypeslib.ndpointer(dtype=np.float64), # y
-            np.ctypeslib.ndpointer(dtype=np.float64), # z
-            np.ctypeslib.ndpointer(dtype=np.float64), # xu
-            np.ctypeslib.ndpointer(dtype=np.float64), # yu
-            np.ctypeslib.ndpointer(dtype=np.float64), # zu
-            np.ctypeslib.ndpointer(dtype=np.float64), # qq
-            ctypes.POINTER(ctypes.c_int), # ix
-            ctypes.POINTER(ctypes.c_int), # jx
-            ctypes.POINTER(ctypes.c_int), # kx
-            ctypes.POINTER(ctypes.c_int), # ixu
-            ctypes.POINTER(ctypes.c_int), # jxu
-            ctypes.POINTER(ctypes.c_int), # kxu
-            np.ctypeslib.ndpointer(dtype=np.float64), # qqu
-        ]
-        lib.interp.restype = ctypes.c_void_p
-        
-        ix,  jx,  kx = len(x) , len(y) , len(z)
-        ixu, jxu, kxu= len(xu), len(yu), len(zu)
+    ix,  jx,  kx = len(x) , len(y) , len(z)
+    ixu, jxu, kxu= len(xu), len(yu), len(zu)
+    if out is None:
         qqu = np.empty((ixu,jxu,kxu),dtype=np.float64,order='F')
-        lib.interp(
-            x,y,z,xu,yu,zu,
-            np.copy(qq,order='F').astype(np.float64),
+    else:
+        qqu = _output(out, (ixu,jxu,kxu), np.float64)
+
+    backend = get_backend('interp', backend)
+    if backend != 'fortran':
+        return getattr(_backends, backend + '_interp')(x, y, z, xu, yu, zu, _as_fortran(qq, np.float64), qqu)
+
+    kernel = _kernel('interp')
+    if kernel is None:
+        _warning(_srcdir, interp.__name__)
+        return
+    kernel(
+        *[_as_fortran(coord, np.float64) for coord in (x, y, z, xu, yu, zu)],
+        _as_fortran(qq, np.float64),
+        ctypes.byref(ctypes.c_int(ix)),
+        ctypes.byref(ctypes.c_int(jx)),
+        ctypes.byref(ctypes.c_int(kx)),
+        ctypes.byref(ctypes.c_int(ixu)),
+        ctypes.byref(ctypes.c_int(jxu)),
+        ctypes.byref(ctypes.c_int(kxu)),
+        qqu,
+    )
+    return qqu
+
+class InterpPlan:
+    '''
+    Trilinear interpolation from x,y,z to xu,yu,zu with precomputed weights
+
+    Locations of the target coordinates in the original coordinates are
+    computed once, and the plan can be applied to many variables with
+    the same grids. The result is the same as :func:`interp`.
+
+    Attributes
+    ----------
+    shape : tuple
+        shape of the original grid (ix, jx, kx)
+    shape_u : tuple
+        shape of the target grid (ixu, jxu, kxu)
+
+    Examples
+    --------
+    .. code-block:: python
+
+        plan = pyR2D2.fortran_util.InterpPlan(x, y, z, xu, yu, zu)
+        ro = plan.apply(ro_org)
+        qq = plan.apply(qq_org) # qq_org: (ix, jx, kx, nv), all variables in one pass
+    '''
+    def __init__(self,x,y,z,xu,yu,zu):
+        '''
+        Parameters
+        ----------
+        x, y, z : numpy.ndarray, float
+            original coordinates (1D)
+        xu, yu, zu : numpy.ndarray, float
+            target coordinates (1D)
+        '''
+        self.shape = (len(x), len(y), len(z))
+        self.shape_u = (len(xu), len(yu), len(zu))
+        # (first index, last index + 1, location, distance to lower point, distance to upper point)
+        self.weights = [_backends.interp_weights(c, cu) for c, cu in ((x, xu), (y, yu), (z, zu))]
+
+    def _zero_outside(self, qqu):
+        '''
+        Sets zero at target points outside the original domain
+        '''
+        for axis, (i0, i1, _, _, _) in enumerate(self.weights):
+            index = [slice(None)]*qqu.ndim
+            for edge in [slice(None, i0), slice(i1, None)]:
+                index[axis] = edge
+                qqu[tuple(index)] = 0.
+
+    def apply(self,qq,out=None,backend=None):
+        '''
+        Interpolates variable(s)
+
+        Parameters
+        ----------
+        qq : numpy.ndarray, float
+            variable (3D, ix, jx, kx) or variables (4D, ix, jx, kx, nv).
+            Not copied if it is a Fortran-contiguous float64 array
+        out : numpy.ndarray, float
+            Fortran-contiguous float64 array of (ixu, jxu, kxu) or (ixu, jxu, kxu, nv) for the result.
+            If None, a new array is allocated
+        backend : str
+            "fortran", "numba", "numpy", or "auto". If None, default backend. See :func:`set_backend`
+
+        Returns
+        -------
+        qqu : numpy.ndarray, float
+            Interpolated variable(s) (3D or 4D)
+        '''
+        qq = _as_fortran(qq, np.float64)
+        if qq.shape[:3] != self.shape:
+            raise ValueError('qq must have shape ' + str(self.shape) + ' in the first three dimensions')
+        shape_u = self.shape_u + qq.shape[3:]
+        if out is None:
+            qqu = np.empty(shape_u, dtype=np.float64, order='F')
+        else:
+            qqu = _output(out, shape_u, np.float64)
+        self._zero_outside(qqu)
+
+        backend = get_backend('interp_apply', backend)
+        if backend != 'fortran':
+            apply = getattr(_backends, backend + '_interp_apply')
+            if qq.ndim == 3:
+                apply(self.weights, qq, qqu)
+            else:
+                for m in range(qq.shape[3]):
+                    apply(self.weights, qq[..., m], qqu[..., m])
+            return qqu
+
+        kernel = _kernel('interp_apply')
+        if kernel is None:
+            _warning(_srcdir, 'interp_apply')
+            return
+
+        args = []
+        for i0, i1, loc, d0, d1 in self.weights:
+            args += [
+                ctypes.byref(ctypes.c_int(i0)),
+                ctypes.byref(ctypes.c_int(i1 - i0)),
+                _as_fortran(loc + 1, np.int32), # 1-based index
+                _as_fortran(d0, np.float64),
+                _as_fortran(d1, np.float64),
+            ]
+        ix, jx, kx = self.shape
+        ixu, jxu, kxu = self.shape_u
+        kernel(
+            qq,
             ctypes.byref(ctypes.c_int(ix)),
             ctypes.byref(ctypes.c_int(jx)),
             ctypes.byref(ctypes.c_int(kx)),
+            ctypes.byref(ctypes.c_int(1 if qq.ndim == 3 else qq.shape[3])),
+            *args,
             ctypes.byref(ctypes.c_int(ixu)),
             ctypes.byref(ctypes.c_int(jxu)),
             ctypes.byref(ctypes.c_int(kxu)),
             qqu,
         )
         return qqu
-    else:
-        _warning(mddir,interp.__name__)
-    
-def spherical2cartesian(rr,th,ph,qqs,ixc,jxc,kxc):
+
+def spherical2cartesian(rr,th,ph,qqs,ixc,jxc,kxc,out=None,backend=None):
     '''
     data in spherical geometry is converted to uniform cartesian geometry
     
@@ -225,13 +571,18 @@ def spherical2cartesian(rr,th,ph,qqs,ixc,jxc,kxc):
     ph : numpy.ndarray, float
         longitude (1D)
     qqs : numpy.ndarray, float
-        variable in spherical geometry (3D)
+        variable in spherical geometry (3D). Not copied if it is a Fortran-contiguous float64 array
     ixc : int
         No. of grid in converted x coordinate
     jxc : int
         No. of grid in converted y coordinate
     kxc : int
         No. of grid in converted z coordinate
+    out : numpy.ndarray, float
+        Fortran-contiguous float64 array (3D, ixc, jxc, kxc) for the result.
+        If None, a new array is allocated
+    backend : str
+        "fortran", "numba", "numpy", or "auto". If None, default backend. See :func:`set_backend`
    
     Returns
     -------
@@ -251,51 +602,487 @@ def spherical2cartesian(rr,th,ph,qqs,ixc,jxc,kxc):
     the computational domain size.
 
     '''    
-    import ctypes
-    import numpy as np
-    import os    
-    mddir = os.path.dirname(__file__)
-    libfile = 'fortran_src/regrid.so'
-    if os.path.isfile(mddir+'/'+libfile):    
-        lib = np.ctypeslib.load_library('geometry_convert.so',mddir+'/fortran_src')    
-        lib.spherical2cartesian.argtypes = [
-            np.ctypeslib.ndpointer(dtype=np.float64), # qqs
-            np.ctypeslib.ndpointer(dtype=np.float64), # rr
-            np.ctypeslib.ndpointer(dtype=np.float64), # th
-            np.ctypeslib.ndpointer(dtype=np.float64), # ph
-            ctypes.POINTER(ctypes.c_int), # ixs
-            ctypes.POINTER(ctypes.c_int), # jxs
-            ctypes.POINTER(ctypes.c_int), # kxs
-            ctypes.POINTER(ctypes.c_int), # ixc
-            ctypes.POINTER(ctypes.c_int), # jxc
-            ctypes.POINTER(ctypes.c_int), # kxc
-            np.ctypeslib.ndpointer(dtype=np.float64), # qqc
-            np.ctypeslib.ndpointer(dtype=np.float64), # xc
-            np.ctypeslib.ndpointer(dtype=np.float64), # yc
-            np.ctypeslib.ndpointer(dtype=np.float64), # zc
-        ]
-        lib.spherical2cartesian.restype = ctypes.c_void_p
-        
-        ixs, jxs, kxs = len(rr) , len(th) , len(ph)
-        xc = np.empty(ixc,dtype=np.float64)
-        yc = np.empty(jxc,dtype=np.float64)
-        zc = np.empty(kxc,dtype=np.float64)
+    ixs, jxs, kxs = len(rr) , len(th) , len(ph)
+    if out is None:
         qqc = np.empty((ixc,jxc,kxc),dtype=np.float64,order='F')
-        lib.spherical2cartesian(
-            np.copy(qqs,order='F').astype(np.float64),
-            rr.astype(np.float64),th.astype(np.float64),ph.astype(np.float64),
+    else:
+        qqc = _output(out, (ixc,jxc,kxc), np.float64)
+
+    backend = get_backend('spherical2cartesian', backend)
+    if backend != 'fortran':
+        return getattr(_backends, backend + '_spherical2cartesian')(
+            *[np.asarray(coord, dtype=np.float64) for coord in (rr, th, ph)], _as_fortran(qqs, np.float64), qqc)
+
+    kernel = _kernel('spherical2cartesian')
+    if kernel is None:
+        _warning(_srcdir, spherical2cartesian.__name__)
+        return
+
+    xc = np.empty(ixc,dtype=np.float64)
+    yc = np.empty(jxc,dtype=np.float64)
+    zc = np.empty(kxc,dtype=np.float64)
+    kernel(
+        _as_fortran(qqs, np.float64),
+        _as_fortran(rr, np.float64),_as_fortran(th, np.float64),_as_fortran(ph, np.float64),
+        ctypes.byref(ctypes.c_int(ixs)),
+        ctypes.byref(ctypes.c_int(jxs)),
+        ctypes.byref(ctypes.c_int(kxs)),
+        ctypes.byref(ctypes.c_int(ixc)),
+        ctypes.byref(ctypes.c_int(jxc)),
+        ctypes.byref(ctypes.c_int(kxc)),
+        qqc,xc,yc,zc,
+    )
+    return qqc,xc,yc,zc
+
+@functools.lru_cache(maxsize=32)
+def _cached_coefficients(key):
+    coefficients = np.asfortranarray(_backends.derv_coefficients(np.frombuffer(key, dtype=np.float32)))
+    coefficients.setflags(write=False)
+    return coefficients
+
+def _coefficients(coord):
+    '''
+    Returns stencil coefficients of fourth order derivative (4, n).
+    They are computed once for each coordinate
+    '''
+    return _cached_coefficients(np.ascontiguousarray(coord, dtype=np.float32).tobytes())
+
+def _metric(x, y, geometry):
+    '''
+    Returns metric factors hr, gr, hth, cth (see fortran_src/vector.f90)
+    '''
+    if geometry == 'Cartesian':
+        hr, gr = np.ones(len(x)), np.zeros(len(x))
+        hth, cth = np.ones(len(y)), np.zeros(len(y))
+    else:
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        hr, gr = 1/x, 1/x
+        hth, cth = 1/np.sin(y), np.cos(y)/np.sin(y)
+    return tuple(np.asarray(m, dtype=np.float32) for m in (hr, gr, hth, cth))
+
+def _vector(name, x, y, z, geometry, qs, out, nout, backend):
+    '''
+    Common part of curl, div, grad, and grad_magnitude
+    '''
+    qs = [_as_fortran(qq, np.float32) for qq in qs]
+    shape = qs[0].shape
+    if out is None:
+        outs = [np.empty(shape, dtype=np.float32, order='F') for _ in range(nout)]
+    else:
+        outs = [_output(qq, shape, np.float32) for qq in (out if nout > 1 else [out])]
+    metric = _metric(x, y, geometry)
+
+    backend = get_backend(name, backend)
+    if backend != 'fortran':
+        return getattr(_backends, name)(backend, x, y, z, metric, *qs, *outs)
+
+    kernel = _kernel(name)
+    if kernel is None:
+        _warning(_srcdir, name)
+        return
+
+    if name in ['grad', 'grad_magnitude']:
+        metric = metric[0], metric[2]
+    ix, jx, kx = shape
+    kernel(
+        *qs,
+        _coefficients(x), _coefficients(y), _coefficients(z),
+        *metric,
+        ctypes.byref(ctypes.c_int(ix)),
+        ctypes.byref(ctypes.c_int(jx)),
+        ctypes.byref(ctypes.c_int(kx)),
+        *outs,
+    )
+    return tuple(outs) if nout > 1 else outs[0]
+
+def curl(x,y,z,qx,qy,qz,geometry='Cartesian',out=None,backend=None):
+    '''
+    Return curl of a vector with fourth order derivatives in one pass
+    Inhomogeneous grid applicable
+
+    Parameters
+    ----------
+    x, y, z : numpy.ndarray, float
+        coordinates (1D). Radius, colatitude, and longitude for spherical geometry
+    qx, qy, qz : numpy.ndarray, float
+        components of the vector (3D). Not copied if they are Fortran-contiguous float32 arrays
+    geometry : str
+        "Cartesian", or "Spherical" and "YinYang" for spherical geometry with metric factors
+    out : tuple
+        three Fortran-contiguous float32 arrays (3D) for the result. If None, new arrays are allocated
+    backend : str
+        "fortran", "numba", "numpy", or "auto". If None, default backend. See :func:`set_backend`
+
+    Returns
+    -------
+        cx, cy, cz : numpy.ndarray, float
+            components of the curl (3D)
+
+    Notes
+    -----
+    Derivatives in the margins of 2 grids are regarded as zero, as in :func:`d_x`.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        jx, jy, jz = pyR2D2.fortran_util.curl(d.x, d.y, d.z, bx, by, bz, geometry=d.geometry)
+    '''
+    return _vector('curl', x, y, z, geometry, (qx, qy, qz), out, 3, backend)
+
+def div(x,y,z,qx,qy,qz,geometry='Cartesian',out=None,backend=None):
+    '''
+    Return divergence of a vector with fourth order derivatives in one pass
+    Inhomogeneous grid applicable
+
+    Parameters
+    ----------
+    x, y, z : numpy.ndarray, float
+        coordinates (1D). Radius, colatitude, and longitude for spherical geometry
+    qx, qy, qz : numpy.ndarray, float
+        components of the vector (3D). Not copied if they are Fortran-contiguous float32 arrays
+    geometry : str
+        "Cartesian", or "Spherical" and "YinYang" for spherical geometry with metric factors
+    out : numpy.ndarray, float
+        Fortran-contiguous float32 array (3D) for the result. If None, a new array is allocated
+    backend : str
+        "fortran", "numba", "numpy", or "auto". If None, default backend. See :func:`set_backend`
+
+    Returns
+    -------
+        dv : numpy.ndarray, float
+            divergence (3D)
+    '''
+    return _vector('div', x, y, z, geometry, (qx, qy, qz), out, 1, backend)
+
+def grad(x,y,z,qq,geometry='Cartesian',out=None,backend=None):
+    '''
+    Return gradient of a scalar with fourth order derivatives in one pass
+    Inhomogeneous grid applicable
+
+    Parameters
+    ----------
+    x, y, z : numpy.ndarray, float
+        coordinates (1D). Radius, colatitude, and longitude for spherical geometry
+    qq : numpy.ndarray, float
+        variable (3D). Not copied if it is a Fortran-contiguous float32 array
+    geometry : str
+        "Cartesian", or "Spherical" and "YinYang" for spherical geometry with metric factors
+    out : tuple
+        three Fortran-contiguous float32 arrays (3D) for the result. If None, new arrays are allocated
+    backend : str
+        "fortran", "numba", "numpy", or "auto". If None, default backend. See :func:`set_backend`
+
+    Returns
+    -------
+        gx, gy, gz : numpy.ndarray, float
+            components of the gradient (3D)
+    '''
+    return _vector('grad', x, y, z, geometry, (qq,), out, 3, backend)
+
+def grad_magnitude(x,y,z,qq,geometry='Cartesian',out=None,backend=None):
+    '''
+    Return magnitude of gradient of a scalar with fourth order derivatives in one pass
+    Inhomogeneous grid applicable
+
+    Parameters
+    ----------
+    x, y, z : numpy.ndarray, float
+        coordinates (1D). Radius, colatitude, and longitude for spherical geometry
+    qq : numpy.ndarray, float
+        variable (3D). Not copied if it is a Fortran-contiguous float32 array
+    geometry : str
+        "Cartesian", or "Spherical" and "YinYang" for spherical geometry with metric factors
+    out : numpy.ndarray, float
+        Fortran-contiguous float32 array (3D) for the result. If None, a new array is allocated
+    backend : str
+        "fortran", "numba", "numpy", or "auto". If None, default backend. See :func:`set_backend`
+
+    Returns
+    -------
+        gm : numpy.ndarray, float
+            magnitude of the gradient (3D)
+    '''
+    return _vector('grad_magnitude', x, y, z, geometry, (qq,), out, 1, backend)
+
+class Spherical2CartesianPlan:
+    '''
+    Conversion from spherical geometry to cartesian geometry with precomputed weights
+
+    Location and weights of each cartesian point in the spherical grid are
+    computed once, so that many variables and time steps can be converted
+    without trigonometric functions. Radius, colatitude, and longitude can
+    be non-uniform, e.g., radius generated by
+    :func:`pyR2D2.util.gen_coord_ununiform_top`.
+
+    Attributes
+    ----------
+    xc, yc, zc : numpy.ndarray, float
+        cartesian coordinates (1D)
+    shape : tuple
+        shape of the cartesian grid (ixc, jxc, kxc)
+    shape_s : tuple
+        shape of the spherical grid (ixs, jxs, kxs)
+
+    dtype : numpy.dtype
+        precision of the weights
+
+    Notes
+    -----
+    The plan needs 24 bytes per cartesian point with double precision
+    weights (int32 location and float64 weights in radius and colatitude),
+    e.g., 26 GB for 1024^3, and 16 bytes with single precision weights.
+    Use :func:`spherical2cartesian_slabs` for large cartesian grids.
+
+    With double precision weights (default), the result agrees with
+    :func:`spherical2cartesian` to round-off. Single precision weights
+    give relative errors of ~1e-7, also for float64 variables.
+
+    Points outside the spherical domain are zero. Unlike
+    :func:`spherical2cartesian`, which stops at rr[-2] and th[-2],
+    the last cells up to rr[-1] and th[-1] are also interpolated.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        plan = pyR2D2.fortran_util.Spherical2CartesianPlan(d.x, d.y, d.z, 512, 512, 512)
+        for n in range(n0, n1 + 1):
+            d.qf.read(n, 'ro')
+            ro = plan.apply(d.qf.ro) # float32 for float32 input
+    '''
+    def __init__(self,rr,th,ph,ixc=None,jxc=None,kxc=None,xc=None,yc=None,zc=None,dtype=np.float64):
+        '''
+        Parameters
+        ----------
+        rr : numpy.ndarray, float
+            radius (1D)
+        th : numpy.ndarray, float
+            colatitude (1D)
+        ph : numpy.ndarray, float
+            longitude (1D)
+        ixc, jxc, kxc : int
+            No. of grid in cartesian coordinates.
+            Uniform grids from -max(rr) to max(rr) are generated as in :func:`spherical2cartesian`
+        xc, yc, zc : numpy.ndarray, float
+            cartesian coordinates (1D). If given, ixc, jxc, kxc are ignored
+        dtype : numpy.dtype
+            precision of the weights, numpy.float64 or numpy.float32.
+            numpy.float32 saves memory at the cost of accuracy
+        '''
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.float32, np.float64):
+            raise ValueError('dtype must be numpy.float32 or numpy.float64')
+        self.xc = _backends.cartesian_coordinate(rr, ixc) if xc is None else np.asarray(xc, dtype=np.float64)
+        self.yc = _backends.cartesian_coordinate(rr, jxc) if yc is None else np.asarray(yc, dtype=np.float64)
+        self.zc = _backends.cartesian_coordinate(rr, kxc) if zc is None else np.asarray(zc, dtype=np.float64)
+        self.shape = (len(self.xc), len(self.yc), len(self.zc))
+        self.shape_s = (len(rr), len(th), len(ph))
+        # ic, jc, wr, wth, kc, wph. See pyR2D2.fortran_util.backends.spherical2cartesian_weights
+        self.weights = _backends.spherical2cartesian_weights(rr, th, ph, self.xc, self.yc, self.zc, dtype=self.dtype)
+        # islice and jslice returned by crop
+        self._crop = None
+
+    def apply(self,qqs,out=None,dtype=None,backend=None):
+        '''
+        Converts variable(s) in spherical geometry
+
+        Parameters
+        ----------
+        qqs : numpy.ndarray, float
+            variable (3D, ixs, jxs, kxs) or variables (4D, ixs, jxs, kxs, nv).
+            Not copied if it is a Fortran-contiguous array of dtype
+        out : numpy.ndarray, float
+            Fortran-contiguous array of (ixc, jxc, kxc) or (ixc, jxc, kxc, nv) for the result.
+            If None, a new array is allocated
+        dtype : numpy.dtype
+            numpy.float32 or numpy.float64. If None, float32 for float32 input, otherwise float64
+        backend : str
+            "fortran", "numba", "numpy", or "auto". If None, default backend. See :func:`set_backend`
+
+        Returns
+        -------
+        qqc : numpy.ndarray, float
+            converted variable(s) (3D or 4D)
+        '''
+        if dtype is None:
+            dtype = np.float32 if np.asarray(qqs).dtype == np.float32 else np.float64
+        dtype = np.dtype(dtype)
+        if dtype not in (np.float32, np.float64):
+            raise ValueError('dtype must be numpy.float32 or numpy.float64')
+        qqs = _as_fortran(qqs, dtype)
+        if qqs.shape[:3] != self.shape_s:
+            raise ValueError('qqs must have shape ' + str(self.shape_s) + ' in the first three dimensions')
+        shape = self.shape + qqs.shape[3:]
+        if out is None:
+            qqc = np.empty(shape, dtype=dtype, order='F')
+        else:
+            qqc = _output(out, shape, dtype)
+
+        name = 'spherical2cartesian_apply_f' + str(dtype.itemsize) + '_w' + str(self.dtype.itemsize)
+        backend = get_backend(name, backend)
+        if backend != 'fortran':
+            apply = getattr(_backends, backend + '_spherical2cartesian_apply')
+            if qqs.ndim == 3:
+                apply(self.weights, qqs, qqc)
+            else:
+                for m in range(qqs.shape[3]):
+                    apply(self.weights, qqs[..., m], qqc[..., m])
+            return qqc
+
+        kernel = _kernel(name)
+        if kernel is None:
+            _warning(_srcdir, name)
+            return
+
+        ixs, jxs, kxs = self.shape_s
+        ixc, jxc, kxc = self.shape
+        kernel(
+            qqs,
             ctypes.byref(ctypes.c_int(ixs)),
             ctypes.byref(ctypes.c_int(jxs)),
             ctypes.byref(ctypes.c_int(kxs)),
+            ctypes.byref(ctypes.c_int(1 if qqs.ndim == 3 else qqs.shape[3])),
+            *self.weights,
             ctypes.byref(ctypes.c_int(ixc)),
             ctypes.byref(ctypes.c_int(jxc)),
             ctypes.byref(ctypes.c_int(kxc)),
-            qqc,xc,yc,zc,
+            qqc,
         )
-        return qqc,xc,yc,zc
-    else:
-        _warning(mddir,spherical2cartesian.__name__)
-    
+        return qqc
+
+    def crop(self):
+        '''
+        Restricts the plan to the part of the spherical grid used by the cartesian points
+
+        After this, :meth:`apply` takes qqs[islice, jslice] instead of the whole variable.
+        The plan is cropped only once; later calls return the same slices.
+
+        Returns
+        -------
+        islice, jslice : slice
+            range of the spherical grid in radius and colatitude.
+            None if no cartesian point is in the spherical domain
+        '''
+        if self._crop is not None:
+            return self._crop
+
+        ic, jc = self.weights[:2]
+        inside = ic > 0
+        if not inside.any():
+            self._crop = (None, None)
+            return self._crop
+        i0, i1 = ic.min(initial=ic.max(), where=inside) - 1, ic.max() + 1
+        j0, j1 = jc.min(initial=jc.max(), where=inside) - 1, jc.max(initial=1, where=inside) + 1
+        np.subtract(ic, i0, out=ic, where=inside)
+        np.subtract(jc, j0, out=jc, where=inside)
+        self.shape_s = (int(i1 - i0), int(j1 - j0), self.shape_s[2])
+        self._crop = (slice(int(i0), int(i1)), slice(int(j0), int(j1)))
+        return self._crop
+
+def spherical2cartesian_slab_plans(rr,th,ph,ixc=None,jxc=None,kxc=None,xc=None,yc=None,zc=None,slab=32,dtype=np.float64):
+    '''
+    Generates cropped conversion plans for slabs of the cartesian grid in z direction
+
+    Plans are generated one by one, so that only one slab plan is held in memory
+    while the generator is consumed. Convert it to a list to reuse all the plans,
+    which needs as much memory as a :class:`Spherical2CartesianPlan` of the whole grid.
+
+    Parameters
+    ----------
+    rr, th, ph : numpy.ndarray, float
+        radius, colatitude, and longitude (1D)
+    ixc, jxc, kxc, xc, yc, zc
+        cartesian grid. See :class:`Spherical2CartesianPlan`
+    slab : int
+        No. of cartesian grid in z direction in a slab
+    dtype : numpy.dtype
+        precision of the weights, numpy.float64 (default) or numpy.float32.
+        See :class:`Spherical2CartesianPlan`
+
+    Yields
+    ------
+    k0, k1 : int
+        range of the slab in z direction
+    plan : Spherical2CartesianPlan
+        plan of the slab cropped by :meth:`Spherical2CartesianPlan.crop`
+    islice, jslice : slice
+        range of the spherical grid in radius and colatitude needed by the slab.
+        None if the slab does not intersect the spherical domain
+    '''
+    xc = _backends.cartesian_coordinate(rr, ixc) if xc is None else np.asarray(xc, dtype=np.float64)
+    yc = _backends.cartesian_coordinate(rr, jxc) if yc is None else np.asarray(yc, dtype=np.float64)
+    zc = _backends.cartesian_coordinate(rr, kxc) if zc is None else np.asarray(zc, dtype=np.float64)
+    for k0 in range(0, len(zc), slab):
+        k1 = min(k0 + slab, len(zc))
+        plan = Spherical2CartesianPlan(rr, th, ph, xc=xc, yc=yc, zc=zc[k0:k1], dtype=dtype)
+        islice, jslice = plan.crop()
+        yield k0, k1, plan, islice, jslice
+
+def spherical2cartesian_slabs(rr,th,ph,read,ixc=None,jxc=None,kxc=None,xc=None,yc=None,zc=None,slab=32,dtype=np.float32,
+                              plans=None,nv=None,backend=None,weight_dtype=np.float64):
+    '''
+    Converts spherical geometry to cartesian geometry slab by slab in z direction
+
+    Only the range of the spherical grid needed for each slab is requested by read,
+    so that the whole volume in neither geometry is held in memory.
+
+    Parameters
+    ----------
+    rr, th, ph : numpy.ndarray, float
+        radius, colatitude, and longitude (1D)
+    read : callable
+        read(islice, jslice) returns the variable(s) in spherical geometry of
+        (len(rr[islice]), len(th[jslice]), kxs) or (..., nv).
+        Several variables in one 4D array are converted in one pass
+    ixc, jxc, kxc, xc, yc, zc
+        cartesian grid. See :class:`Spherical2CartesianPlan`. Ignored if plans is given
+    slab : int
+        No. of cartesian grid in z direction converted at once. Ignored if plans is given
+    dtype : numpy.dtype
+        numpy.float32 or numpy.float64 for the output
+    plans : list
+        slab plans from :func:`spherical2cartesian_slab_plans`, which are reused
+        over time steps. If None, plans are generated for each slab
+    nv : int
+        No. of variables returned by read as 4D array. None for 3D
+    backend : str
+        See :func:`set_backend`
+    weight_dtype : numpy.dtype
+        precision of the weights. See :class:`Spherical2CartesianPlan`. Ignored if plans is given
+
+    Yields
+    ------
+    k0, k1 : int
+        range of the slab in z direction
+    qqc : numpy.ndarray, float
+        converted variable(s) of (ixc, jxc, k1 - k0) or (..., nv).
+        Zero if the slab does not intersect the spherical domain
+
+    Examples
+    --------
+    .. code-block:: python
+
+        xc = yc = zc = np.linspace(-1, 1, 2048)
+        qqc = np.lib.format.open_memmap('ro.npy', mode='w+', dtype=np.float32, shape=(2048,)*3, fortran_order=True)
+        for k0, k1, qq in pyR2D2.fortran_util.spherical2cartesian_slabs(rr, th, ph, read, xc=xc, yc=yc, zc=zc):
+            qqc[:,:,k0:k1] = qq
+
+        # plans are reused for several time steps if memory allows
+        plans = list(pyR2D2.fortran_util.spherical2cartesian_slab_plans(rr, th, ph, 256, 256, 256))
+        for n in range(n0, n1 + 1):
+            for k0, k1, qq in pyR2D2.fortran_util.spherical2cartesian_slabs(rr, th, ph, read_step(n), plans=plans):
+                ...
+    '''
+    if plans is None:
+        plans = spherical2cartesian_slab_plans(rr, th, ph, ixc, jxc, kxc, xc, yc, zc, slab=slab, dtype=weight_dtype)
+    for k0, k1, plan, islice, jslice in plans:
+        if islice is None:
+            shape = plan.shape if nv is None else plan.shape + (nv,)
+            yield k0, k1, np.zeros(shape, dtype=dtype, order='F')
+            continue
+        yield k0, k1, plan.apply(read(islice, jslice), dtype=dtype, backend=backend)
+
 def _warning(mddir,funcname):
     '''
     Warning message for uninstalled function
@@ -303,7 +1090,7 @@ def _warning(mddir,funcname):
     Parameters
     ----------
     mddir : str
-        directory of the module
+        directory of the shared libraries
     
     funcname : str
         function name
@@ -313,5 +1100,5 @@ def _warning(mddir,funcname):
     None
     '''
     print('This function '+funcname+' has not been installed')
-    print('Please make at '+mddir+'/fortran_src')
-    return
+    print('Please make at '+mddir)
+    return
\ No newline at end of file
@@ -0,0 +1,2 @@
+from .store import *
+from .tau_cube import *
\ No newline at end of file
@@ -0,0 +1,337 @@
+'''
+Consolidated store of remap data
+
+All the remap/qq/ files of a time step are rewritten into a single file
+remap/store/qq.store.NNNNNNNN, which is chunked along all three axes.
+:class:`pyR2D2.XSelect`, :class:`pyR2D2.ZSelect`, :class:`pyR2D2.MPIRegion`,
+:class:`pyR2D2.FullData`, and :class:`pyR2D2.RestrictedData` use the store
+when it exists, so that the cost of a read is proportional to the requested volume.
+
+File format
+-----------
+- 8 bytes: magic ``R2D2STR1``
+- 8 bytes: length of the JSON header (little endian uint64)
+- JSON header: shape, chunks, values, dtype, byte offset of each chunk,
+  and size and mtime of the source remap/qq/ files, padded with spaces up to a page boundary
+- chunks: each chunk is stored in Fortran order. Offsets of the chunks of a value
+  are measured from the end of the header and listed with the flat index
+  (ic*ncj + jc)*nck + kc
+
+A store is not used when a source file has been rewritten after the
+consolidation, e.g., by a restarted run. Removing the source files
+after the consolidation is allowed. The readers open a store once per
+time step and check the source files only then; the store is reopened
+when the store file itself is rewritten.
+'''
+import os
+import json
+import tempfile
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+_MAGIC = b'R2D2STR1'
+_ALIGN = 4096
+
+def _data_offset(length):
+    '''
+    Returns byte offset of the data section from the length of the JSON header
+    '''
+    return -(-(len(_MAGIC) + 8 + length)//_ALIGN)*_ALIGN
+
+def filepath(datadir, n):
+    '''
+    Returns file path of the consolidated store
+
+    Parameters
+    ----------
+    datadir : str
+        data directory
+    n : int
+        time step
+
+    Returns
+    -------
+    filepath : str
+        file path of the consolidated store
+    '''
+    return datadir + 'remap/store/qq.store.' + '{0:08d}'.format(n)
+
+def open_store(datadir, n, cache=None):
+    '''
+    Opens the consolidated store if it exists
+
+    Parameters
+    ----------
+    datadir : str
+        data directory
+    n : int
+        time step
+    cache : dict
+        stores opened before, time step -> (signature of the store file, store).
+        If given, a store is reused while the store file is unchanged and
+        the source files are checked only when the store is opened
+
+    Returns
+    -------
+    store : pyR2D2.store.RemapStore
+        None if the store does not exist or is older than the remap/qq/ files
+    '''
+    path = filepath(datadir, n)
+    try:
+        signature = _signature(path)
+    except FileNotFoundError:
+        return None
+
+    if cache is not None and n in cache and cache[n][0] == signature:
+        return cache[n][1]
+
+    store = RemapStore(path)
+    if not store.is_current(datadir):
+        warnings.warn(path + ' is older than remap/qq/ files and is not used. '
+                      'Run pyR2D2.store.consolidate with overwrite=True', stacklevel=2)
+        store = None
+    if cache is not None:
+        cache[n] = (signature, store)
+    return store
+
+def _signature(path):
+    '''
+    Returns [size, mtime_ns] of a file
+    '''
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+class RemapStore:
+    '''
+    Reader of the consolidated store of a time step
+
+    Attributes
+    ----------
+    shape : tuple
+        (ix, jx, kx)
+    chunks : tuple
+        chunk size in each direction
+    values : list
+        kinds of stored values
+    dtype : numpy.dtype
+        data type on disk
+    sources : dict
+        [size, mtime_ns] of the source files at the consolidation.
+        Paths are relative to the data directory
+    '''
+    def __init__(self, path):
+        '''
+        Parameters
+        ----------
+        path : str
+            file path of the store
+        '''
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(path + ' is not a consolidated store of R2D2')
+            length = int(np.frombuffer(f.read(8), dtype='<u8')[0])
+            header = json.loads(f.read(length).decode())
+
+        self.shape = tuple(header['shape'])
+        self.chunks = tuple(header['chunks'])
+        self.values = header['values']
+        self.dtype = np.dtype(header['dtype'])
+        self.nchunks = tuple(-(-s//c) for s, c in zip(self.shape, self.chunks))
+        self.data_offset = _data_offset(length)
+        self.sources = header.get('sources', {})
+        self.offsets = {value: np.array(offsets, dtype=np.int64).reshape(self.nchunks) \
+                        for value, offsets in header['offsets'].items()}
+
+        self._qq = np.memmap(path, dtype=self.dtype, mode='r', offset=self.data_offset)
+
+    def is_current(self, datadir):
+        '''
+        Checks that the source files have not been rewritten after the consolidation
+
+        Parameters
+        ----------
+        datadir : str
+            data directory
+
+        Returns
+        -------
+        current : bool
+            False if a source file exists with a different size or mtime
+        '''
+        for source, signature in self.sources.items():
+            try:
+                if _signature(datadir + source) != signature:
+                    return False
+            except FileNotFoundError:
+                # source files may be removed after the consolidation
+                continue
+        return True
+
+    def _chunk(self, value, ic, jc, kc):
+        '''
+        Returns zero-copy view of a chunk
+        '''
+        shape = tuple(min(c, s - ii*c) for ii, c, s in zip((ic, jc, kc), self.chunks, self.shape))
+        start = int(self.offsets[value][ic, jc, kc])//self.dtype.itemsize
+
+        return self._qq[start:start + shape[0]*shape[1]*shape[2]].reshape(shape, order='F')
+
+    def read(self, value, index, out=None):
+        '''
+        Reads a subvolume of a value. Only overlapping chunks are read
+
+        Parameters
+        ----------
+        value : str
+            kind of value
+        index : tuple
+            int or slice with step 1 for each direction.
+            The direction given by int is removed from the output
+        out : numpy.ndarray
+            array to store the output
+
+        Returns
+        -------
+        qq : numpy.ndarray, float
+            subvolume of the value
+        '''
+        ranges = []
+        for idx, s in zip(index, self.shape):
+            if isinstance(idx, slice):
+                start, stop, _ = idx.indices(s)
+                ranges.append((start, stop, False))
+            else:
+                idx = int(idx)
+                ranges.append((idx, idx + 1, True))
+
+        shape = tuple(stop - start for start, stop, squeeze in ranges if not squeeze)
+        if out is None:
+            out = np.empty(shape, dtype=self.dtype.newbyteorder('='))
+        full = out.reshape(tuple(stop - start for start, stop, _ in ranges))
+
+        (i0, i1, _), (j0, j1, _), (k0, k1, _) = ranges
+        ci, cj, ck = self.chunks
+        for kc in range(k0//ck, (k1 - 1)//ck + 1):
+            for jc in range(j0//cj, (j1 - 1)//cj + 1):
+                for ic in range(i0//ci, (i1 - 1)//ci + 1):
+                    chunk = self._chunk(value, ic, jc, kc)
+                    # overlap in global index
+                    ia, ib = max(i0, ic*ci), min(i1, ic*ci + chunk.shape[0])
+                    ja, jb = max(j0, jc*cj), min(j1, jc*cj + chunk.shape[1])
+                    ka, kb = max(k0, kc*ck), min(k1, kc*ck + chunk.shape[2])
+                    full[ia-i0:ib-i0, ja-j0:jb-j0, ka-k0:kb-k0] = \
+                        chunk[ia-ic*ci:ib-ic*ci, ja-jc*cj:jb-jc*cj, ka-kc*ck:kb-kc*ck]
+
+        return out
+
+def _write_step(data, n, chunks):
+    '''
+    Writes the consolidated store of a time step
+    '''
+    reader = data.qf
+    plan = reader._plan
+    shape = (data.ix, data.jx, data.kx)
+    chunks = tuple(min(c, s) for c, s in zip(chunks, shape))
+    nchunks = tuple(-(-s//c) for s, c in zip(shape, chunks))
+    values = plan.values
+    itemsize = plan.dtype.itemsize
+
+    # offsets of chunks, value -> ic -> jc -> kc, which is the writing order
+    sizes = np.zeros(nchunks, dtype=np.int64)
+    for ic in range(nchunks[0]):
+        for jc in range(nchunks[1]):
+            for kc in range(nchunks[2]):
+                sizes[ic, jc, kc] = min(chunks[0], shape[0] - ic*chunks[0]) \
+                    *min(chunks[1], shape[1] - jc*chunks[1]) \
+                    *min(chunks[2], shape[2] - kc*chunks[2])*itemsize
+    starts = np.cumsum(sizes.reshape(-1)) - sizes.reshape(-1)
+
+    sources = {}
+    for np0 in plan.nps:
+        source = plan.filepath(n, np0)
+        sources[source[len(data.datadir):]] = _signature(source)
+    header = {'shape': shape, 'chunks': chunks, 'values': values, 'dtype': plan.dtype.str, 'offsets': {},
+              'sources': sources}
+    for m, value in enumerate(values):
+        header['offsets'][value] = (m*int(sizes.sum()) + starts).tolist()
+    text = json.dumps(header).encode()
+    # the data section starts at a page boundary
+    text = text + b' '*(_data_offset(len(text)) - len(_MAGIC) - 8 - len(text))
+
+    path = filepath(data.datadir, n)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # a unique temporary file, so that concurrent conversions of the same step do not mix
+    fd, tmppath = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            # mkstemp creates the file readable only by the owner
+            os.chmod(tmppath, 0o644)
+            f.write(_MAGIC)
+            f.write(np.array([len(text)], dtype='<u8').tobytes())
+            f.write(text)
+            for value in values:
+                for ic in range(nchunks[0]):
+                    i0, i1 = ic*chunks[0], min((ic + 1)*chunks[0], shape[0])
+                    # slab of the value read from the overlapping rank files
+                    slab = np.empty((i1 - i0, shape[1], shape[2]), dtype=plan.dtype)
+                    for np0 in plan.nps:
+                        iss, iee = plan.islice[np0].start, plan.islice[np0].stop
+                        if iee <= i0 or iss >= i1:
+                            continue
+                        qqq = reader._memmap_remap_qq(n, np0)
+                        slab[max(iss, i0)-i0:min(iee, i1)-i0, plan.jslice[np0], :] = \
+                            qqq[max(iss, i0)-iss:min(iee, i1)-iss, :, :, plan.index[value]]
+
+                    for jc in range(nchunks[1]):
+                        for kc in range(nchunks[2]):
+                            chunk = slab[:, jc*chunks[1]:(jc + 1)*chunks[1], kc*chunks[2]:(kc + 1)*chunks[2]]
+                            f.write(chunk.tobytes(order='F'))
+        os.replace(tmppath, path)
+    except BaseException:
+        if os.path.exists(tmppath):
+            os.remove(tmppath)
+        raise
+
+def consolidate(data, steps, chunks=(64,64,64), overwrite=False, workers=None):
+    '''
+    Rewrites remap/qq/ files into consolidated stores, one file per time step
+
+    Parameters
+    ----------
+    data : pyR2D2.Data
+        Instance of pyR2D2.Data
+    steps : int or list
+        time steps to be converted
+    chunks : tuple
+        chunk size in x, y, and z directions
+    overwrite : bool
+        If False, time steps that already have a store are skipped
+    workers : int
+        Number of threads, each of which converts a time step.
+        If None, environment variable PYR2D2_WORKERS is used (default 1)
+
+    Examples
+    --------
+    .. code-block:: python
+
+        import pyR2D2
+        d = pyR2D2.Data(datadir)
+        pyR2D2.store.consolidate(d, range(d.nd + 1))
+        d.qf.read(d.nd, 'ro') # read from the store
+    '''
+    from ..data_io.read import _get_workers
+
+    if np.isscalar(steps):
+        steps = [steps]
+    steps = [n for n in steps if overwrite or not os.path.isfile(filepath(data.datadir, n))]
+
+    workers = _get_workers(workers)
+    if workers == 1:
+        for n in steps:
+            _write_step(data, n, chunks)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda n: _write_step(data, n, chunks), steps))
@@ -0,0 +1,250 @@
+'''
+Time-contiguous cube of optical depth data
+
+The tau/qq.dac.* files of a range of time steps are rechunked into one file
+per value and optical depth, e.g., tau_cube/rt.cube and tau_cube/bx01.cube.
+Each file consists of chunks of (tchunk, tile[0], tile[1]) in Fortran order,
+so that the time series at a pixel is contiguous in a chunk.
+Chunks are ordered by time block, y tile, and z tile, and chunks at the
+edges are padded to the full size.
+
+The conversion is restartable: finished time blocks are recorded in done.npy.
+'''
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+def _chunk_bytes(meta):
+    return 4*meta['tchunk']*meta['tile'][0]*meta['tile'][1]
+
+def _nblocks(meta):
+    nt = meta['n1'] - meta['n0'] + 1
+    return (-(-nt//meta['tchunk']), -(-meta['jx']//meta['tile'][0]), -(-meta['kx']//meta['tile'][1]))
+
+def build_tau_cube(data, n0, n1, cubedir=None, value=None, tau=None, tchunk=64, tile=(64,64), max_bytes=2**30, workers=None):
+    '''
+    Rechunks tau/qq.dac.* of time steps n0 to n1 into time-contiguous cubes
+
+    Parameters
+    ----------
+    data : pyR2D2.Data
+        Instance of pyR2D2.Data
+    n0, n1 : int
+        first and last time steps
+    cubedir : str
+        output directory. Default is datadir + 'tau_cube/'
+    value : list
+        Kind of values in pyR2D2.OpticalDepth.value_keys. If None, all values
+    tau : list
+        Optical depths among 1, 0.1, and 0.01. If None, all optical depths
+    tchunk : int
+        number of time steps in a chunk
+    tile : tuple
+        size of a chunk in y and z directions
+    max_bytes : int
+        memory budget of a time block. Values are processed in groups within this budget
+    workers : int
+        Number of threads for reading files.
+        If None, environment variable PYR2D2_WORKERS is used (default 1)
+
+    Returns
+    -------
+    cube : pyR2D2.store.TauCube
+        reader of the cube
+
+    Notes
+    -----
+    If the conversion is interrupted, calling this function with the same
+    arguments converts only the unfinished time blocks.
+
+    Examples
+    --------
+    .. code-block:: python
+
+        cube = pyR2D2.store.build_tau_cube(d, 0, d.nd_tau, value=['rt','vx'], tau=[1])
+        vx = cube.read('vx', j=100, k=200) # (nt,)
+    '''
+    from ..data_io.read import _get_workers
+
+    qt = data.qt
+    if cubedir is None:
+        cubedir = data.datadir + 'tau_cube/'
+    if value is None:
+        value = qt.value_keys
+    if tau is None:
+        tau = qt.taus
+    mts = []
+    for tu in tau:
+        if not np.any(np.isclose(qt.taus, tu)):
+            print('######')
+            print('tau =',tu,' is not in optical depth data')
+            print('Options are:',qt.taus)
+            print('######')
+            return None
+        mts.append(int(np.argmax(np.isclose(qt.taus, tu))))
+    planes = [(key + qt.tau_suffixes[mt], qt.value_keys.index(key), mt) for key in value for mt in mts]
+
+    meta = {'n0': n0, 'n1': n1, 'jx': data.jx, 'kx': data.kx,
+            'tchunk': tchunk, 'tile': list(tile), 'dtype': '<f4',
+            'values': [name for name, _, _ in planes]}
+    os.makedirs(cubedir, exist_ok=True)
+    if os.path.isfile(cubedir + 'meta.json'):
+        with open(cubedir + 'meta.json', 'r') as f:
+            saved = json.load(f)
+        if saved != meta:
+            print('######')
+            print(cubedir + ' has a cube with different parameters')
+            print('######')
+            return None
+    else:
+        with open(cubedir + 'meta.json', 'w') as f:
+            json.dump(meta, f, indent=4)
+
+    ntb, ntj, ntk = _nblocks(meta)
+    size = ntb*ntj*ntk*_chunk_bytes(meta)
+    for name, _, _ in planes:
+        with open(cubedir + name + '.cube', 'ab') as f:
+            if f.tell() != size:
+                f.truncate(size)
+
+    done_file = cubedir + 'done.npy'
+    done = np.load(done_file) if os.path.isfile(done_file) else np.zeros(ntb, dtype=bool)
+
+    # number of planes processed at once within max_bytes
+    ngroup = max(1, max_bytes//(4*tchunk*data.jx*data.kx))
+    workers = _get_workers(workers)
+    tj, tk = tile
+
+    for tb in range(ntb):
+        if done[tb]:
+            continue
+        steps = range(n0 + tb*tchunk, min(n0 + (tb + 1)*tchunk, n1 + 1))
+        for g0 in range(0, len(planes), ngroup):
+            group = planes[g0:g0 + ngroup]
+            block = np.full((tchunk, data.jx, data.kx, len(group)), np.nan, dtype='<f4')
+
+            def _read_step(n):
+                filename = data.datadir + 'tau/qq.dac.' + '{0:08d}'.format(n)
+                if not os.path.isfile(filename):
+                    return
+                qq = np.memmap(filename, dtype=data.endian + 'f', mode='r', \
+                               shape=(data.m_tu, data.m_in, data.jx, data.kx), order='F')
+                for m, (_, mk, mt) in enumerate(group):
+                    block[n - steps[0], :, :, m] = qq[mt, mk, :, :]
+
+            if workers == 1:
+                for n in steps:
+                    _read_step(n)
+            else:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    list(executor.map(_read_step, steps))
+
+            for m, (name, _, _) in enumerate(group):
+                cube = np.memmap(cubedir + name + '.cube', dtype='<f4', mode='r+')
+                for jt in range(ntj):
+                    for kt in range(ntk):
+                        chunk = np.full((tchunk, tj, tk), np.nan, dtype='<f4')
+                        qq = block[:, jt*tj:(jt + 1)*tj, kt*tk:(kt + 1)*tk, m]
+                        chunk[:, :qq.shape[1], :qq.shape[2]] = qq
+                        start = ((tb*ntj + jt)*ntk + kt)*tchunk*tj*tk
+                        cube[start:start + chunk.size] = chunk.reshape(-1, order='F')
+                cube.flush()
+                del cube
+
+        done[tb] = True
+        np.save(done_file, done)
+
+    return TauCube(cubedir)
+
+class TauCube:
+    '''
+    Reader of time-contiguous cube of optical depth data
+
+    Attributes
+    ----------
+    steps : numpy.ndarray, int
+        time steps in the cube
+    values : list
+        values in the cube, e.g., "rt", "bx01"
+    complete : bool
+        True if all time blocks are converted
+    '''
+    def __init__(self, cubedir):
+        '''
+        Parameters
+        ----------
+        cubedir : str
+            directory of the cube. See :func:`build_tau_cube`
+        '''
+        self.cubedir = cubedir
+        with open(cubedir + 'meta.json', 'r') as f:
+            self.meta = json.load(f)
+        self.steps = np.arange(self.meta['n0'], self.meta['n1'] + 1)
+        self.values = self.meta['values']
+        self.shape = (len(self.steps), self.meta['jx'], self.meta['kx'])
+
+    @property
+    def complete(self):
+        done_file = self.cubedir + 'done.npy'
+        return os.path.isfile(done_file) and bool(np.load(done_file).all())
+
+    def read(self, value, j=None, k=None, n0=None, n1=None):
+        '''
+        Reads time series. Only the chunks overlapping the request are read
+
+        Parameters
+        ----------
+        value : str
+            value with suffix of optical depth, e.g., "rt", "bx01"
+        j, k : int or slice
+            pixel or range in y and z directions. If None, all
+        n0, n1 : int
+            first and last time steps. If None, all.
+            ValueError is raised for time steps outside the cube
+
+        Returns
+        -------
+        qq : numpy.ndarray, float
+            time series of shape (nt, nj, nk). Directions given by int are removed,
+            e.g., (nt,) for a pixel
+        '''
+        meta = self.meta
+        tchunk = meta['tchunk']
+        tj, tk = meta['tile']
+        ntb, ntj, ntk = _nblocks(meta)
+
+        n0 = meta['n0'] if n0 is None else n0
+        n1 = meta['n1'] if n1 is None else n1
+        if n0 < meta['n0'] or n1 > meta['n1'] or n0 > n1:
+            raise ValueError('time steps should be in ' + str(meta['n0']) + ' <= n0 <= n1 <= ' + str(meta['n1'])
+                             + ', not n0 = ' + str(n0) + ', n1 = ' + str(n1))
+        t0, t1 = n0 - meta['n0'], n1 - meta['n0'] + 1
+
+        ranges = []
+        for idx, s in zip((j, k), self.shape[1:]):
+            if idx is None:
+                idx = slice(None)
+            if isinstance(idx, slice):
+                start, stop, _ = idx.indices(s)
+                ranges.append((start, stop, False))
+            else:
+                ranges.append((int(idx), int(idx) + 1, True))
+        (j0, j1, _), (k0, k1, _) = ranges
+
+        cube = np.memmap(self.cubedir + value + '.cube', dtype=meta['dtype'], mode='r')
+        qq = np.empty((t1 - t0, j1 - j0, k1 - k0), dtype=np.float32)
+        for tb in range(t0//tchunk, (t1 - 1)//tchunk + 1):
+            for jt in range(j0//tj, (j1 - 1)//tj + 1):
+                for kt in range(k0//tk, (k1 - 1)//tk + 1):
+                    start = ((tb*ntj + jt)*ntk + kt)*tchunk*tj*tk
+                    chunk = cube[start:start + tchunk*tj*tk].reshape((tchunk, tj, tk), order='F')
+                    ta, tb_ = max(t0, tb*tchunk), min(t1, (tb + 1)*tchunk)
+                    ja, jb = max(j0, jt*tj), min(j1, (jt + 1)*tj)
+                    ka, kb = max(k0, kt*tk), min(k1, (kt + 1)*tk)
+                    qq[ta-t0:tb_-t0, ja-j0:jb-j0, ka-k0:kb-k0] = \
+                        chunk[ta-tb*tchunk:tb_-tb*tchunk, ja-jt*tj:jb-jt*tj, ka-kt*tk:kb-kt*tk]
+
+        squeeze = tuple(m + 1 for m, (_, _, sq) in enumerate(ranges) if sq)
+        return qq.squeeze(axis=squeeze) if squeeze else qq
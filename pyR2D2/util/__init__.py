@@ -1,2 +1,5 @@
 from .util import *
-from .resolution import *
\ No newline at end of file
+from .resolution import *
+from .est import *
+from .eos_table import *
+from .spherical import *
\ No newline at end of file
@@ -0,0 +1,165 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+class EOSTable:
+    '''
+    Vectorized table equation of state
+
+    The tables log_pr_e, log_te_e, log_en_e, and log_op_e in pyR2D2.Parameters,
+    which are defined on uniform grids of log density and entropy, are
+    bilinearly interpolated as in :func:`pyR2D2.util.eos`.
+    Index and weights of density and entropy are computed once for each
+    element and shared by all the output variables.
+
+    Attributes
+    ----------
+    vars : list
+        available variables, "pr", "te", "en", and "op"
+
+    Examples
+    --------
+    .. code-block:: python
+
+        eos = pyR2D2.util.EOSTable(d)
+        d.qc_read(n)
+        ro = d.qc[:,:,:,0]
+        se = d.qc[:,:,:,7] # ro, vx, vy, vz, bx, by, bz, se, ph
+        qq = eos(ro, se, ['pr','te'], workers=8)
+        qq['te'] # temperature (3D)
+    '''
+    vars = ['pr', 'te', 'en', 'op']
+
+    def __init__(self, data):
+        '''
+        Parameters
+        ----------
+        data : pyR2D2.Data
+            Instance of pyR2D2.Data. input_data/eos_table_sero.npz is required
+        '''
+        p = data.p.__dict__ if hasattr(data, 'p') else data.__dict__
+        if 'log_ro_e' not in p:
+            raise ValueError('EOS table is not found. input_data/eos_table_sero.npz is required')
+
+        self.log_ro_e = np.asarray(p['log_ro_e'], dtype=np.float64)
+        self.se_e = np.asarray(p['se_e'], dtype=np.float64)
+        self.dlogro = p['dlogro_e']
+        self.dse = p['dse_e']
+        self.ix = p['ix_e']
+        self.jx = p['jx_e']
+        # flattened tables for gathering 4 corners with one index
+        self.tables = {var: np.ascontiguousarray(p['log_' + var + '_e'], dtype=np.float64).reshape(-1) for var in self.vars}
+
+    def index(self, ro, se):
+        '''
+        Returns index and weights in the table
+
+        Parameters
+        ----------
+        ro : numpy.ndarray, float
+            density
+        se : numpy.ndarray, float
+            entropy
+
+        Returns
+        -------
+        k : numpy.ndarray, int
+            flattened index of the lower left corner in the table
+        wro, wse : numpy.ndarray, float
+            weights of the upper corners in density and entropy directions
+
+        Notes
+        -----
+        Values outside the table are linearly extrapolated from the edge cells.
+        '''
+        log_ro = np.log(ro)
+        se = np.asarray(se, dtype=np.float64)
+        iro = np.clip((log_ro - self.log_ro_e[0])//self.dlogro, 0, self.ix - 2).astype(np.intp)
+        ise = np.clip((se - self.se_e[0])//self.dse, 0, self.jx - 2).astype(np.intp)
+        wro = (log_ro - self.log_ro_e[iro])/self.dlogro
+        wse = (se - self.se_e[ise])/self.dse
+        return iro*self.jx + ise, wro, wse
+
+    def interpolate(self, index, var, out=None):
+        '''
+        Interpolates a variable with index and weights from :meth:`index`
+
+        Parameters
+        ----------
+        index : tuple
+            return of :meth:`index`
+        var : str
+            variable, "pr", "te", "en", or "op"
+        out : numpy.ndarray, float
+            array for the result
+
+        Returns
+        -------
+        qq : numpy.ndarray, float
+            interpolated variable
+        '''
+        k, wro, wse = index
+        table = self.tables[var]
+        log_qq = (table[k]*(1 - wro) + table[k + self.jx]*wro)*(1 - wse) \
+               + (table[k + 1]*(1 - wro) + table[k + self.jx + 1]*wro)*wse
+        return np.exp(log_qq, out=out)
+
+    def __call__(self, ro, se, var=('pr', 'te'), workers=None, chunk=2**20, dtype=np.float64):
+        '''
+        Evaluates variables at density ro and entropy se
+
+        Parameters
+        ----------
+        ro : numpy.ndarray, float
+            density
+        se : numpy.ndarray, float
+            entropy. Same shape as ro
+        var : str or list
+            variable(s), "pr", "te", "en", or "op"
+        workers : int
+            Number of threads. Arrays are processed in chunks of chunk elements.
+            If None, environment variable PYR2D2_WORKERS is used (default 1)
+        chunk : int
+            number of elements processed at once
+        dtype : numpy.dtype
+            dtype of the output
+
+        Returns
+        -------
+        qq : numpy.ndarray or dict
+            variable with the same shape as ro. dict of variables if var is a list
+        '''
+        from ..data_io.read import _get_workers
+
+        single = isinstance(var, str)
+        var = [var] if single else list(var)
+        ro = np.asarray(ro)
+        se = np.asarray(se)
+        if ro.shape != se.shape:
+            raise ValueError('ro and se must have the same shape')
+
+        order = 'F' if ro.flags.f_contiguous and not ro.flags.c_contiguous else 'C'
+        ro_flat = ro.reshape(-1, order=order)
+        se_flat = se.reshape(-1, order=order)
+        qq = {vl: np.empty(ro.size, dtype=dtype) for vl in var}
+
+        def _eval(m0):
+            m1 = min(m0 + chunk, ro.size)
+            index = self.index(ro_flat[m0:m1], se_flat[m0:m1])
+            for vl in var:
+                qq[vl][m0:m1] = self.interpolate(index, vl)
+
+        workers = _get_workers(workers)
+        starts = range(0, ro.size, chunk)
+        if workers == 1:
+            for m0 in starts:
+                _eval(m0)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(_eval, starts))
+
+        qq = {vl: qq[vl].reshape(ro.shape, order=order) for vl in var}
+        if single:
+            qq = qq[var[0]]
+            return qq[()] if qq.ndim == 0 else qq
+        return qq
@@ -0,0 +1,301 @@
+import os
+import json
+
+import numpy as np
+
+# keys of the reductions
+_FLUX = ['fe','fd','fk','fr','fm']
+_RMS = ['vxrms','vyrms','vzrms','bxrms','byrms','bzrms','rorms','serms','prrms','terms']
+_MEAN = ['rom','sem','prm','tem']
+_MEAN2D = ['vxm','vym','vzm','bxm','bym','bzm']
+
+def est_reduce(d, vc):
+    '''
+    Computes the reductions of py/est.py from on the fly analysis data
+
+    Parameters
+    ----------
+    d : pyR2D2.Data
+        Instance of pyR2D2.Data
+    vc : dict
+        on the fly analysis data of shape (..., nt).
+        See :meth:`pyR2D2.OnTheFly.read_series`
+
+    Returns
+    -------
+    md : dict
+        - "fe", "fd", "fk", "fr", "fm", "ff", "ft": horizontally averaged energy fluxes (ix+1, nt)
+        - "vxrms", ..., "terms": horizontally averaged RMS values (ix, nt)
+        - "rom", "sem", "prm", "tem": horizontally averaged mean values (ix, nt)
+        - "vxm", ..., "bzm": longitudinally averaged values (ix, jx, nt)
+    '''
+    # 座標のファクター
+    if d.geometry == 'Cartesian':
+        sinyy, sinyym = 1., 1.
+        sinyy_flux, sinyym_flux = 1., 1.
+    else:
+        _, yy = np.meshgrid(d.x, d.y, indexing='ij')
+        sinyy = np.sin(yy)[:,:,np.newaxis]
+        sinyym = np.average(sinyy, axis=1)
+
+        _, yy_flux = np.meshgrid(d.x_flux, d.y, indexing='ij')
+        sinyy_flux = np.sin(yy_flux)[:,:,np.newaxis]
+        sinyym_flux = np.average(sinyy_flux, axis=1)
+
+    md = {}
+    if d.geometry == 'Cartesian':
+        for vl in _FLUX:
+            md[vl] = np.average(vc[vl], axis=1)
+    else:
+        for vl in _FLUX:
+            md[vl] = np.average(vc[vl]*sinyy_flux, axis=1)/sinyym_flux*d.x_flux[:,np.newaxis]**2
+        md['fr'] = np.average(vc['fr']*sinyy_flux, axis=1)/sinyym_flux
+
+    # linear と full　の判別のためのRMSエントロピーの計算
+    serms = np.sqrt(np.average(vc['serms']**2*sinyy, axis=1)/sinyym)/d.se0[:,np.newaxis]
+    sermsm = 0.5*(np.concatenate([serms, serms[-1:]]) + np.concatenate([serms[:1], serms]))
+    sr = 0.5*(1 + np.sign(sermsm - 1.e-4))
+
+    # fe: linear expression
+    # fd: full expression
+    md['ff'] = md['fd']*sr + md['fe']*(1.e0 - sr)
+    md['ft'] = md['ff'] + md['fk'] + md['fr'] + md['fm']
+
+    for vl in _RMS:
+        md[vl] = np.sqrt(np.average(vc[vl].astype(np.float64)**2*sinyy, axis=1)/sinyym)
+
+    for vl in _MEAN:
+        md[vl] = np.average(vc[vl]*sinyy, axis=1)/sinyym
+
+    for vl in _MEAN2D:
+        md[vl] = np.asarray(vc[vl], dtype=np.float64)
+
+    return md
+
+def _default_cachedir(datadir):
+    '''
+    Returns datadir/est/, or a directory in PYR2D2_CACHE_DIR if datadir is not writable
+    '''
+    import hashlib
+
+    cachedir = datadir + 'est/'
+    if os.access(cachedir if os.path.isdir(cachedir) else datadir, os.W_OK):
+        return cachedir
+    root = os.environ.get('PYR2D2_CACHE_DIR', '') or os.path.join(os.path.expanduser('~'), '.cache', 'pyR2D2')
+    key = hashlib.sha1(os.path.abspath(datadir).encode()).hexdigest()
+    return os.path.join(root, 'est', key) + '/'
+
+class EstCache:
+    '''
+    Incremental on-disk cache of the reductions of py/est.py for a case
+
+    The reductions of each time step are appended to one file per key in
+    cachedir, and the time step is appended to step.i8 after all keys,
+    so that an interrupted update is discarded at the next update.
+    Time steps before the cache are inserted by rewriting the files.
+
+    Attributes
+    ----------
+    cachedir : str
+        directory of the cache
+    steps : numpy.ndarray, int
+        cached time steps
+
+    Examples
+    --------
+    .. code-block:: python
+
+        est = pyR2D2.util.EstCache(d)
+        est.update() # only new time steps are processed
+        md = est.load()
+        md['vxrms'] # (ix, nt)
+    '''
+    def __init__(self, data, cachedir=None):
+        '''
+        Parameters
+        ----------
+        data : pyR2D2.Data
+            Instance of pyR2D2.Data
+        cachedir : str
+            directory of the cache. Default is datadir + 'est/'.
+            If datadir is not writable, e.g., a shared run directory,
+            est/ under environment variable PYR2D2_CACHE_DIR (default ~/.cache/pyR2D2) is used
+        '''
+        self.data = data
+        if cachedir is None:
+            cachedir = _default_cachedir(data.datadir)
+        self.cachedir = cachedir
+
+    def _shapes(self):
+        '''
+        Returns shape of each key at a time step
+        '''
+        d = self.data
+        shapes = {'t': ()}
+        for vl in _FLUX + ['ff','ft']:
+            shapes[vl] = (d.ix + 1,)
+        for vl in _RMS + _MEAN:
+            shapes[vl] = (d.ix,)
+        for vl in _MEAN2D:
+            shapes[vl] = (d.ix, d.jx)
+        return shapes
+
+    @property
+    def steps(self):
+        path = self.cachedir + 'step.i8'
+        if not os.path.isfile(path):
+            return np.zeros(0, dtype=np.int64)
+        return np.fromfile(path, dtype='<i8')
+
+    def _check_meta(self):
+        '''
+        Writes meta data at the first update, or checks it against the case
+        '''
+        meta = {'datadir': os.path.abspath(self.data.datadir),
+                'shapes': {key: list(shape) for key, shape in self._shapes().items()}}
+        path = self.cachedir + 'meta.json'
+        if not os.path.isfile(path):
+            os.makedirs(self.cachedir, exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(meta, f, indent=4)
+            return True
+
+        with open(path, 'r') as f:
+            saved = json.load(f)
+        if saved['shapes'] != meta['shapes']:
+            print('######')
+            print(self.cachedir + ' is a cache of another case: ' + saved['datadir'])
+            print('######')
+            return False
+        return True
+
+    def _reduce(self, m0, m1, workers=None):
+        '''
+        Returns the reductions of time steps m0 to m1
+        '''
+        d = self.data
+        keys = _FLUX + _RMS + _MEAN + _MEAN2D
+        md = est_reduce(d, d.vc.read_series(m0, m1, keys=keys, workers=workers))
+        md['t'] = np.array([d.time_read(n, verbose=False) for n in range(m0, m1 + 1)])
+        return md
+
+    def _prepend(self, n0, n1, batch=64, workers=None):
+        '''
+        Inserts the reductions of time steps n0 to n1 before the cached time steps
+        '''
+        import shutil
+        import tempfile
+
+        shapes = self._shapes()
+        paths = [self.cachedir + key + '.f8' for key in shapes] + [self.cachedir + 'step.i8']
+        # unique temporary files, so that concurrent updates do not write to the same file
+        tmppaths = {}
+        try:
+            for path in paths:
+                fd, tmppaths[path] = tempfile.mkstemp(dir=self.cachedir, prefix=os.path.basename(path) + '.', suffix='.tmp')
+                os.close(fd)
+                os.chmod(tmppaths[path], 0o644)
+            for m0 in range(n0, n1 + 1, batch):
+                m1 = min(m0 + batch - 1, n1)
+                md = self._reduce(m0, m1, workers)
+                for key in shapes:
+                    with open(tmppaths[self.cachedir + key + '.f8'], 'ab') as f:
+                        np.ascontiguousarray(np.moveaxis(md[key], -1, 0), dtype='<f8').tofile(f)
+                with open(tmppaths[self.cachedir + 'step.i8'], 'ab') as f:
+                    np.arange(m0, m1 + 1, dtype='<i8').tofile(f)
+
+            # step.i8 is replaced last as in update
+            for path in paths:
+                with open(tmppaths[path], 'ab') as f, open(path, 'rb') as g:
+                    shutil.copyfileobj(g, f)
+                os.replace(tmppaths.pop(path), path)
+        finally:
+            for tmppath in tmppaths.values():
+                if os.path.exists(tmppath):
+                    os.remove(tmppath)
+
+    def update(self, n0=0, n1=None, batch=64, workers=None):
+        '''
+        Adds the reductions of time steps from n0 to n1 that are not cached
+
+        Parameters
+        ----------
+        n0 : int
+            first time step. Time steps before the cache are inserted
+        n1 : int
+            last time step. If None, pyR2D2.Data.nd
+        batch : int
+            number of time steps read at once
+        workers : int
+            Number of threads for reading files.
+            If None, environment variable PYR2D2_WORKERS is used (default 1)
+
+        Returns
+        -------
+        steps : list
+            newly cached time steps
+        '''
+        d = self.data
+        if not self._check_meta():
+            return []
+        if n1 is None:
+            n1 = d.nd
+
+        steps = self.steps
+        shapes = self._shapes()
+        # discard records of an interrupted update
+        for key, shape in shapes.items():
+            path = self.cachedir + key + '.f8'
+            if os.path.isfile(path):
+                os.truncate(path, min(os.path.getsize(path), 8*len(steps)*int(np.prod(shape))))
+
+        new_steps = []
+        if len(steps) > 0:
+            if n0 < steps[0]:
+                self._prepend(n0, int(steps[0]) - 1, batch, workers)
+                new_steps += list(range(n0, int(steps[0])))
+            n0 = int(steps[-1]) + 1
+
+        for m0 in range(n0, n1 + 1, batch):
+            m1 = min(m0 + batch - 1, n1)
+            md = self._reduce(m0, m1, workers)
+
+            for key in shapes:
+                with open(self.cachedir + key + '.f8', 'ab') as f:
+                    np.ascontiguousarray(np.moveaxis(md[key], -1, 0), dtype='<f8').tofile(f)
+            with open(self.cachedir + 'step.i8', 'ab') as f:
+                np.arange(m0, m1 + 1, dtype='<i8').tofile(f)
+            new_steps += list(range(m0, m1 + 1))
+
+        return new_steps
+
+    def load(self, n0=None, n1=None):
+        '''
+        Loads the cached reductions
+
+        Parameters
+        ----------
+        n0, n1 : int
+            first and last time steps. If None, all cached time steps
+
+        Returns
+        -------
+        md : dict
+            key -> numpy.ndarray of shape (..., nt). See :func:`est_reduce`.
+            "t" is time and "step" is time step
+        '''
+        steps = self.steps
+        use = np.ones(len(steps), dtype=bool)
+        if n0 is not None:
+            use &= steps >= n0
+        if n1 is not None:
+            use &= steps <= n1
+
+        md = {'step': steps[use]}
+        for key, shape in self._shapes().items():
+            if len(steps) == 0:
+                md[key] = np.zeros(shape + (0,))
+                continue
+            qq = np.fromfile(self.cachedir + key + '.f8', dtype='<f8', count=len(steps)*int(np.prod(shape)))
+            md[key] = np.moveaxis(qq.reshape((len(steps),) + shape)[use], 0, -1)
+        return md
@@ -279,9 +279,12 @@ def regrid_data(
 
     ## prepare checkpoint data for upgrade data
     if memory_saving:
-        up.qq = np.zeros((up.ixg, up.jxg, up.kxg))
+        up.qq = np.zeros((up.ixg, up.jxg, up.kxg), order='F')
     else:
-        up.qq = np.zeros((up.ixg, up.jxg, up.kxg, data.mtype))
+        up.qq = np.zeros((up.ixg, up.jxg, up.kxg, data.mtype), order='F')
+
+    ## interpolation weights are computed once for all the variables
+    plan = pyR2D2.fortran_util.InterpPlan(data.xg, data.yg, data.zg, up.x, up.y, up.z)
 
     os.makedirs('../run/'+caseid+'/data/param/',exist_ok=True)
     os.makedirs('../run/'+caseid+'/data/qq/',exist_ok=True)
@@ -293,15 +296,18 @@ def regrid_data(
     os.makedirs('../run/'+caseid+'/data/tau/',exist_ok=True)
 
     print('### Upgrade starts ###')
-    for m in tqdm(range(0, data.mtype)):
-        if memory_saving:
-            up.qq = pyR2D2.fortran_util.interp(data.xg, data.yg, data.zg, \
-                    up.x, up.y, up.z, data.qc[:,:,:,m])
+    if memory_saving:
+        for m in tqdm(range(0, data.mtype)):
+            plan.apply(data.qc[:,:,:,m], out=up.qq)
             up.qq.reshape([up.ixg*up.jxg*up.kxg],order='F').astype(endian+'d') \
                     .tofile('../run/'+caseid+'/data/qq/qq'+'{0:02d}'.format(m)+'.dac.e')
-        else:
-            up.qq[:,:,:,m] = pyR2D2.fortran_util \
-                    .interp(data.xg, data.yg, data.zg, up.x, up.y, up.z, data.qc[:,:,:,m])
+    elif data.qc.dtype == np.float64:
+        # all the variables in one pass
+        plan.apply(data.qc, out=up.qq)
+    else:
+        # variables are converted to native endian one by one
+        for m in tqdm(range(0, data.mtype)):
+            plan.apply(data.qc[:,:,:,m], out=up.qq[:,:,:,m])
             
     if not memory_saving:
         print('### Save data ###')
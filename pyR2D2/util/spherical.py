@@ -0,0 +1,179 @@
+import os
+
+import numpy as np
+
+class _SlabTarget:
+    '''
+    Destination of the converted slabs of a variable. See :func:`spherical2cartesian_data`
+    '''
+    def __init__(self, out, shape, dtype, name, xc, yc, zc):
+        self.vtk = None
+        self.h5 = None
+        if isinstance(out, str):
+            ext = os.path.splitext(out)[1]
+            if ext == '.vtk':
+                from ..write.vtk import write_3D_header
+                write_3D_header(xc, yc, zc, out, name)
+                self.vtk = out
+                return
+            if ext in ['.h5', '.hdf5']:
+                import h5py
+                self.h5 = h5py.File(out, 'w')
+                self.h5['xc'], self.h5['yc'], self.h5['zc'] = xc, yc, zc
+                out = self.h5.create_dataset(name, shape=shape, dtype=dtype, chunks=True)
+            elif ext == '.npy':
+                out = np.lib.format.open_memmap(out, mode='w+', dtype=dtype, shape=shape, fortran_order=True)
+            else:
+                raise ValueError('out should be *.npy, *.vtk, *.h5, or *.hdf5, not ' + out)
+
+        if out is None:
+            out = np.empty(shape, dtype=dtype, order='F')
+        elif tuple(out.shape) != shape:
+            raise ValueError('out should have shape ' + str(shape) + ', not ' + str(tuple(out.shape)))
+        self.out = out
+
+    def write(self, k0, k1, qq):
+        if self.vtk is not None:
+            from ..write.vtk import append_3D_slab
+            append_3D_slab(qq, self.vtk)
+        else:
+            self.out[:, :, k0:k1] = qq
+
+    def close(self):
+        '''
+        Returns the array of the result. None for VTK and HDF5 files
+        '''
+        if self.vtk is not None:
+            return None
+        if self.h5 is not None:
+            self.h5.close()
+            return None
+        if isinstance(self.out, np.memmap):
+            self.out.flush()
+        return self.out
+
+def spherical2cartesian_data(data, n, value, ixc=None, jxc=None, kxc=None, xc=None, yc=None, zc=None,
+                             out=None, slab=32, dtype=np.float32, workers=None, backend=None,
+                             weight_dtype=np.float64):
+    '''
+    Converts 3D data in spherical geometry to cartesian geometry out of core
+
+    The cartesian volume is produced slab by slab in z direction.
+    For each slab, only the range in radius and colatitude needed for the slab
+    is read with :class:`pyR2D2.RestrictedData`, and the slab is written to out
+    before the next one. Memory usage is proportional to the slab size, not to
+    the whole volume. The conversion plan of a slab is computed once and used
+    for all the time steps and values, which are converted in one pass.
+
+    Parameters
+    ----------
+    data : pyR2D2.Data
+        Instance of pyR2D2.Data. geometry should be Spherical or YinYang
+    n : int or list
+        time step(s)
+    value : str or list
+        Kind(s) of value, e.g., "ro" or ["ro", "se"]. See :meth:`pyR2D2.RestrictedData.read`
+    ixc, jxc, kxc : int
+        No. of grid in cartesian coordinates.
+        Uniform grids from -max(data.x) to max(data.x) are generated
+    xc, yc, zc : numpy.ndarray, float
+        cartesian coordinates (1D) in the unit of data.x. If given, ixc, jxc, kxc are ignored
+    out : str, array-like, or dict
+        Destination of the result
+
+        - None: new numpy.ndarray
+        - "*.npy": numpy.memmap in the npy format (Fortran order)
+        - "*.vtk": VTK file. See :func:`pyR2D2.write.vtk.write_3D_slabs`
+        - "*.h5" or "*.hdf5": HDF5 file with datasets value, "xc", "yc", and "zc". h5py is required
+        - array-like, e.g., numpy.memmap or h5py.Dataset of (ixc, jxc, kxc) supporting out[:,:,k0:k1] = qq
+
+        For several time steps or values, a file name should include the fields
+        {n} and/or {value}, e.g., "cart/{value}.{n:08d}.vtk",
+        or a dict (n, value) -> destination is given
+    slab : int
+        No. of cartesian grid in z direction converted at once
+    dtype : numpy.dtype
+        numpy.float32 or numpy.float64 for the output
+    workers : int
+        Number of threads for reading files.
+        If None, environment variable PYR2D2_WORKERS is used (default 1)
+    backend : str
+        See :func:`pyR2D2.fortran_util.set_backend`
+    weight_dtype : numpy.dtype
+        precision of the conversion weights.
+        See :class:`pyR2D2.fortran_util.Spherical2CartesianPlan`
+
+    Returns
+    -------
+    qqc : numpy.ndarray, array-like, or dict
+        converted variable (ixc, jxc, kxc). None for VTK and HDF5 files.
+        dict (n, value) -> result if n or value is a list
+    xc, yc, zc : numpy.ndarray, float
+        cartesian coordinates
+
+    Examples
+    --------
+    .. code-block:: python
+
+        # 2048^3 float32 volume (32 GB) without holding it in memory
+        qqc, xc, yc, zc = pyR2D2.util.spherical2cartesian_data(d, n, 'ro', 2048, 2048, 2048, out='ro.npy')
+
+        # several values and time steps with the same plans
+        pyR2D2.util.spherical2cartesian_data(d, range(n0, n1 + 1), ['ro', 'se'], 1024, 1024, 1024,
+                                             out='vtk/{value}.{n:08d}.vtk')
+    '''
+    from .. import fortran_util
+    from ..fortran_util.backends import cartesian_coordinate
+
+    if data.geometry not in ['Spherical', 'YinYang']:
+        print('######')
+        print('geometry =', data.geometry)
+        print('spherical2cartesian_data is only for Spherical and YinYang geometries')
+        print('######')
+        return
+
+    single = np.isscalar(n) and isinstance(value, str)
+    steps = [int(n)] if np.isscalar(n) else [int(n0) for n0 in n]
+    values = [value] if isinstance(value, str) else list(value)
+
+    xc = cartesian_coordinate(data.x, ixc) if xc is None else np.asarray(xc, dtype=np.float64)
+    yc = cartesian_coordinate(data.x, jxc) if yc is None else np.asarray(yc, dtype=np.float64)
+    zc = cartesian_coordinate(data.x, kxc) if zc is None else np.asarray(zc, dtype=np.float64)
+    shape = (len(xc), len(yc), len(zc))
+
+    keys = [(n0, vl) for n0 in steps for vl in values]
+    if single or out is None:
+        dests = {key: out for key in keys}
+    elif isinstance(out, dict):
+        dests = {key: out[key] for key in keys}
+    elif isinstance(out, str):
+        dests = {(n0, vl): out.format(n=n0, value=vl) for n0, vl in keys}
+        if len(set(dests.values())) < len(keys):
+            raise ValueError('out should include {n} and/or {value} to give a file for each time step and value')
+    else:
+        raise ValueError('out should be a file name with {n} and/or {value}, or a dict for several time steps or values')
+    targets = {key: _SlabTarget(dests[key], shape, dtype, key[1], xc, yc, zc) for key in keys}
+
+    def read(n0, islice, jslice):
+        i0, i1 = islice.start, islice.stop - 1
+        j0, j1 = jslice.start, jslice.stop - 1
+        qq = np.empty((i1 - i0 + 1, j1 - j0 + 1, data.kx, len(values)), dtype=np.float32, order='F')
+        data.qr.read(n0, values, data.x[i0], data.x[i1], data.y[j0], data.y[j1], data.z[0], data.z[-1],
+                     out={vl: qq[..., m] for m, vl in enumerate(values)}, workers=workers)
+        return qq
+
+    plans = fortran_util.spherical2cartesian_slab_plans(data.x, data.y, data.z, xc=xc, yc=yc, zc=zc,
+                                                        slab=slab, dtype=weight_dtype)
+    for k0, k1, plan, islice, jslice in plans:
+        for n0 in steps:
+            if islice is None:
+                qqc = np.zeros(plan.shape + (len(values),), dtype=dtype, order='F')
+            else:
+                qqc = plan.apply(read(n0, islice, jslice), dtype=dtype, backend=backend)
+            for m, vl in enumerate(values):
+                targets[(n0, vl)].write(k0, k1, qqc[..., m])
+
+    results = {key: target.close() for key, target in targets.items()}
+    if single:
+        return results[(steps[0], values[0])], xc, yc, zc
+    return results, xc, yc, zc
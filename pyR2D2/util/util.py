@@ -215,10 +215,16 @@ def update_results_file(file_path, total_size, unit, caseid, dir_path):
         The case ID of the directory
     dir_path : str
         The directory path
-        
+
+    Notes
+    -----
+    Deprecated. Use :class:`pyR2D2.Catalog`, which stores parameters and
+    disk usage of all the cases in a SQLite file.
     '''
     import os
+    import warnings
     from datetime import datetime
+    warnings.warn('update_results_file is deprecated. Use pyR2D2.Catalog instead.', DeprecationWarning, stacklevel=2)
     # 現在の日時を取得
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
@@ -265,35 +271,23 @@ def eos(data,ro,se,var):
     ----------
     data : pyR2D2.Data, or, pyR2D2.Read
         Instance of pyR2D2.Data or pyR2D2.Read classes
-    ro : float
+    ro : float or numpy.ndarray
         Density
-    se : float)
+    se : float or numpy.ndarray
         Entropy
     var : str
         Variable name, pr, te, en, op
     
     Returns
     -------
-    qq : float
+    qq : float or numpy.ndarray
         Corresponding variable
        
-    Warning
-    -------
-    This method is very slow for large numpy array. Please consider using fortraun code.
+    Notes
+    -----
+    For several variables or large arrays, :class:`pyR2D2.util.EOSTable` can be used
+    to share the index computation and to use threads.
     '''
+    from .eos_table import EOSTable
     
-    import numpy as np
-    
-    iro = int((np.log(ro) - data.log_ro_e[0])//data.dlogro_e)
-    ise = int((       se  - data.se_e[0]    )//data.dse_e)
-    
-    dlogro = np.log(ro) - data.plog_ro_e[iro]
-    dse = se - data.se_e[ise]
-    
-    qq = np.exp((\
-        + data.p.__dict__['log_'+var+'_e'][iro  ,ise  ]*(data.dlogro_e - dlogro)*(data.dse_e - dse) \
-        + data.p.__dict__['log_'+var+'_e'][iro+1,ise  ]*(                dlogro)*(data.dse_e - dse) \
-        + data.p.__dict__['log_'+var+'_e'][iro  ,ise+1]*(data.dlogro_e - dlogro)*(             dse) \
-        + data.p.__dict__['log_'+var+'_e'][iro+1,ise+1]*(                dlogro)*(             dse) \
-        )/data.dlogro_e/data.dse_e)
-    return qq
\ No newline at end of file
+    return EOSTable(data)(ro, se, var)
\ No newline at end of file
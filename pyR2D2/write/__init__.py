@@ -1,2 +1,7 @@
-from . import google
-from . import vtk
\ No newline at end of file
+# google and vtk are imported on first access
+def __getattr__(name):
+    if name in ['google', 'vtk']:
+        import importlib
+        return importlib.import_module('.' + name, __name__)
+
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
\ No newline at end of file
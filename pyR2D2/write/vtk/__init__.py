@@ -1,3 +1,3 @@
 from .vtk import *
 
-__all__ = ['write_3D','write_3D_vector','write_optical_surface']
\ No newline at end of file
+__all__ = ['write_3D','write_3D_slabs','write_3D_header','append_3D_slab','write_3D_vector','write_optical_surface']
\ No newline at end of file
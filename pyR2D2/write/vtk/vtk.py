@@ -29,6 +29,16 @@ def write_3D(qq : np.ndarray,
     jx = qq.shape[1]
     kx = qq.shape[2]
     
+    _write_header_3D(file, ix, jx, kx, x, y, z, name)
+    f = open(file,mode='ab')
+    f.write(qq.reshape([ix*jx*kx],order='F').astype('>f'))
+    #f.write(qqt.astype('>f'))
+    f.close()
+
+def _write_header_3D(file, ix, jx, kx, x, y, z, name):
+    '''
+    Writes the header of 3D scalar data in VTK format
+    '''
     f = open(file,mode='w')
     f.write('# vtk DataFile Version 3.0\n')
     f.write('vtk_data\n')
@@ -41,16 +51,88 @@ def write_3D(qq : np.ndarray,
     dz = z[1] - z[0]
     
     f.write('SPACING '+'{:.8f}'.format(dx)+' '+'{:.8f}'.format(dy)+' '+'{:.8f}'.format(dz)+'\n')
-    f.write('POINT_DATA '+str(qq.size)+'\n')
+    f.write('POINT_DATA '+str(ix*jx*kx)+'\n')
     f.write('SCALARS '+name+' float\n')
     f.write('LOOKUP_TABLE default\n')
-
-    f.close()
-    f = open(file,mode='ab')
-    f.write(qq.reshape([ix*jx*kx],order='F').astype('>f'))
-    #f.write(qqt.astype('>f'))
     f.close()
 
+def write_3D_slabs(slabs,
+                   x : np.ndarray,
+                   y : np.ndarray,
+                   z : np.ndarray,
+                   file : str, name : str):
+    '''
+    Outputs the 3D scalar data in
+    VTK format slab by slab in z direction.
+    The whole 3D array is not needed in memory
+
+    Parameters
+    ----------
+    slabs : iterable
+        3D arrays size of (ix,jx,kx_slab) in order of z.
+        The total of kx_slab should be kx
+    x : numpy.ndarray, float
+        x coordinate size of (ix)
+    y : numpy.ndarray, float
+        y coordinate size of (jx)
+    z : numpy.ndarray, float
+        z coordinate size of (kx)
+    file : str
+        File name for output
+    name : str
+        Name of the variable
+
+    Examples
+    --------
+    .. code-block:: python
+
+        slabs = pyR2D2.fortran_util.spherical2cartesian_slabs(rr, th, ph, read, 1024, 1024, 1024)
+        pyR2D2.write.vtk.write_3D_slabs((qq for k0, k1, qq in slabs), xc, yc, zc, 'ro.vtk', 'ro')
+    '''
+    ix, jx, kx = len(x), len(y), len(z)
+    write_3D_header(x, y, z, file, name)
+    kw = 0
+    for qq in slabs:
+        if qq.shape[:2] != (ix, jx):
+            raise ValueError('slab should have shape ('+str(ix)+', '+str(jx)+', kx_slab), not '+str(qq.shape))
+        append_3D_slab(qq, file)
+        kw += qq.shape[2]
+    if kw != kx:
+        raise ValueError('total size of slabs in z direction is '+str(kw)+', not '+str(kx))
+
+def write_3D_header(x : np.ndarray,
+                    y : np.ndarray,
+                    z : np.ndarray,
+                    file : str, name : str):
+    '''
+    Outputs the header of 3D scalar data in VTK format.
+    The data is appended by :func:`append_3D_slab` in order of z
+
+    Parameters
+    ----------
+    x, y, z : numpy.ndarray, float
+        x, y, and z coordinates
+    file : str
+        File name for output
+    name : str
+        Name of the variable
+    '''
+    _write_header_3D(file, len(x), len(y), len(z), x, y, z, name)
+
+def append_3D_slab(qq : np.ndarray, file : str):
+    '''
+    Appends a slab of 3D scalar data to a VTK file written by :func:`write_3D_header`
+
+    Parameters
+    ----------
+    qq : numpy.ndarray, float
+        3D array size of (ix,jx,kx_slab)
+    file : str
+        File name for output
+    '''
+    with open(file,mode='ab') as f:
+        f.write(qq.reshape([-1],order='F').astype('>f'))
+
 ######################################################
 ######################################################
 def write_optical_surface(qq : np.ndarray,
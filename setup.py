@@ -27,5 +27,8 @@ setup(
     packages=find_packages(include=["pyR2D2", "pyR2D2.*"]),  # 対象パッケージを指定
     include_package_data=True,
     cmdclass={"build_py": CustomBuildPy},  # build_pyをカスタムコマンドに置き換え
+    entry_points={
+        "xarray.backends": ["r2d2 = pyR2D2.data_io.xarray_backend:R2D2BackendEntrypoint"],
+    },
     zip_safe=False,
 )
\ No newline at end of file